@@ -0,0 +1,215 @@
+# app/admission.py
+"""
+Admission control: per-client rate limits and a cap on concurrent requests, applied before
+a request reaches the routes.
+
+- Token buckets (RATE_LIMIT_*) keyed by the user id of a valid bearer token, otherwise by
+  client IP; POST /homepage/login and /homepage/signup use a separate, much smaller
+  per-IP budget (RATE_LIMIT_AUTH_*), since each attempt costs an argon2 hash. Over budget: 429.
+- At most ADMISSION_MAX_IN_FLIGHT requests run at once; up to ADMISSION_MAX_QUEUE more
+  wait for a slot for at most ADMISSION_QUEUE_TIMEOUT_SECONDS. Beyond that: 503. Keep the
+  limit near what the DB pool can serve, so excess load is shed instead of queueing on it.
+
+Bucket state lives in a RateLimitBackend: "memory" (per process, so each worker enforces
+its own budget) or "none". A backend shared between processes only has to implement take().
+
+The bearer token is decoded here once, and deps.get_token_payload reuses the result.
+"""
+import asyncio
+import json
+import time
+from typing import Dict, Optional, Tuple
+
+from . import auth, metrics
+from .config import settings
+
+
+class RateLimitBackend:
+    """Token buckets by key."""
+
+    def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        """
+        Take `cost` tokens from the bucket `key`, which refills at `rate` tokens per second up
+        to `burst`. Returns 0.0 when allowed, otherwise the seconds until it would be.
+        """
+        raise NotImplementedError
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """
+    In-process buckets as [tokens, last refill] lists in a dict. Only the event loop calls
+    take(), so no lock is needed. Past max_keys buckets, the ones that have refilled
+    completely (idle clients) are dropped, or the oldest half if none have.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, list] = {}
+
+    def take(self, key, rate, burst, cost=1.0):
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._evict(now, rate, burst)
+            bucket = self._buckets[key] = [burst, now]
+        tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if tokens >= cost:
+            bucket[0] = tokens - cost
+            return 0.0
+        bucket[0] = tokens
+        return (cost - tokens) / rate
+
+    def _evict(self, now: float, rate: float, burst: float) -> None:
+        idle = [k for k, (tokens, last) in self._buckets.items() if tokens + (now - last) * rate >= burst]
+        if not idle:
+            idle = list(self._buckets)[: len(self._buckets) // 2]
+        for k in idle:
+            del self._buckets[k]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class NullRateLimitBackend(RateLimitBackend):
+    """Never limits."""
+
+    def take(self, key, rate, burst, cost=1.0):
+        return 0.0
+
+
+_RATE_LIMIT_BACKENDS = {
+    "memory": lambda: MemoryRateLimitBackend(settings.RATE_LIMIT_MAX_KEYS),
+    "none": NullRateLimitBackend,
+}
+
+
+def make_rate_limit_backend(name: str) -> RateLimitBackend:
+    try:
+        return _RATE_LIMIT_BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND {name!r}; expected one of {', '.join(_RATE_LIMIT_BACKENDS)}")
+
+
+class ConcurrencyGate:
+    """At most `limit` holders, at most `max_queue` waiters, each for at most `timeout` seconds."""
+
+    def __init__(self, limit: int, max_queue: int, timeout: float):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def acquire(self) -> bool:
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()  # free slot: returns without suspending
+        elif self.waiting >= self.max_queue:
+            return False
+        else:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                return False
+            finally:
+                self.waiting -= 1
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+
+# the stricter per-IP budget applies to these (method, path) pairs
+AUTH_ROUTES = {("POST", "/homepage/login"), ("POST", "/homepage/signup")}
+EXEMPT_PATHS = {"/metrics"}
+
+
+def _bearer_token(scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            return token.strip() if scheme.lower() == "bearer" else None
+    return None
+
+
+def client_key(scope) -> Tuple[str, Optional[Tuple[str, dict]]]:
+    """
+    Bucket key of a request, "user:<id>" for a valid bearer token, else "ip:<address>",
+    and the decoded (token, payload) when there was one.
+    """
+    token = _bearer_token(scope)
+    if token:
+        payload = auth.decode_access_token(token)
+        if payload and isinstance(payload.get("sub"), str):
+            return "user:" + payload["sub"], (token, payload)
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown"), None
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware applying the limits above."""
+
+    def __init__(self, app, backend: RateLimitBackend, gate: Optional[ConcurrencyGate] = None):
+        self.app = app
+        self.backend = backend
+        self.gate = gate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        if (scope["method"], scope["path"]) in AUTH_ROUTES:
+            client = scope.get("client")
+            retry_after = self.backend.take(
+                "auth:" + (client[0] if client else "unknown"),
+                settings.RATE_LIMIT_AUTH_PER_MINUTE / 60.0, settings.RATE_LIMIT_AUTH_BURST,
+            )
+        else:
+            key, decoded = client_key(scope)
+            if decoded is not None:
+                scope.setdefault("state", {})["token_payload"] = decoded
+            retry_after = self.backend.take(key, settings.RATE_LIMIT_PER_SECOND, settings.RATE_LIMIT_BURST)
+        if retry_after:
+            metrics.ADMISSION_REJECTED.inc(("rate_limit",))
+            await _reject(send, 429, "Too many requests, slow down.", retry_after)
+            return
+
+        if self.gate is None:
+            await self.app(scope, receive, send)
+            return
+        if not await self.gate.acquire():
+            metrics.ADMISSION_REJECTED.inc(("overload",))
+            await _reject(send, 503, "Server busy, please retry shortly.", 1)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.gate.release()
+
+
+async def _reject(send, status: int, detail: str, retry_after: float) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, int(retry_after + 0.999))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def make_gate() -> Optional[ConcurrencyGate]:
+    if settings.ADMISSION_MAX_IN_FLIGHT <= 0:
+        return None
+    return ConcurrencyGate(
+        settings.ADMISSION_MAX_IN_FLIGHT, settings.ADMISSION_MAX_QUEUE, settings.ADMISSION_QUEUE_TIMEOUT_SECONDS
+    )
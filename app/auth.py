@@ -1,3 +1,7 @@
+import asyncio
+import secrets
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from jose import JWTError, jwt
@@ -5,7 +9,13 @@ from passlib.context import CryptContext
 from .config import settings
 
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__rounds=settings.ARGON2_TIME_COST,
+    argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+    argon2__parallelism=settings.ARGON2_PARALLELISM,
+)
 
 
 def verify_password(plain_password, hashed_password):
@@ -16,12 +26,77 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
+# -----------------------
+# Password hashing worker pool
+# -----------------------
+
+
+class PasswordHashPoolSaturated(Exception):
+    """Raised when every hashing worker is busy and the wait queue is full."""
+
+
+_hash_executor: Optional[Executor] = None
+_hash_inflight = 0
+_hash_lock = threading.Lock()
+
+
+def _get_hash_executor() -> Executor:
+    global _hash_executor
+    if _hash_executor is None:
+        with _hash_lock:
+            if _hash_executor is None:
+                if settings.PASSWORD_HASH_EXECUTOR == "process":
+                    _hash_executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+                else:
+                    _hash_executor = ThreadPoolExecutor(
+                        max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="pwhash"
+                    )
+    return _hash_executor
+
+
+async def _run_in_hash_pool(fn, *args):
+    """
+    Run `fn(*args)` in the hashing pool without blocking the event loop.
+
+    At most PASSWORD_HASH_WORKERS jobs run at once and at most PASSWORD_HASH_MAX_QUEUE
+    more may wait; anything beyond that fails fast with PasswordHashPoolSaturated.
+    """
+    global _hash_inflight
+    with _hash_lock:
+        if _hash_inflight >= settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_MAX_QUEUE:
+            raise PasswordHashPoolSaturated()
+        _hash_inflight += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_hash_executor(), fn, *args)
+    finally:
+        with _hash_lock:
+            _hash_inflight -= 1
+
+
+async def verify_password_async(plain_password, hashed_password) -> bool:
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password) -> str:
+    return await _run_in_hash_pool(get_password_hash, password)
+
+
+def shutdown_hash_pool() -> None:
+    global _hash_executor
+    with _hash_lock:
+        executor, _hash_executor = _hash_executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """
     Create a JWT from `data` and return the encoded token string.
 
     - If expires_delta is None: no 'exp' claim will be added (token does NOT expire).
     - If expires_delta is provided: add 'exp' = now + expires_delta.
+    - Every token gets a random 'jti' (32 hex chars), so it can be revoked (app.revocation).
 
     Example:
         # expiring token (default usage)
@@ -31,6 +106,7 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
         token = create_access_token({"sub": user_hex}, expires_delta=None)
     """
     to_encode = data.copy()
+    to_encode["jti"] = secrets.token_hex(16)
     if expires_delta is not None:
         expire = datetime.utcnow() + expires_delta
         to_encode.update({"exp": expire})
@@ -0,0 +1,257 @@
+# app/cache.py
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from .config import settings
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache with a per-entry time-to-live.
+
+    - Holds at most `maxsize` entries; the least recently used entry is evicted first.
+    - Entries older than `ttl` seconds are treated as missing and dropped on access.
+    - `hits` / `misses` counters are kept so the effect can be observed via stats().
+    - With `sizeof`, the summed size of the stored values is tracked as stats()["bytes"].
+    """
+
+    def __init__(self, maxsize: int, ttl: float, sizeof: Optional[Callable[[Any], int]] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _size(self, value: Any) -> int:
+        return self.sizeof(value) if self.sizeof is not None else 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires_at, value = item
+            if expires_at <= now:
+                del self._data[key]
+                self.nbytes -= self._size(value)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            old = self._data.get(key)
+            if old is not None:
+                self.nbytes -= self._size(old[1])
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self.nbytes += self._size(value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self.nbytes -= self._size(evicted)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            item = self._data.pop(key, None)
+            if item is not None:
+                self.nbytes -= self._size(item[1])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "bytes": self.nbytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+            }
+
+
+# Authenticated users keyed by user_id (see deps.get_current_user).
+# crud drops entries whenever a users row is updated or deleted.
+user_cache = TTLCache(maxsize=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+
+
+# -----------------------
+# Notes-list response cache
+# -----------------------
+
+
+class CacheBackend:
+    """
+    Byte-oriented key/value store behind NotesListCache.
+
+    Deliberately the subset a shared cache offers (Redis GET / SET EX / DEL, memcached
+    get / set / delete), so a client for one plugs in without touching the callers.
+    Values may disappear at any time (eviction, expiry); callers must cope.
+    """
+
+    name = "base"
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    In-process LRU with TTL. Each worker process has its own copy, so with several workers
+    a write only invalidates the worker that handled it; the others keep their entries,
+    which NotesListCache.get() then refuses by their ETag.
+    """
+
+    name = "memory"
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl, sizeof=len)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value, ttl):
+        self._cache.set(key, value, ttl=ttl)
+
+    def delete(self, key):
+        self._cache.invalidate(key)
+
+    def stats(self):
+        return self._cache.stats()
+
+
+class NullCacheBackend(CacheBackend):
+    """Caches nothing (NOTES_CACHE_BACKEND=none)."""
+
+    name = "none"
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def delete(self, key):
+        pass
+
+
+class NotesListCache:
+    """
+    Serialized GET /homepage/notes pages, keyed by user, page size and cursor.
+
+    Every user has a generation token stored in the backend and part of each page key.
+    invalidate_user() replaces the token, which orphans all of the user's pages at once
+    with a single write that every process sharing the backend sees. Tokens are random,
+    so a token that was evicted can never come back and revive stale pages. Orphaned
+    pages age out through the backend's LRU / TTL.
+
+    crud calls invalidate_user() after every committed note write. That reaches only the
+    processes sharing the backend, so get() also takes the page's current ETag and treats
+    a page stored under another one as a miss (a stale page).
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    @staticmethod
+    def _gen_key(user_id: str) -> str:
+        return f"notes:gen:{user_id}"
+
+    def _generation(self, user_id: str) -> str:
+        gen = self.backend.get(self._gen_key(user_id))
+        if gen is None:
+            gen = os.urandom(8).hex().encode()
+            # an expired token only orphans the user's pages early
+            self.backend.set(self._gen_key(user_id), gen, self.ttl * 2)
+        return gen.decode()
+
+    def page_key(self, user_id: str, limit: int, cursor: Optional[str], view: str = "full") -> str:
+        """
+        Key of one page under the user's current generation. Take it once per request, before
+        querying, and use it for both get() and set(): a write that lands in between then
+        orphans the page instead of it being stored under the new generation.
+        """
+        return f"notes:page:{user_id}:{self._generation(user_id)}:{view}:{limit}:{cursor or ''}"
+
+    def get(self, key: str, etag: str) -> Optional[Tuple[dict, bytes]]:
+        """(headers, JSON body) of a cached page whose ETag is still `etag`, or None."""
+        raw = self.backend.get(key)
+        if raw is None:
+            self.misses += 1
+            return None
+        meta, body = raw.split(b"\n", 1)
+        headers = json.loads(meta)
+        if headers.get("ETag") != etag:  # written since, by a process this backend doesn't reach
+            self.misses += 1
+            self.stale += 1
+            self.backend.delete(key)
+            return None
+        self.hits += 1
+        return headers, body
+
+    def set(self, key: str, headers: dict, body: bytes) -> None:
+        self.backend.set(key, json.dumps(headers).encode() + b"\n" + body, self.ttl)
+
+    def invalidate_user(self, user_id: str) -> None:
+        self.backend.delete(self._gen_key(user_id))
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_ratio": (self.hits / total) if total else 0.0,
+            **{f"backend_{k}": v for k, v in self.backend.stats().items()},
+        }
+
+
+_CACHE_BACKENDS = {
+    "memory": lambda: MemoryCacheBackend(settings.NOTES_CACHE_MAX_SIZE, settings.NOTES_CACHE_TTL_SECONDS),
+    "none": NullCacheBackend,
+}
+
+
+def make_cache_backend(name: str) -> CacheBackend:
+    try:
+        return _CACHE_BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown NOTES_CACHE_BACKEND {name!r}; expected one of {', '.join(_CACHE_BACKENDS)}")
+
+
+notes_list_cache = NotesListCache(make_cache_backend(settings.NOTES_CACHE_BACKEND), settings.NOTES_CACHE_TTL_SECONDS)
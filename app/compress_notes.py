@@ -0,0 +1,116 @@
+# app/compress_notes.py
+"""
+Compress existing note_content values in place, in small batches.
+
+    python -m app.compress_notes                      # codec and threshold from Settings
+    python -m app.compress_notes --batch-size 200 --pause 0.5
+    python -m app.compress_notes --decompress         # restore plain text (before a rollback)
+
+Walks the notes table in primary-key order, one short transaction per batch, and
+rewrites only values that change; last_update is left untouched, so ETags and sync
+watermarks do not move. Safe to interrupt and re-run, and to run next to the app: each
+value is only replaced while the note's version is still the one read (every app update
+increments it), so a note the app writes in between keeps its new content, stored
+according to the app's own settings, and is counted as skipped.
+With note shards (NOTE_SHARD_URLS), every shard is walked in turn. Compressing is refused
+while SEARCH_BACKEND is one that cannot find compressed notes (see app.search).
+"""
+import argparse
+import time
+
+from sqlalchemy import Text, bindparam, select, type_coerce, update
+
+from . import compression, models, search
+from .config import settings
+from .database import engine
+from .sharding import shard_map
+
+
+def migrate(batch_size: int, pause: float, codec: str, min_bytes: int, decompress: bool = False, bind=engine) -> dict:
+    n = models.Note.__table__.c
+    # raw stored values, bypassing CompressedText's decode / encode
+    raw_content = type_coerce(n.note_content, Text)
+    write = (
+        update(models.Note.__table__)
+        .where(n.note_id == bindparam("b_note_id"), n.version == bindparam("b_version"))
+        .values(note_content=type_coerce(bindparam("b_content"), Text), last_update=n.last_update)
+    )
+
+    stats = {"scanned": 0, "rewritten": 0, "skipped": 0, "bytes_before": 0, "bytes_after": 0}
+    last_id = None
+    while True:
+        q = select(n.note_id, n.version, raw_content.label("stored")).order_by(n.note_id).limit(batch_size)
+        if last_id is not None:
+            q = q.where(n.note_id > last_id)
+        with bind.begin() as conn:
+            rows = conn.execute(q).all()
+            changes = []
+            for row in rows:
+                if row.stored is None:
+                    continue
+                text = compression.decode(row.stored)
+                if not decompress:
+                    new = compression.encode(text, codec, min_bytes)
+                elif compression.is_encoded(text):
+                    new = row.stored  # text that itself starts with the marker stays encoded
+                else:
+                    new = text
+                if new != row.stored:
+                    changes.append({"b_note_id": row.note_id, "b_version": row.version, "b_old": row.stored, "b_content": new})
+            written = _write(conn, write, changes) if changes else []
+        if not rows:
+            break
+        for change in written:
+            stats["bytes_before"] += len(change["b_old"].encode("utf-8"))
+            stats["bytes_after"] += len(change["b_content"].encode("utf-8"))
+        stats["scanned"] += len(rows)
+        stats["rewritten"] += len(written)
+        stats["skipped"] += len(changes) - len(written)
+        last_id = rows[-1].note_id
+        print(f"  {stats['scanned']} notes scanned, {stats['rewritten']} rewritten, {stats['skipped']} skipped", flush=True)
+        if pause:
+            time.sleep(pause)
+    return stats
+
+
+def _write(conn, write, changes: list) -> list:
+    """Apply a batch of changes; returns those applied (the others were written by the app meanwhile)."""
+    result = conn.execute(write, changes)
+    if conn.dialect.supports_sane_multi_rowcount and result.rowcount == len(changes):
+        return changes
+    # some notes changed since they were read: the ones still at the version read were written here
+    n = models.Note.__table__.c
+    versions = dict(conn.execute(
+        select(n.note_id, n.version).where(n.note_id.in_([c["b_note_id"] for c in changes]))
+    ).all())
+    return [c for c in changes if versions.get(c["b_note_id"]) == c["b_version"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.1, help="seconds to sleep between batches")
+    parser.add_argument("--codec", default=settings.NOTE_COMPRESSION_CODEC)
+    parser.add_argument("--min-bytes", type=int, default=settings.NOTE_COMPRESSION_MIN_BYTES)
+    parser.add_argument("--decompress", action="store_true", help="store every value as plain text again")
+    args = parser.parse_args()
+    if not args.decompress:
+        try:
+            search.backend_class(settings.SEARCH_BACKEND, engine.dialect.name, compression=True)
+        except ValueError as e:
+            parser.error(str(e))
+
+    stats = {}
+    for name, bind in [(shard.name, shard.engine) for shard in shard_map.shards] or [("primary", engine)]:
+        print(f"{name}:", flush=True)
+        for key, value in migrate(args.batch_size, args.pause, args.codec, args.min_bytes, args.decompress, bind).items():
+            stats[key] = stats.get(key, 0) + value
+    saved = stats["bytes_before"] - stats["bytes_after"]
+    print(f"✓ {stats['rewritten']} of {stats['scanned']} notes rewritten, "
+          f"{stats['bytes_before']} -> {stats['bytes_after']} bytes ({saved:+d} saved)")
+    if stats["skipped"]:
+        print(f"  {stats['skipped']} notes were written by the app meanwhile and left as they are; run again to convert them")
+
+
+if __name__ == "__main__":
+    main()
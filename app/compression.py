@@ -0,0 +1,98 @@
+# app/compression.py
+"""
+Transparent compression of large note_content values at rest.
+
+CompressedText is a Text column (no schema change) whose large values are stored as
+
+    MARKER + codec name + ":" + base64(codec.compress(utf-8 bytes))
+
+and decoded back on load, so crud, the schemas and the API only ever see plain text, and
+compressed and uncompressed rows live side by side in the same column. Whether a value
+is compressed is decided per value on write (Settings.NOTE_COMPRESSION, _CODEC,
+_MIN_BYTES); reads decode any marked value whatever the current settings, so turning
+compression off never makes stored notes unreadable.
+
+MARKER is the ASCII unit separator, which does not start real notes; a plain value that
+does start with it is stored encoded anyway, so every stored value decodes unambiguously.
+
+Compressed values are opaque to SQL: MySQL FULLTEXT and LIKE search do not see their text
+(the in-process "memory" search backend does), so search.make_backend refuses those two
+while NOTE_COMPRESSION is on. app.compress_notes compresses (or restores) existing rows in
+batches.
+"""
+import base64
+import zlib
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy import Text
+from sqlalchemy.types import TypeDecorator
+
+from .config import settings
+
+
+MARKER = "\x1f"
+
+# name -> (compress(bytes) -> bytes, decompress(bytes) -> bytes)
+_CODECS: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "zlib": (lambda data: zlib.compress(data, settings.NOTE_COMPRESSION_LEVEL), zlib.decompress),
+}
+
+
+def register_codec(name: str, compress: Callable[[bytes], bytes], decompress: Callable[[bytes], bytes]) -> None:
+    """Make a codec available to NOTE_COMPRESSION_CODEC (and to reads of values it wrote)."""
+    if not name.isalnum():
+        raise ValueError(f"codec name must be alphanumeric, got {name!r}")
+    _CODECS[name] = (compress, decompress)
+
+
+def is_encoded(stored: Optional[str]) -> bool:
+    return stored is not None and stored.startswith(MARKER)
+
+
+def encode(text: Optional[str], codec: str, min_bytes: int) -> Optional[str]:
+    """
+    Stored form of `text`: compressed with `codec` when it is at least `min_bytes` of UTF-8
+    and compressing saves space, otherwise the text itself.
+    """
+    if text is None:
+        return None
+    force = text.startswith(MARKER)
+    if len(text) < min_bytes and not force:  # characters <= bytes, so this skips short text cheaply
+        return text
+    raw = text.encode("utf-8")
+    if len(raw) < min_bytes and not force:
+        return text
+    try:
+        compress = _CODECS[codec][0]
+    except KeyError:
+        raise ValueError(f"Unknown NOTE_COMPRESSION_CODEC {codec!r}; expected one of {', '.join(_CODECS)}")
+    stored = f"{MARKER}{codec}:{base64.b64encode(compress(raw)).decode('ascii')}"
+    return stored if force or len(stored) < len(raw) else text
+
+
+def decode(stored: Optional[str]) -> Optional[str]:
+    """Text of a stored value, compressed or not."""
+    if not is_encoded(stored):
+        return stored
+    codec, _, payload = stored[1:].partition(":")
+    try:
+        decompress = _CODECS[codec][1]
+    except KeyError:
+        raise ValueError(f"note_content was compressed with unknown codec {codec!r}")
+    return decompress(base64.b64decode(payload)).decode("utf-8")
+
+
+class CompressedText(TypeDecorator):
+    """Text that is compressed at rest above a size threshold; see the module docstring."""
+
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if not settings.NOTE_COMPRESSION:
+            # still encode marker-prefixed text, or it would be misread as compressed
+            return encode(value, settings.NOTE_COMPRESSION_CODEC, 0) if is_encoded(value) else value
+        return encode(value, settings.NOTE_COMPRESSION_CODEC, settings.NOTE_COMPRESSION_MIN_BYTES)
+
+    def process_result_value(self, value, dialect):
+        return decode(value)
@@ -13,6 +13,133 @@ class Settings(BaseSettings):
     MYSQL_PORT: int = 3306
     MYSQL_DB: str = "notesdb"
 
+    # Optional full SQLAlchemy URLs; when empty the MySQL settings above are used.
+    # e.g. DATABASE_URL=sqlite:///./notes.db for a local stand-in.
+    DATABASE_URL: str = ""
+    ASYNC_DATABASE_URL: str = ""  # derived from DATABASE_URL when empty
+    DB_ASYNC: bool = False  # use the asyncio engine (aiomysql / aiosqlite) for request sessions
+
+    # connection pools (each engine: primary, async, every replica; per worker process)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a connection before failing the request
+    DB_POOL_RECYCLE: int = 1800  # replace connections older than this many seconds (-1 = never)
+    # liveness check on checkout: "idle" pings only connections unused for DB_POOL_PING_IDLE_SECONDS,
+    # "always" pings every checkout (pool_pre_ping), "never" relies on recycle alone
+    DB_POOL_PRE_PING: str = "idle"
+    DB_POOL_PING_IDLE_SECONDS: float = 60.0
+    DB_POOL_WARMUP: int = 0  # connections each worker opens at startup (at most DB_POOL_SIZE)
+
+    # read replicas, comma-separated SQLAlchemy URLs; read-only routes use them (database.ReadRouter)
+    DATABASE_REPLICA_URLS: str = ""
+    # after a write, the user's reads stay on the primary this long: in the worker that served
+    # the write, and in every worker for clients that send back the pin cookie (app.read_your_writes)
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+    REPLICA_RETRY_SECONDS: float = 30.0  # a replica that failed to connect is skipped this long
+
+    # note shards (app.sharding), comma-separated SQLAlchemy URLs; shard i is the i-th URL. Empty:
+    # notes stay on DATABASE_URL. Users, tokens and the user -> shard directory stay there too;
+    # new users are placed by a hash of their user_id, app.rebalance moves existing ones.
+    NOTE_SHARD_URLS: str = ""
+    NOTE_SHARD_DEFAULT: int = 0  # shard of users without a directory entry (those from before sharding)
+    # how long a process trusts its copy of a user's directory entry; app.rebalance waits this
+    # long between its steps, so every process has seen a lock or a move before it goes on
+    SHARD_DIRECTORY_TTL_SECONDS: float = 5.0
+
+    # note search: "auto" (MySQL FULLTEXT on MySQL, in-process index otherwise), "fulltext", "memory" or "like"
+    SEARCH_BACKEND: str = "auto"
+    SEARCH_INDEX_MAX_USERS: int = 1000  # users whose notes the "memory" backend keeps indexed, per process
+
+    # largest operation list accepted by POST /homepage/notes/batch
+    NOTE_BATCH_MAX_OPS: int = 5000
+
+    # group commit of POST /homepage/notes (app.group_commit): concurrent creates are written
+    # together, one multi-row INSERT and one COMMIT per batch
+    NOTE_GROUP_COMMIT: bool = False
+    NOTE_GROUP_COMMIT_MAX_BATCH: int = 256
+    NOTE_GROUP_COMMIT_MAX_WAIT_MS: float = 1.0  # how long a lone create waits for others (0 = never)
+    NOTE_GROUP_COMMIT_MAX_QUEUE: int = 4096  # notes waiting before creates get 503
+
+    # characters of note_content returned as the snippet by GET /homepage/notes?view=summary
+    NOTE_SNIPPET_LENGTH: int = 200
+
+    # GET /homepage/notes/changes: changes this recent are sent again by the next sync too,
+    # so a write that commits late (after a newer one was already synced) is not skipped
+    SYNC_GRACE_SECONDS: float = 2.0
+
+    # rows fetched per server-side cursor batch by GET /homepage/notes/export
+    EXPORT_BATCH_SIZE: int = 1000
+
+    # primary key generator for users and notes: 4 = random uuid4, 7 = time-ordered UUIDv7
+    UUID_VERSION: int = 4
+
+    # observability: Prometheus-text /metrics and optional Server-Timing response headers.
+    # /metrics is unauthenticated (pool, replica and per-route traffic figures), so it is off
+    # unless enabled; only turn it on behind a private network
+    METRICS_ENABLED: bool = False
+    METRICS_SERVER_TIMING: bool = False
+    # GET /admin/pool, JSON connection pool stats; unauthenticated, so only turn it on behind a private network
+    ADMIN_POOL_ENABLED: bool = False
+
+    # in-process cache of authenticated users (deps.get_current_user)
+    USER_CACHE_MAX_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: float = 60.0
+
+    # cache of serialized GET /homepage/notes pages: "memory" (per-process LRU) or "none"
+    NOTES_CACHE_BACKEND: str = "memory"
+    NOTES_CACHE_MAX_SIZE: int = 10000  # pages
+    NOTES_CACHE_TTL_SECONDS: float = 30.0
+
+    # note_content compression at rest (app.compression); applies to values written from now
+    # on, app.compress_notes converts existing rows. SQL cannot see into compressed notes, so
+    # this needs SEARCH_BACKEND=memory: the app refuses to start with "fulltext" or "like"
+    # ("auto" on MySQL).
+    NOTE_COMPRESSION: bool = False
+    NOTE_COMPRESSION_CODEC: str = "zlib"
+    NOTE_COMPRESSION_MIN_BYTES: int = 4096
+    NOTE_COMPRESSION_LEVEL: int = 6  # zlib level
+
+    # revoked tokens (logout): each process polls for new revocations this often, and reloads
+    # the whole list (dropping expired tokens) at the slower interval
+    REVOCATION_REFRESH_SECONDS: float = 5.0
+    REVOCATION_FULL_RELOAD_SECONDS: float = 3600.0
+
+    # admission control (app.admission). Token buckets per user (valid bearer token) or client
+    # IP, per worker process: RATE_LIMIT_BACKEND "memory" or "none" (no rate limits)
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_PER_SECOND: float = 20.0
+    RATE_LIMIT_BURST: float = 40.0
+    # POST /homepage/login and /homepage/signup, per client IP
+    RATE_LIMIT_AUTH_PER_MINUTE: float = 10.0
+    RATE_LIMIT_AUTH_BURST: float = 5.0
+    RATE_LIMIT_MAX_KEYS: int = 100000  # buckets kept before idle ones are dropped
+    # requests served at once per worker (0 = no limit); keep it near the DB pool size
+    # (pool_size + max_overflow), so excess load gets a 503 instead of waiting on the pool
+    ADMISSION_MAX_IN_FLIGHT: int = 30
+    ADMISSION_MAX_QUEUE: int = 100  # requests waiting for a slot before answering 503
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 2.0
+
+    # argon2 cost parameters (passlib defaults)
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 4
+
+    # worker pool used for password hashing/verification off the event loop
+    PASSWORD_HASH_EXECUTOR: str = "thread"  # "thread" or "process"
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 32  # waiting jobs beyond the busy workers before answering 503
+
+    # production launcher (python -m app.run)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0  # 0 = one per CPU
+    SERVER_LOOP: str = "auto"  # "auto", "uvloop" or "asyncio"
+    SERVER_HTTP: str = "auto"  # "auto", "httptools" or "h11"
+    SERVER_GRACEFUL_TIMEOUT: int = 30  # seconds workers get to drain in-flight requests on shutdown
+    SERVER_KEEPALIVE: int = 5
+    # run app.init_db.bootstrap_database() when app.main is imported (off under app.run, which does it once)
+    DB_BOOTSTRAP_ON_IMPORT: bool = True
+
     class Config:
         env_file = ".env"
 
@@ -1,30 +1,123 @@
+from sqlalchemy import event, and_, or_, bindparam, case, insert, update, delete, select, func, type_coerce
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import Session
-from . import models, schemas, auth
-import uuid
-from datetime import datetime
+from . import compression, models, schemas, auth
+from .config import settings
+from .cache import notes_list_cache, user_cache
+from .database import read_router
+from .search import search_backend
+from .sharding import Placement, shard_map
+import base64
+import hashlib
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Set, Tuple, Union
 
 
+# opaque keyset cursors for the notes list: position = (created_on, note_id)
 
-# helper to handle UUID bytes <-> hex string
 
+def encode_note_cursor(created_on: datetime, note_id: str) -> str:
+    raw = f"{created_on.isoformat()}|{note_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
 
-def bin_to_uuid_str(b: bytes) -> str:
-    return uuid.UUID(bytes=b).hex
+
+def decode_note_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Inverse of encode_note_cursor. Raises ValueError for anything malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_str, note_hex = raw.split("|", 1)
+        return datetime.fromisoformat(created_str), models.parse_uuid_hex(note_hex)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("invalid cursor") from e
+
+
+# opaque sync watermarks: how far a client has seen the user's changes and deletes, as
+# (last_update, note_id) and (deleted_on, note_id) positions; None = from the beginning
+
+SyncPosition = Optional[Tuple[datetime, str]]
+
+
+def _encode_position(pos: SyncPosition) -> str:
+    return "" if pos is None else f"{pos[0].isoformat()}|{pos[1]}"
+
+
+def _decode_position(raw: str) -> SyncPosition:
+    if not raw:
+        return None
+    ts, note_hex = raw.split("|", 1)
+    # the tie-break id is "" for a position between timestamps, otherwise a note id
+    return datetime.fromisoformat(ts), note_hex and models.parse_uuid_hex(note_hex)
+
+
+def encode_sync_watermark(changed: SyncPosition, deleted: SyncPosition) -> str:
+    raw = f"{_encode_position(changed)};{_encode_position(deleted)}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_sync_watermark(token: str) -> Tuple[SyncPosition, SyncPosition]:
+    """
+    Inverse of encode_sync_watermark. Raises ValueError for anything malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        changed, deleted = raw.split(";")
+        return _decode_position(changed), _decode_position(deleted)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("invalid watermark") from e
+
+
+# strong ETags for notes: a single note is tagged with its version counter, the list with a hash of an aggregate
+
+
+def _etag(*parts) -> str:
+    raw = "|".join("" if p is None else str(p) for p in parts).encode()
+    return '"' + hashlib.blake2b(raw, digest_size=16).hexdigest() + '"'
+
+
+def note_etag(version: int) -> str:
+    # ETags are per resource, so the note's version alone identifies its representation
+    return f'"{version}"'
 
 
-def uuid_str_to_bin(u: str) -> bytes:
-    return uuid.UUID(u).bytes
+def parse_note_etag(etag: str) -> Optional[int]:
+    """Version of a note_etag() value, or None for any other tag (W/ tags included)."""
+    if len(etag) > 2 and etag[0] == etag[-1] == '"' and etag[1:-1].isdigit():
+        return int(etag[1:-1])
+    return None
+
+
+def notes_list_etag(
+    user_id: str, version: Tuple[int, Optional[datetime]], limit: int, cursor: Optional[str], view: str = "full"
+) -> str:
+    """
+    ETag of one page of the notes list. `version` is get_notes_version(); any create, update
+    or delete of the user's notes changes it, so every page is revalidated after a write.
+    The full and summary views of a page are different representations and get different tags.
+    """
+    count, last_update = version
+    return _etag(user_id, count, last_update.isoformat() if last_update else None, limit, cursor, view)
 
 
 # Users
 
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed = auth.get_password_hash(user.password)
-    u = models.User(user_name=user.user_name, user_email=user.user_email, password_hash=hashed)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: Optional[str] = None):
+    # callers on the event loop hash in the worker pool and pass the result in
+    hashed = hashed_password if hashed_password is not None else auth.get_password_hash(user.password)
+    u = models.User(user_id=models.gen_uuid_hex(), user_name=user.user_name, user_email=user.user_email, password_hash=hashed)
     db.add(u)
+    placement = None
+    if shard_map.enabled:
+        # the new user's notes go to the shard their id hashes to, recorded in the same transaction
+        placement = Placement(shard_map.assign(u.user_id))
+        db.add(models.UserShard(user_id=u.user_id, shard=placement.shard))
     db.commit()
     db.refresh(u)
+    read_router.pin(u.user_id)
+    if placement is not None:
+        shard_map.directory.set(u.user_id, placement)
     return u
 
 
@@ -32,61 +125,439 @@ def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.user_email == email).first()
 
 
-def get_user_by_id(db: Session, user_id_bin: bytes):
-    return db.query(models.User).filter(models.User.user_id == user_id_bin).first()
+def get_user_by_id(db: Session, user_id: str):
+    return db.query(models.User).filter(models.User.user_id == user_id).first()
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    """
+    Drop a user from the auth cache whenever its row is updated or deleted.
+    """
+    user_cache.invalidate(target.user_id)
+
+
+# Revoked access tokens (app.revocation keeps them in memory; nothing here runs per request)
+
+
+def revoke_token(db: Session, jti: str, user_id: str, expires_on: Optional[datetime]) -> None:
+    """
+    Record a token as revoked and commit. Revoking it again is a no-op.
+    """
+    try:
+        db.execute(insert(models.RevokedToken), {"jti": jti, "user_id": user_id, "expires_on": expires_on})
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+
+
+def get_revoked_tokens(db: Session, revoked_since: Optional[datetime] = None) -> List[Tuple[str, datetime]]:
+    """
+    (jti, revoked_on) of tokens revoked at or after `revoked_since` (all when None) that have
+    not expired yet.
+    """
+    t = models.RevokedToken.__table__.c
+    q = select(t.jti, t.revoked_on).where(or_(t.expires_on.is_(None), t.expires_on > datetime.utcnow()))
+    if revoked_since is not None:
+        q = q.where(t.revoked_on >= revoked_since)
+    return db.execute(q).all()
+
+
+def purge_expired_revocations(db: Session) -> int:
+    """
+    Delete revocations of tokens past their expiry (they are rejected as expired anyway) and commit.
+    """
+    result = db.execute(delete(models.RevokedToken.__table__).where(models.RevokedToken.expires_on <= datetime.utcnow()))
+    db.commit()
+    return result.rowcount
 
 
 # Notes
 
 
-def create_note(db: Session, user_id_bin: bytes, note_in: schemas.NoteCreate):
-    n = models.Note(user_id=user_id_bin, note_title=note_in.note_title, note_content=note_in.note_content)
+def _after_note_write(user_id: str) -> None:
+    """After a committed write to the user's notes: drop their cached pages, keep their reads on the primary."""
+    notes_list_cache.invalidate_user(user_id)
+    read_router.pin(user_id)
+
+
+def create_note(db: Session, user_id: str, note_in: schemas.NoteCreate):
+    n = models.Note(user_id=user_id, note_title=note_in.note_title, note_content=note_in.note_content)
     db.add(n)
     db.commit()
     db.refresh(n)
+    search_backend.index_note(n)
+    _after_note_write(user_id)
     return n
 
 
-def get_notes_by_user(db: Session, user_id_bin: bytes, limit: int = 50, offset: int = 0):
-    return db.query(models.Note).filter(models.Note.user_id == user_id_bin).order_by(models.Note.created_on.desc()).offset(offset).limit(limit).all()
+def new_note_row(user_id: str, note_in: schemas.NoteCreate) -> dict:
+    """Column values of a note about to be inserted, as create_note would set them."""
+    now = datetime.utcnow()
+    return {
+        "note_id": models.gen_uuid_hex(),
+        "user_id": user_id,
+        "note_title": note_in.note_title,
+        "note_content": note_in.note_content,
+        "created_on": now,
+        "last_update": now,
+        "version": 1,
+    }
 
 
-def get_note_by_id(db: Session, note_id_bin: bytes, user_id_bin: bytes):
-    return db.query(models.Note).filter(models.Note.note_id == note_id_bin, models.Note.user_id == user_id_bin).first()
+def insert_note_rows(db: Session, rows: List[dict]) -> List[Union[models.Note, Exception]]:
+    """
+    Insert notes, possibly of many users, in one transaction (group commit, app.group_commit):
+    one executemany INSERT, one COMMIT. If the shared INSERT fails, the rows are retried one
+    by one under savepoints, so a bad row fails alone and the others still commit.
+    Returns, per row, the new note (a transient Note) or the exception that row raised.
+    """
+    results: List[Union[models.Note, Exception]] = [None] * len(rows)
+    try:
+        db.execute(insert(models.Note), rows)
+    except SQLAlchemyError:
+        db.rollback()
+        for i, row in enumerate(rows):
+            try:
+                with db.begin_nested():
+                    db.execute(insert(models.Note), row)
+            except SQLAlchemyError as exc:
+                results[i] = exc
+    db.commit()
 
+    written = set()
+    for i, row in enumerate(rows):
+        if results[i] is None:
+            results[i] = note = models.Note(**row)
+            search_backend.index_note(note)
+            written.add(row["user_id"])
+    for user_id in written:
+        _after_note_write(user_id)
+    return results
 
 
+def get_notes_by_user(
+    db: Session, user_id: str, limit: int = 50, after: Optional[Tuple[datetime, str]] = None, view: str = "full"
+):
+    """
+    Newest-first page of a user's notes as plain Core rows (no ORM instances), using keyset pagination.
+    - `after` is the (created_on, note_id) of the last note on the previous page
+    - served by the notes(user_id, created_on, note_id) index, so deep pages cost the same as the first
+    - view="summary" selects a bounded `snippet` instead of note_content (see note_rows_query)
+    """
+    q = note_rows_query(user_id, view)
+    if after is not None:
+        created_on, note_id = after
+        n = models.Note.__table__.c
+        q = q.where(
+            or_(
+                n.created_on < created_on,
+                and_(n.created_on == created_on, n.note_id < note_id),
+            )
+        )
+    return db.execute(q.limit(limit)).all()
+
+
+def get_note_by_id(db: Session, note_id: str, user_id: str):
+    return db.query(models.Note).filter(models.Note.note_id == note_id, models.Note.user_id == user_id).first()
 
-def delete_note(db: Session, note_obj: models.Note):
-    db.delete(note_obj)
-    db.commit()
 
-def update_note(db: Session, note_obj: models.Note, note_in: schemas.NoteUpdate):
+def get_notes_version(db: Session, user_id: str) -> Tuple[int, Optional[datetime]]:
     """
-    Partially update a Note record.
-    - Only updates fields provided (non-None)
-    - Updates last_update timestamp
-    - Commits and refreshes
+    (number of notes, newest last_update) for a user, answered from the notes(user_id, last_update)
+    index without reading any note rows. Used to build list ETags (notes_list_etag), so it relies
+    on last_update keeping microseconds (DATETIME(6) on MySQL; init_db.upgrade_schema widens
+    columns from older versions).
     """
-    if note_in.note_title is not None:
-        note_obj.note_title = note_in.note_title.strip()
+    count, last_update = (
+        db.query(func.count(), func.max(models.Note.last_update)).filter(models.Note.user_id == user_id).one()
+    )
+    return count, last_update
 
-    if note_in.note_content is not None:
-        note_obj.note_content = note_in.note_content
 
-    # Always update last_update timestamp
-    note_obj.last_update = datetime.utcnow()
+def get_note_version(db: Session, note_id: str, user_id: str):
+    """
+    (found, version) of one of the user's notes, for ETag checks without loading the note.
+    """
+    row = (
+        db.query(models.Note.version)
+        .filter(models.Note.note_id == note_id, models.Note.user_id == user_id)
+        .first()
+    )
+    return (False, None) if row is None else (True, row[0])
+
 
-    db.add(note_obj)
+def note_rows_query(user_id: str, view: str = "full"):
+    """
+    Core SELECT of all of a user's notes as plain rows, newest first (uses the keyset index).
+    With view="summary" the full note_content is never sent by the database: the row has a
+    `snippet` column instead, the first NOTE_SNIPPET_LENGTH + 1 characters (the extra one
+    tells serialize.note_summary_dicts whether the content was cut). Compressed values
+    (app.compression) cannot be cut in SQL and come back whole, decoded, to be cut there.
+    """
+    n = models.Note.__table__.c
+    if view == "summary":
+        content = type_coerce(
+            case(
+                (func.substr(n.note_content, 1, 1) == compression.MARKER, n.note_content),
+                else_=func.substr(n.note_content, 1, settings.NOTE_SNIPPET_LENGTH + 1),
+            ),
+            models.Note.note_content.type,
+        ).label("snippet")
+    else:
+        content = n.note_content
+    return (
+        select(n.note_id, n.user_id, n.note_title, content, n.created_on, n.last_update)
+        .where(n.user_id == user_id)
+        .order_by(n.created_on.desc(), n.note_id.desc())
+    )
+
+
+def _after(ts_col, id_col, pos: Tuple[datetime, str]):
+    ts, note_id = pos
+    return or_(ts_col > ts, and_(ts_col == ts, id_col > note_id))
+
+
+def _next_position(since: SyncPosition, rows: list, limit: int, cutoff: Tuple[datetime, str]) -> SyncPosition:
+    if len(rows) > limit:
+        return tuple(rows[limit - 1])  # more follow: continue right after the last row returned
+    pos = tuple(rows[-1]) if rows else since
+    # complete: stop at the grace cutoff, so recent rows are returned again next time
+    return cutoff if pos is None or pos > cutoff else pos
+
+
+def get_note_changes(
+    db: Session, user_id: str, changed_after: SyncPosition, deleted_after: SyncPosition, limit: int = 500
+) -> dict:
+    """
+    One round of incremental sync for a user, oldest change first:
+    - `changed`: notes (plain rows) created or updated after `changed_after`
+    - `deleted`: (note_id, deleted_on) tombstones after `deleted_after`; none on a first sync
+      (changed_after is None), whose client has nothing to delete yet
+    - `positions`: (changed, deleted) positions for the next watermark
+    - `has_more`: `limit` was reached for either kind; sync again with the new watermark
+    Both are index range scans, notes(user_id, last_update) and note_tombstones(user_id,
+    deleted_on, note_id), so the cost follows the number of changes, not of notes.
+
+    Positions do not move past now - SYNC_GRACE_SECONDS once everything was returned: a write
+    stamped before, but committed after, one that was already synced is still picked up.
+    Clients apply changes idempotently, so getting a recent change twice is harmless.
+    """
+    cutoff = (datetime.utcnow() - timedelta(seconds=settings.SYNC_GRACE_SECONDS), "")
+
+    n = models.Note.__table__.c
+    q = note_rows_query(user_id).order_by(None).order_by(n.last_update, n.note_id)
+    if changed_after is not None:
+        q = q.where(_after(n.last_update, n.note_id, changed_after))
+    changed = db.execute(q.limit(limit + 1)).all()
+
+    deleted = []
+    if changed_after is not None:
+        t = models.NoteTombstone.__table__.c
+        q = select(t.deleted_on, t.note_id).where(t.user_id == user_id).order_by(t.deleted_on, t.note_id)
+        if deleted_after is not None:
+            q = q.where(_after(t.deleted_on, t.note_id, deleted_after))
+        deleted = db.execute(q.limit(limit + 1)).all()
+
+    return {
+        "changed": changed[:limit],
+        "deleted": deleted[:limit],
+        "positions": (
+            _next_position(changed_after, [(r.last_update, r.note_id) for r in changed], limit, cutoff),
+            _next_position(deleted_after, deleted, limit, cutoff) if changed_after is not None else cutoff,
+        ),
+        "has_more": len(changed) > limit or len(deleted) > limit,
+    }
+
+
+def iter_note_rows(db: Session, user_id: str, batch_size: int = 1000) -> Iterator[list]:
+    """
+    Yield a user's notes in lists of up to `batch_size` rows.
+    yield_per streams from a server-side cursor (SSCursor on PyMySQL), so only one batch is held in memory.
+    """
+    result = db.execute(note_rows_query(user_id).execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        yield partition
+
+
+def search_notes(db: Session, user_id: str, query: str, limit: int = 20):
+    """
+    Relevance-ranked (note, score) pairs for the user's notes matching `query`.
+    See search.py for the available backends.
+    """
+    return search_backend.search(db, user_id, query, limit=limit)
+
+
+
+
+def _note_returning_columns():
+    n = models.Note.__table__.c
+    return (n.note_id, n.user_id, n.note_title, n.note_content, n.created_on, n.last_update, n.version)
+
+
+def update_note(
+    db: Session, note_id: str, user_id: str, note_in: schemas.NoteUpdate, expected_versions: Optional[Set[int]] = None
+):
+    """
+    Partially update one of the user's notes with a single ownership-scoped UPDATE and commit.
+    - only fields provided (non-None) change; last_update is set and version incremented
+    - `expected_versions`: only apply the update while the note's version is one of these (If-Match)
+    - the updated note comes back from UPDATE ... RETURNING where the database supports it
+      (SQLite, MariaDB does not); MySQL reads it back in the same transaction instead
+    Returns the updated note as a row, or None when nothing matched: no such note for the user,
+    or a version not in `expected_versions` (get_note_version tells the two apart).
+    """
+    t = models.Note.__table__
+    values = {"last_update": datetime.utcnow(), "version": t.c.version + 1}
+    if note_in.note_title is not None:
+        values["note_title"] = note_in.note_title.strip()
+    if note_in.note_content is not None:
+        values["note_content"] = note_in.note_content
+
+    stmt = update(t).where(t.c.note_id == note_id, t.c.user_id == user_id).values(values)
+    if expected_versions is not None:
+        stmt = stmt.where(t.c.version.in_(expected_versions))
+
+    if db.get_bind(clause=stmt).dialect.update_returning:  # the notes' shard, with note shards
+        note = db.execute(stmt.returning(*_note_returning_columns())).first()
+    elif db.execute(stmt).rowcount:
+        note = db.execute(select(*_note_returning_columns()).where(t.c.note_id == note_id)).first()
+    else:
+        note = None
+    if note is None:
+        return None
     db.commit()
-    db.refresh(note_obj)
+    search_backend.index_note(note)
+    _after_note_write(user_id)
+    return note
+
+
+def delete_note(db: Session, note_id: str, user_id: str) -> bool:
+    """
+    Permanently delete one of the user's notes with a single ownership-scoped DELETE, leave a
+    tombstone for sync clients, and commit. Returns False when the user has no such note.
 
-    return note_obj
+    Three round-trips (DELETE, tombstone INSERT, COMMIT) against four for load-then-delete:
+    short of halving them. Neither MySQL nor SQLite can insert rows from a DELETE in one
+    statement, and the tombstone must commit with the delete for sync to stay exact.
+    """
+    now = datetime.utcnow()
+    result = db.execute(
+        delete(models.Note.__table__).where(models.Note.note_id == note_id, models.Note.user_id == user_id)
+    )
+    if not result.rowcount:
+        return False
+    db.execute(insert(models.NoteTombstone), {"note_id": note_id, "user_id": user_id, "deleted_on": now})
+    db.commit()
+    search_backend.remove_note(note_id, user_id)
+    _after_note_write(user_id)
+    return True
 
 
-def delete_note(db: Session, note_obj: models.Note) -> None:
+def apply_note_batch(db: Session, user_id: str, ops: List[schemas.NoteBatchOp]) -> List[dict]:
     """
-    Permanently delete the given note_obj and commit.
+    Apply a list of create/update/delete operations for one user in a single transaction.
+    - ownership of every referenced note is checked with one query
+    - writes go out as executemany-style bulk INSERT / UPDATE and one DELETE ... IN
+    - commits once
+    Returns one result dict per operation, in order. Invalid or not-found operations get a
+    400/404 result and are skipped without affecting the rest of the batch.
     """
-    db.delete(note_obj)
-    db.commit()
\ No newline at end of file
+    results: List[dict] = []
+    referenced = {}
+    for i, op in enumerate(ops):
+        if op.op == "create":
+            continue
+        if not op.note_id:
+            continue
+        try:
+            referenced[i] = models.parse_uuid_hex(op.note_id)
+        except ValueError:
+            pass
+
+    owned = set()
+    if referenced:
+        owned = {
+            nid
+            for (nid,) in db.query(models.Note.note_id).filter(
+                models.Note.user_id == user_id, models.Note.note_id.in_(set(referenced.values()))
+            )
+        }
+
+    now = datetime.utcnow()
+    creates: List[dict] = []
+    updates = {}  # note_id -> merged values, in first-seen order
+    deletes: List[str] = []
+
+    for i, op in enumerate(ops):
+        result = {"index": i, "op": op.op, "status": 400, "note_id": op.note_id, "detail": None}
+        results.append(result)
+
+        if op.op == "create":
+            if op.note_id is not None:
+                result["detail"] = "note_id is assigned by the server on create"
+                continue
+            note_id = models.gen_uuid_hex()
+            creates.append({
+                "note_id": note_id,
+                "user_id": user_id,
+                "note_title": op.note_title,
+                "note_content": op.note_content,
+                "created_on": now,
+                "last_update": now,
+            })
+            result.update(status=201, note_id=note_id)
+            continue
+
+        if i not in referenced:
+            result["detail"] = "note_id must be a valid UUID"
+            continue
+        note_id = referenced[i]
+        if note_id not in owned:
+            result.update(status=404, detail="Note not found.")
+            continue
+        result["note_id"] = note_id
+
+        if op.op == "update":
+            values = updates.setdefault(note_id, {"note_id": note_id, "last_update": now})
+            if op.note_title is not None:
+                values["note_title"] = op.note_title.strip()
+            if op.note_content is not None:
+                values["note_content"] = op.note_content
+            result["status"] = 200
+        else:
+            owned.discard(note_id)  # later ops on this note see it as gone
+            updates.pop(note_id, None)
+            deletes.append(note_id)
+            result["status"] = 204
+
+    if creates:
+        db.execute(insert(models.Note), creates)
+    # executemany UPDATE by primary key, bumping each note's version; rows are grouped by
+    # the set of columns they change
+    by_columns = {}
+    for values in updates.values():
+        by_columns.setdefault(tuple(sorted(values)), []).append(values)
+    t = models.Note.__table__
+    for columns, rows in by_columns.items():
+        stmt = (
+            update(t)
+            .where(t.c.note_id == bindparam("b_note_id"))
+            .values({**{c: bindparam(f"b_{c}") for c in columns if c != "note_id"}, "version": t.c.version + 1})
+        )
+        db.execute(stmt, [{f"b_{c}": v for c, v in row.items()} for row in rows])
+    if deletes:
+        db.execute(delete(models.Note).where(models.Note.user_id == user_id, models.Note.note_id.in_(deletes)))
+        db.execute(
+            insert(models.NoteTombstone),
+            [{"note_id": note_id, "user_id": user_id, "deleted_on": now} for note_id in deletes],
+        )
+    db.commit()
+    if creates or updates or deletes:
+        _after_note_write(user_id)
+
+    for note_id in deletes:
+        search_backend.remove_note(note_id, user_id)
+    search_backend.reindex_notes(db, user_id, [r["note_id"] for r in creates] + list(updates))
+    return results
@@ -0,0 +1,108 @@
+"""
+Async counterparts of the database functions in crud.py.
+
+Every function accepts whatever deps.get_db yielded:
+  - AsyncSession (DB_ASYNC=true): the crud function runs through AsyncSession.run_sync,
+    so its queries go over the asyncio driver (aiomysql / aiosqlite) without blocking the loop.
+  - Session (default): the crud function runs in Starlette's threadpool, as the sync routes did.
+
+Keeping the query logic in crud.py means both paths always execute the same SQL.
+"""
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Set, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from . import crud, schemas
+from .database import AnySession
+
+
+async def _run(db: AnySession, fn, *args, **kwargs):
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+# Users
+
+
+async def create_user(db: AnySession, user: schemas.UserCreate, hashed_password: Optional[str] = None):
+    return await _run(db, crud.create_user, user, hashed_password=hashed_password)
+
+
+async def get_user_by_email(db: AnySession, email: str):
+    return await _run(db, crud.get_user_by_email, email)
+
+
+async def get_user_by_id(db: AnySession, user_id: str):
+    return await _run(db, crud.get_user_by_id, user_id)
+
+
+async def revoke_token(db: AnySession, jti: str, user_id: str, expires_on: Optional[datetime]) -> None:
+    await _run(db, crud.revoke_token, jti, user_id, expires_on)
+
+
+# Notes
+
+
+async def create_note(db: AnySession, user_id: str, note_in: schemas.NoteCreate):
+    return await _run(db, crud.create_note, user_id, note_in)
+
+
+async def insert_note_rows(db: AnySession, rows: List[dict]) -> list:
+    return await _run(db, crud.insert_note_rows, rows)
+
+
+async def get_notes_by_user(
+    db: AnySession, user_id: str, limit: int = 50, after: Optional[Tuple[datetime, str]] = None, view: str = "full"
+):
+    return await _run(db, crud.get_notes_by_user, user_id, limit=limit, after=after, view=view)
+
+
+async def get_note_by_id(db: AnySession, note_id: str, user_id: str):
+    return await _run(db, crud.get_note_by_id, note_id, user_id)
+
+
+async def get_notes_version(db: AnySession, user_id: str) -> Tuple[int, Optional[datetime]]:
+    return await _run(db, crud.get_notes_version, user_id)
+
+
+async def get_note_version(db: AnySession, note_id: str, user_id: str):
+    return await _run(db, crud.get_note_version, note_id, user_id)
+
+
+async def get_note_changes(
+    db: AnySession, user_id: str, changed_after: crud.SyncPosition, deleted_after: crud.SyncPosition, limit: int = 500
+) -> dict:
+    return await _run(db, crud.get_note_changes, user_id, changed_after, deleted_after, limit=limit)
+
+
+async def iter_note_rows(db: AnySession, user_id: str, batch_size: int = 1000) -> AsyncIterator[list]:
+    """
+    Async counterpart of crud.iter_note_rows. Generators can't go through run_sync, so an
+    AsyncSession streams with AsyncSession.stream and a Session is iterated in the threadpool.
+    """
+    if isinstance(db, AsyncSession):
+        result = await db.stream(crud.note_rows_query(user_id).execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            yield partition
+        return
+    async for partition in iterate_in_threadpool(crud.iter_note_rows(db, user_id, batch_size=batch_size)):
+        yield partition
+
+
+async def search_notes(db: AnySession, user_id: str, query: str, limit: int = 20):
+    return await _run(db, crud.search_notes, user_id, query, limit=limit)
+
+
+async def update_note(
+    db: AnySession, note_id: str, user_id: str, note_in: schemas.NoteUpdate, expected_versions: Optional[Set[int]] = None
+):
+    return await _run(db, crud.update_note, note_id, user_id, note_in, expected_versions=expected_versions)
+
+
+async def delete_note(db: AnySession, note_id: str, user_id: str) -> bool:
+    return await _run(db, crud.delete_note, note_id, user_id)
+
+
+async def apply_note_batch(db: AnySession, user_id: str, ops: List[schemas.NoteBatchOp]) -> List[dict]:
+    return await _run(db, crud.apply_note_batch, user_id, ops)
@@ -1,13 +1,288 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import threading
+import time
+from typing import Dict, List, Optional, Union
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DisconnectionError
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from .config import settings
+from . import metrics
 
 
-DATABASE_URL = (
+DATABASE_URL = settings.DATABASE_URL or (
 f"mysql+pymysql://{settings.MYSQL_USER}:{settings.MYSQL_PASSWORD}@{settings.MYSQL_HOST}:{settings.MYSQL_PORT}/{settings.MYSQL_DB}"
 )
 
+# sync driver -> asyncio driver for the same database
+_ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True, pool_size=10, max_overflow=20)
+
+def to_async_url(url: str) -> str:
+    u = make_url(url)
+    return u.set(drivername=_ASYNC_DRIVERS.get(u.drivername, u.drivername)).render_as_string(hide_password=False)
+
+
+def timed_pool_class(base, name: str):
+    """
+    Subclass of a queue pool that reports how long each checkout waited (metrics.POOL_WAIT).
+    The name is a class attribute so it survives pool.recreate() on engine.dispose().
+    """
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return base._do_get(self)
+        finally:
+            metrics.record_pool_wait(time.perf_counter() - start, self.metrics_name)
+
+    return type(f"Timed{base.__name__}", (base,), {"metrics_name": name, "_do_get": _do_get})
+
+
+_PRE_PING_POLICIES = ("idle", "always", "never")
+
+
+def _engine_kwargs(url: str, is_async: bool = False, name: str = "primary") -> dict:
+    u = make_url(url)
+    pool_base = AsyncAdaptedQueuePool if is_async else QueuePool
+    pool = {
+        "poolclass": timed_pool_class(pool_base, name),
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if u.get_backend_name() == "sqlite":
+        # SQLite stand-in: connections are shared across the threadpool
+        kwargs = {"connect_args": {"check_same_thread": False}}
+        if u.database not in (None, "", ":memory:"):  # file databases use a queue pool too
+            kwargs.update(pool)
+        return kwargs
+    if settings.DB_POOL_PRE_PING not in _PRE_PING_POLICIES:
+        raise ValueError(f"Unknown DB_POOL_PRE_PING {settings.DB_POOL_PRE_PING!r}; expected one of {', '.join(_PRE_PING_POLICIES)}")
+    return {"pool_pre_ping": settings.DB_POOL_PRE_PING == "always", **pool}
+
+
+_LAST_USED = "unote_last_used"
+
+
+def install_idle_ping(sync_engine, idle_seconds: float) -> None:
+    """
+    Ping a connection on checkout only when it sat idle in the pool for more than idle_seconds,
+    instead of on every checkout (pool_pre_ping). A connection that fails the ping is
+    replaced before the request sees it. Pass AsyncEngine.sync_engine for the async engine.
+    """
+    dialect = sync_engine.dialect
+    name = getattr(sync_engine.pool, "metrics_name", "default")
+
+    def _fresh(dbapi_connection, record):
+        record.info[_LAST_USED] = time.monotonic()
+
+    def _checkout(dbapi_connection, record, proxy):
+        last = record.info.get(_LAST_USED)
+        if last is None or time.monotonic() - last <= idle_seconds:
+            return
+        try:
+            dialect.do_ping(dbapi_connection)
+        except Exception as exc:
+            metrics.POOL_PINGS.inc((name, "failed"))
+            # the pool discards this connection and checks out another
+            raise DisconnectionError() from exc
+        metrics.POOL_PINGS.inc((name, "ok"))
+
+    event.listen(sync_engine, "connect", _fresh)
+    event.listen(sync_engine, "checkin", _fresh)
+    event.listen(sync_engine, "checkout", _checkout)
+
+
+def configure_engine(sync_engine) -> None:
+    """Metrics hooks, and the idle-time liveness check on server databases."""
+    metrics.install_engine_hooks(sync_engine)
+    if settings.DB_POOL_PRE_PING == "idle" and sync_engine.dialect.name != "sqlite":
+        install_idle_ping(sync_engine, settings.DB_POOL_PING_IDLE_SECONDS)
+
+
+def _warmup_count(sync_engine, n: int) -> int:
+    return min(n, sync_engine.pool.size()) if isinstance(sync_engine.pool, QueuePool) else 0
+
+
+def warm_up(sync_engine, n: int) -> int:
+    """Open up to n connections (at most the pool size) and leave them idle in the pool. Blocking."""
+    conns = []
+    try:
+        for _ in range(_warmup_count(sync_engine, n)):
+            conns.append(sync_engine.connect())
+    finally:
+        for conn in conns:
+            conn.close()
+    return len(conns)
+
+
+async def warm_up_async(async_engine, n: int) -> int:
+    """warm_up() for an AsyncEngine."""
+    conns = []
+    try:
+        for _ in range(_warmup_count(async_engine.sync_engine, n)):
+            conns.append(await async_engine.connect())
+    finally:
+        for conn in conns:
+            await conn.close()
+    return len(conns)
+
+
+def pool_stats(sync_engine) -> dict:
+    """Connections of one engine's pool right now, and its checkout wait so far (metrics.POOL_WAIT)."""
+    pool = sync_engine.pool
+    name = getattr(pool, "metrics_name", None)
+    stats = {"pool": name or type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=max(0, pool.overflow()),
+            max_overflow=pool._max_overflow,
+        )
+    if name is not None:
+        count, total = metrics.POOL_WAIT.totals((name,))
+        stats.update(checkouts=count, wait_seconds_total=total, wait_ms_mean=(total / count * 1000) if count else 0.0)
+    return stats
+
+
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or to_async_url(DATABASE_URL)
+
+
+engine = create_engine(DATABASE_URL, **_engine_kwargs(DATABASE_URL))
+configure_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+# asyncio engine, only built when DB_ASYNC is enabled
+async_engine = (
+    create_async_engine(ASYNC_DATABASE_URL, **_engine_kwargs(ASYNC_DATABASE_URL, is_async=True, name="primary_async"))
+    if settings.DB_ASYNC else None
+)
+if async_engine is not None:
+    configure_engine(async_engine.sync_engine)
+AsyncSessionLocal = (
+    async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False) if async_engine is not None else None
+)
+
+# what deps.get_db hands to routes, depending on DB_ASYNC
+AnySession = Union[Session, AsyncSession]
+
+
+# -----------------------
+# Read replicas
+# -----------------------
+
+
+class Replica:
+    """One read replica: its engines and session factories, like the primary's above."""
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.url = url
+        self.engine = create_engine(url, **_engine_kwargs(url, name=name))
+        configure_engine(self.engine)
+        self.session = sessionmaker(autocommit=False, autoflush=False, bind=self.engine, info={"replica": name})
+        self.async_engine = None
+        self.async_session = None
+        if settings.DB_ASYNC:
+            async_url = to_async_url(url)
+            self.async_engine = create_async_engine(async_url, **_engine_kwargs(async_url, is_async=True, name=f"{name}_async"))
+            configure_engine(self.async_engine.sync_engine)
+            self.async_session = async_sessionmaker(
+                bind=self.async_engine, autoflush=False, expire_on_commit=False, info={"replica": name}
+            )
+        self.down_until = 0.0  # time.monotonic() before which the replica is skipped
+
+
+class ReadRouter:
+    """
+    Chooses where read-only routes (deps.get_read_db) run:
+      - nowhere but the primary without replicas, or for a user pinned by a recent write;
+        crud pins the user after every committed write, for READ_YOUR_WRITES_SECONDS, so
+        their reads cannot come from a replica that has not caught up yet
+      - otherwise the healthy replicas in turn; one that fails to connect is skipped for
+        REPLICA_RETRY_SECONDS (mark_down), and the primary serves when none is left
+
+    Pins and health are per process: with several workers, a write pins its user only in
+    the worker that served it. The client carries the pin to the other workers in a signed
+    cookie (app.read_your_writes), which get_read_db passes to choose() as `pinned`. Keep the
+    pin window above the replicas' usual lag.
+    """
+
+    def __init__(self, replicas: List[Replica], pin_seconds: float, retry_seconds: float):
+        self.replicas = replicas
+        self.pin_seconds = pin_seconds
+        self.retry_seconds = retry_seconds
+        self._pins: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._next = 0
+
+    def pin(self, user_id: str) -> None:
+        if not self.replicas:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._pins) >= 10000:
+                self._pins = {u: t for u, t in self._pins.items() if t > now}
+            self._pins[user_id] = now + self.pin_seconds
+
+    def is_pinned(self, user_id: Optional[str]) -> bool:
+        until = self._pins.get(user_id)
+        return until is not None and until > time.monotonic()
+
+    def choose(self, user_id: Optional[str], pinned: bool = False) -> Optional[Replica]:
+        """A healthy replica for this user's reads, or None for the primary (always when pinned)."""
+        if not self.replicas or pinned or self.is_pinned(user_id):
+            return None
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[self._next % len(self.replicas)]
+            self._next += 1
+            if replica.down_until <= now:
+                return replica
+        return None
+
+    def mark_down(self, replica: Replica) -> None:
+        replica.down_until = time.monotonic() + self.retry_seconds
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {r.name: r.down_until <= now for r in self.replicas}
+
+    def dispose(self) -> None:
+        for replica in self.replicas:
+            replica.engine.dispose()
+
+    async def dispose_async(self) -> None:
+        for replica in self.replicas:
+            if replica.async_engine is not None:
+                await replica.async_engine.dispose()
+
+
+REPLICA_URLS = [u.strip() for u in settings.DATABASE_REPLICA_URLS.split(",") if u.strip()]
+read_router = ReadRouter(
+    [Replica(f"replica{i}", url) for i, url in enumerate(REPLICA_URLS)],
+    settings.READ_YOUR_WRITES_SECONDS,
+    settings.REPLICA_RETRY_SECONDS,
+)
+
+
+def all_sync_engines() -> list:
+    """Every engine (the sync side of async ones), for pool reporting."""
+    engines = [engine] + ([async_engine.sync_engine] if async_engine is not None else [])
+    for replica in read_router.replicas:
+        engines.append(replica.engine)
+        if replica.async_engine is not None:
+            engines.append(replica.async_engine.sync_engine)
+    from .sharding import shard_map  # imports the models, which import this module
+
+    return engines + shard_map.engines()
@@ -1,10 +1,18 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from .database import SessionLocal
-from . import crud, auth
-import uuid
+from typing import Optional
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from .config import settings
+from .database import SessionLocal, AsyncSessionLocal, AnySession, Replica, read_router
+from . import crud_async, auth
+from .cache import user_cache
+from .models import parse_uuid_hex
+from .read_your_writes import PIN_COOKIE, cookie_pins
+from .revocation import revoked_tokens
+from .sharding import Placement, shard_map
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
@@ -13,59 +21,158 @@ bearer = HTTPBearer()  # this reads Authorization: Bearer <token>
 # DB session dependency
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def _new_session(replica: Optional[Replica] = None, placement: Optional[Placement] = None) -> AnySession:
+    if placement is not None:
+        return shard_map.open_session(placement, replica)
+    if settings.DB_ASYNC:
+        return (replica.async_session if replica else AsyncSessionLocal)()
+    return (replica.session if replica else SessionLocal)()
 
 
-# helper to convert uuid hex strings to bin and vice versa
-
-
-def hex_to_bin(hex_id: str) -> bytes:
-    return uuid.UUID(hex=hex_id).bytes
+async def _close(db: AnySession) -> None:
+    if isinstance(db, AsyncSession):
+        await db.close()
+    else:
+        # close() may roll back on the connection; keep that off the event loop
+        await run_in_threadpool(db.close)
 
 
+async def _placement(user_hex) -> Optional[Placement]:
+    """Note shard of a user, or None without shards (or without a usable user id)."""
+    if not shard_map.enabled:
+        return None
+    try:
+        user_id = parse_uuid_hex(user_hex)
+    except (AttributeError, TypeError, ValueError):
+        return None
+    return await shard_map.locate_async(user_id)
+
+
+def _token_subject(request: Request) -> Optional[str]:
+    """The sub claim of a decodable bearer token; for picking a shard only, nothing is verified beyond that."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    decoded = request.scope.get("state", {}).get("token_payload")
+    payload = decoded[1] if decoded is not None and decoded[0] == token else auth.decode_access_token(token)
+    return payload.get("sub") if payload else None
+
+
+async def get_db(request: Request):
+    """
+    Yield an AsyncSession when DB_ASYNC is enabled, otherwise a regular Session, on the primary.
+    With note shards, the note tables are on the shard of the bearer token's user (app.sharding).
+    Routes go through crud_async, which accepts either.
+    """
+    placement = await _placement(_token_subject(request)) if shard_map.enabled else None
+    db = _new_session(placement=placement)
+    try:
+        yield db
+    finally:
+        await _close(db)
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(bearer),
-    db: Session = Depends(get_db)
-):
-    # DEBUG prints - watch your uvicorn console
-    print(">>> get_current_user called")
-    print(">>> credentials object:", credentials)
 
+async def get_token_payload(request: Request, credentials: HTTPAuthorizationCredentials = Depends(bearer)) -> dict:
+    """
+    Claims of a valid, unrevoked bearer token. The revocation check is in memory (app.revocation).
+    Tokens issued before jti claims were added cannot be revoked and are still accepted.
+    """
     if not credentials:
-        print(">>> no credentials provided")
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
 
-    token = credentials.credentials
-    print(">>> raw token:", token[:20] + "..." if token else None)  # don't print whole token in prod
-
-    # use your existing decode function
-    payload = auth.decode_access_token(token)
-    print(">>> decoded payload:", payload)
-
+    # app.admission already decoded the token to pick its rate-limit bucket
+    decoded = request.scope.get("state", {}).get("token_payload")
+    if decoded is not None and decoded[0] == credentials.credentials:
+        payload = decoded[1]
+    else:
+        payload = auth.decode_access_token(credentials.credentials)
     if not payload:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
 
+    jti = payload.get("jti")
+    if jti is not None:
+        try:
+            revoked = revoked_tokens.is_revoked(jti)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
+        if revoked:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked")
+    return payload
+
+
+async def get_read_db(request: Request, payload: dict = Depends(get_token_payload)):
+    """
+    Session for read-only routes: on a replica chosen by database.read_router, or on the
+    primary when there are none, none is healthy, or the user wrote within READ_YOUR_WRITES_SECONDS
+    (in this process, or in any process for a client sending back the app.read_your_writes cookie).
+    With note shards, the note tables are on the user's shard either way; shards have no replicas.
+    A replica that cannot be connected to is marked down and the next one tried.
+    """
+    user_hex = payload.get("sub")
+    placement = await _placement(user_hex)
+    pinned = bool(read_router.replicas) and cookie_pins(request.cookies.get(PIN_COOKIE), user_hex)
+    replica = read_router.choose(user_hex, pinned)
+    while replica is not None:
+        db = _new_session(replica, placement)
+        try:
+            # check a connection out now, so a dead replica is skipped before the route runs
+            if isinstance(db, AsyncSession):
+                await db.connection()
+            else:
+                await run_in_threadpool(db.connection)
+            break
+        except DBAPIError:
+            await _close(db)
+            read_router.mark_down(replica)
+            replica = read_router.choose(user_hex, pinned)
+    else:
+        db = _new_session(placement=placement)
+
+    try:
+        yield db
+    except DBAPIError as exc:
+        if replica is not None and exc.connection_invalidated:
+            read_router.mark_down(replica)
+        raise
+    finally:
+        await _close(db)
+
+
+async def _load_user(db: AnySession, user_id: str):
+    user = await crud_async.get_user_by_id(db, user_id)
+    if user:
+        # detach so a later commit in this session can't expire the cached instance
+        db.expunge(user)
+    return user
+
+
+async def get_current_user(
+    payload: dict = Depends(get_token_payload),
+    db: AnySession = Depends(get_read_db)
+):
     user_hex = payload.get("sub")
-    print(">>> payload.sub (user_hex):", user_hex)
     if not user_hex:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
 
     try:
-        user_bin = hex_to_bin(user_hex)
-    except Exception as e:
-        print(">>> hex_to_bin failed:", e)
+        user_id = parse_uuid_hex(user_hex)
+    except (AttributeError, ValueError):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid user id in token")
 
-    user = crud.get_user_by_id(db, user_bin)
-    print(">>> user from DB:", bool(user), getattr(user, "user_email", None) if user else None)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    # serve from the in-process user cache when possible, skipping the users-table lookup
+    user = user_cache.get(user_id)
+    if user is None:
+        user = await _load_user(db, user_id)
+        if not user and db.info.get("replica"):
+            # may have signed up on another worker moments ago, before reaching this replica
+            primary = _new_session()
+            try:
+                user = await _load_user(primary, user_id)
+            finally:
+                await _close(primary)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        user_cache.set(user_id, user)
 
     # success
     return user
\ No newline at end of file
@@ -0,0 +1,165 @@
+# app/group_commit.py
+"""
+Group commit for note creation (NOTE_GROUP_COMMIT).
+
+POST /homepage/notes normally costs one INSERT, one COMMIT (one fsync on the database)
+and a refresh SELECT per note. With group commit, concurrent creates are queued in the
+process and written together: one multi-row INSERT and one COMMIT per batch
+(crud.insert_note_rows). Each request still gets its own note back, with the note_id
+generated when it was queued.
+
+One flush runs at a time. The first create after an idle spell waits up to
+NOTE_GROUP_COMMIT_MAX_WAIT_MS for company; creates that arrive while a flush is running
+form the next batch, of at most NOTE_GROUP_COMMIT_MAX_BATCH notes. Past
+NOTE_GROUP_COMMIT_MAX_QUEUE waiting notes, submit() raises GroupCommitSaturated (503).
+
+A note is only acknowledged after its batch committed. A row the database rejects fails
+only its own request.
+
+Flushes use an engine of their own with a single connection: requests waiting for a flush
+hold connections from the main pool, and must not be able to starve the flush of one.
+With note shards (app.sharding), a batch is split by shard, one engine and one INSERT each.
+"""
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+
+from . import crud, crud_async, database, metrics, models, schemas
+from .config import settings
+from .sharding import UserMoving, shard_map
+
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitSaturated(Exception):
+    """Raised when the queue of notes waiting for a group commit is full."""
+
+
+class NoteGroupCommitter:
+    def __init__(self, max_batch: int, max_wait: float, max_queue: int):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self._pending: List[Tuple[dict, Optional[int], asyncio.Future]] = []
+        self._more: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # per note shard (None without shards): sync Engine or AsyncEngine, and its session factory
+        self._engines: Dict[Optional[int], object] = {}
+        self._sessions: Dict[Optional[int], object] = {}
+        self.batches = 0
+        self.notes = 0
+
+    async def submit(self, user_id: str, note_in: schemas.NoteCreate) -> models.Note:
+        """Queue a note for the next group commit and return it once committed."""
+        if len(self._pending) >= self.max_queue:
+            raise GroupCommitSaturated()
+        shard = None
+        if shard_map.enabled:
+            placement = await shard_map.locate_async(user_id)
+            if placement.locked:
+                raise UserMoving()
+            shard = placement.shard
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((crud.new_note_row(user_id, note_in), shard, future))
+        if self._task is None or self._task.done():
+            self._more = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        elif len(self._pending) >= self.max_batch:
+            self._more.set()
+        # the flush goes on if this request is cancelled; the note is committed regardless
+        return await asyncio.shield(future)
+
+    async def _run(self) -> None:
+        while self._pending:
+            if len(self._pending) < self.max_batch and self.max_wait > 0:
+                self._more.clear()
+                try:
+                    await asyncio.wait_for(self._more.wait(), self.max_wait)
+                except asyncio.TimeoutError:
+                    pass
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            parts: Dict[Optional[int], list] = {}
+            for entry in batch:
+                parts.setdefault(entry[1], []).append(entry)
+            done = []
+            for shard, part in parts.items():
+                try:
+                    results = await self._flush(shard, [row for row, _, _ in part])
+                except Exception as exc:
+                    logger.exception("group commit of %d notes failed", len(part))
+                    results = [exc] * len(part)
+                done += [(future, result) for (_, _, future), result in zip(part, results)]
+            self.batches += 1
+            self.notes += len(batch)
+            metrics.GROUP_COMMIT_BATCH.observe(len(batch))
+            for future, result in done:
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _session_factory(self, shard: Optional[int]):
+        if shard not in self._sessions:
+            url = database.DATABASE_URL if shard is None else shard_map.shards[shard].url
+            name = "group_commit" if shard is None else f"group_commit_shard{shard}"
+            if settings.DB_ASYNC:
+                url = database.ASYNC_DATABASE_URL if shard is None else database.to_async_url(url)
+                engine = create_async_engine(url, **_one_connection(database._engine_kwargs(url, is_async=True, name=name)))
+                database.configure_engine(engine.sync_engine)
+                self._sessions[shard] = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+            else:
+                engine = create_engine(url, **_one_connection(database._engine_kwargs(url, name=name)))
+                database.configure_engine(engine)
+                self._sessions[shard] = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            self._engines[shard] = engine
+        return self._sessions[shard]
+
+    async def _flush(self, shard: Optional[int], rows: List[dict]) -> list:
+        Session = self._session_factory(shard)
+        if settings.DB_ASYNC:
+            async with Session() as db:
+                return await crud_async.insert_note_rows(db, rows)
+
+        def flush():
+            with Session() as db:
+                return crud.insert_note_rows(db, rows)
+
+        return await run_in_threadpool(flush)
+
+    async def dispose(self) -> None:
+        engines, self._engines, self._sessions = self._engines, {}, {}
+        for engine in engines.values():
+            if settings.DB_ASYNC:
+                await engine.dispose()
+            else:
+                engine.dispose()
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._pending),
+            "batches": self.batches,
+            "notes": self.notes,
+            "mean_batch": self.notes / self.batches if self.batches else 0.0,
+        }
+
+
+def _one_connection(kwargs: dict) -> dict:
+    if "pool_size" in kwargs:
+        kwargs.update(pool_size=1, max_overflow=0)
+    return kwargs
+
+
+note_committer = NoteGroupCommitter(
+    settings.NOTE_GROUP_COMMIT_MAX_BATCH,
+    settings.NOTE_GROUP_COMMIT_MAX_WAIT_MS / 1000.0,
+    settings.NOTE_GROUP_COMMIT_MAX_QUEUE,
+)
@@ -1,20 +1,79 @@
-import pymysql
-from .config import settings
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+from .database import engine, Base
 
 def init_database():
     """Verify database connection with application user"""
     try:
-        conn = pymysql.connect(
-            host=settings.MYSQL_HOST,
-            port=settings.MYSQL_PORT,
-            user=settings.MYSQL_USER,
-            password=settings.MYSQL_PASSWORD,
-            database=settings.MYSQL_DB
-        )
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
         print("✓ Database connection verified")
-        conn.close()
     except Exception as e:
         print(f"✗ Database connection failed: {e}")
         print("\nRun setup_db.py first to initialize the database:")
         print("python -m app.setup_db")
-        raise e
\ No newline at end of file
+        raise e
+
+
+def _wider_fsp(reflected_type, column, dialect) -> bool:
+    """Whether the model's DATETIME(fsp) keeps more fractional-second digits than the table's column (MySQL)."""
+    wanted = getattr(column.type.dialect_impl(dialect), "fsp", None) or 0
+    return wanted > (getattr(reflected_type, "fsp", None) or 0)
+
+
+def upgrade_schema(bind, metadata) -> None:
+    """
+    Bring tables that already exist up to the models: create_all only creates missing
+    tables, never a column or an index of an existing one. Missing columns are added with
+    ALTER TABLE ... ADD COLUMN, which needs them nullable or with a server default;
+    missing indexes with CREATE INDEX (dialect-specific ones only on their dialect).
+    DATETIME columns created with less precision than the model's (notes.last_update, which
+    list ETags depend on, used to be whole seconds) are widened with MODIFY COLUMN on MySQL.
+    """
+    with bind.begin() as conn:
+        inspector = inspect(conn)
+        preparer = conn.dialect.identifier_preparer
+        for table in metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue  # create_all makes it whole
+            existing = {c["name"]: c for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    if conn.dialect.name == "mysql" and _wider_fsp(existing[column.name]["type"], column, conn.dialect):
+                        ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                        conn.execute(text(f"ALTER TABLE {preparer.format_table(table)} MODIFY COLUMN {ddl}"))
+                        print(f"✓ Widened column {table.name}.{column.name} to {column.type.compile(dialect=conn.dialect)}")
+                    continue
+                if not column.nullable and column.server_default is None:
+                    raise RuntimeError(
+                        f"{table.name}.{column.name} is missing and has no server default; add it by hand"
+                    )
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}"))
+                print(f"✓ Added column {table.name}.{column.name}")
+            indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(conn)  # skipped by ddl_if on other dialects
+                    if index.name in {i["name"] for i in inspect(conn).get_indexes(table.name)}:
+                        print(f"✓ Created index {index.name} on {table.name}")
+
+
+def bootstrap_database():
+    """
+    Verify the connection, create missing tables, columns and indexes (dev convenience).
+    app.main runs this on import unless DB_BOOTSTRAP_ON_IMPORT is off; the production
+    launcher (app.run) runs it once in the master before forking workers instead.
+    """
+    init_database()
+    # register the models on Base before creating tables
+    from . import models  # noqa: F401
+    upgrade_schema(engine, Base.metadata)
+    Base.metadata.create_all(bind=engine)
+    # note tables on every other shard database (app.sharding)
+    from .sharding import shard_map, shard_metadata
+    for shard in shard_map.shards:
+        if not shard.is_primary:
+            metadata = shard_metadata()
+            upgrade_schema(shard.engine, metadata)
+            metadata.create_all(bind=shard.engine)
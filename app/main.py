@@ -1,38 +1,120 @@
 # app/main.py
-from fastapi import FastAPI, Depends, HTTPException, status, Request, Path, Body
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Response, Path, Body, Query, Header
 from fastapi.middleware.cors import CORSMiddleware
+import os
 import re
-from fastapi.responses import PlainTextResponse, JSONResponse
+from fastapi.responses import PlainTextResponse, JSONResponse, StreamingResponse
 from fastapi.responses import RedirectResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from . import models, schemas, crud, auth
-from .database import engine, Base
-from .deps import get_db, get_current_user
+from starlette.concurrency import run_in_threadpool
+from . import models, schemas, crud, crud_async, auth, export, metrics, serialize, admission, group_commit, sharding
+from . import read_your_writes
+from .database import engine, async_engine, read_router, AnySession, all_sync_engines, pool_stats, warm_up, warm_up_async
+from .deps import get_db, get_read_db, get_current_user, get_token_payload
 from .config import settings
+from .cache import notes_list_cache
+from .revocation import revoked_tokens, jti_key
 from datetime import timedelta
-import uuid
-from .init_db import init_database
+from typing import Literal, Optional
+from .init_db import bootstrap_database
 from .schemas import NoteUpdate
 from datetime import datetime
 
 
-# Initialize database before creating tables
-init_database()
-
-# create tables (dev convenience)
-Base.metadata.create_all(bind=engine)
+# verify the database and create tables; app.run does this once before forking workers instead
+if settings.DB_BOOTSTRAP_ON_IMPORT:
+    bootstrap_database()
 
 app = FastAPI(title=settings.PROJECT_NAME)
 
+
+@app.exception_handler(auth.PasswordHashPoolSaturated)
+async def password_pool_saturated_handler(request: Request, exc: auth.PasswordHashPoolSaturated):
+    # shed load quickly instead of queueing more argon2 work behind a full pool
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server busy, please retry shortly."},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(group_commit.GroupCommitSaturated)
+async def group_commit_saturated_handler(request: Request, exc: group_commit.GroupCommitSaturated):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server busy, please retry shortly."},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(sharding.UserMoving)
+async def user_moving_handler(request: Request, exc: sharding.UserMoving):
+    # app.rebalance is copying this user's last changes to another shard; reads still work
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Your notes are being moved, please retry shortly."},
+        headers={"Retry-After": str(max(1, round(settings.SHARD_DIRECTORY_TTL_SECONDS)))},
+    )
+
+
+@app.on_event("startup")
+async def load_revoked_tokens():
+    await revoked_tokens.start()
+
+
+@app.on_event("startup")
+async def warm_database_pools():
+    # open connections now rather than on the first requests after a deploy
+    n = settings.DB_POOL_WARMUP
+    if n <= 0:
+        return
+    shards = [s for s in sharding.shard_map.shards if not s.is_primary]
+    engines = [engine] + [r.engine for r in read_router.replicas] + [s.engine for s in shards]
+    for e in engines:
+        await run_in_threadpool(warm_up, e, n)
+    for e in [async_engine] + [r.async_engine for r in read_router.replicas] + [s.async_engine for s in shards]:
+        if e is not None:
+            await warm_up_async(e, n)
+
+
+@app.on_event("shutdown")
+async def shutdown_pools():
+    await revoked_tokens.stop()
+    await group_commit.note_committer.dispose()
+    auth.shutdown_hash_pool()
+    if async_engine is not None:
+        await async_engine.dispose()
+    await read_router.dispose_async()
+    await sharding.shard_map.dispose_async()
+    engine.dispose()
+    read_router.dispose()
+    sharding.shard_map.dispose()
+
+if read_router.replicas:
+    # the read-your-writes pin as a cookie on write responses, so every worker honours it
+    app.add_middleware(read_your_writes.ReadYourWritesMiddleware, router=read_router)
+
+# rate limits and the in-flight cap; inside CORS, so rejections still carry CORS headers
+app.add_middleware(
+    admission.AdmissionMiddleware,
+    backend=admission.make_rate_limit_backend(settings.RATE_LIMIT_BACKEND),
+    gate=admission.make_gate(),
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],  # your React/Next.js frontend URL
     allow_credentials=True,
     allow_methods=["*"],       # allow all methods (GET, POST, etc.)
     allow_headers=["*"],       # allow all headers, including Authorization
+    # response headers the frontend reads: the next-page cursor, and ETags for If-Match / If-None-Match
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+if settings.METRICS_ENABLED:
+    # outermost, so latency covers CORS handling too
+    app.add_middleware(metrics.MetricsMiddleware, server_timing=settings.METRICS_SERVER_TIMING)
+
 # -----------------------
 # Homepage: bootstrapping endpoints (backend-only)
 # -----------------------
@@ -43,6 +125,23 @@ def root():
     return RedirectResponse(url="/homepage")
 
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics_endpoint():
+    # Prometheus text format; per worker process. Unauthenticated, so off unless METRICS_ENABLED
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(metrics.render_metrics(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/admin/pool", include_in_schema=False)
+def pool_endpoint():
+    # connections checked out / idle / overflow and checkout wait of every pool; per worker process.
+    # Unauthenticated and subject to admission control like any route; off unless ADMIN_POOL_ENABLED
+    if not settings.ADMIN_POOL_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return {"pid": os.getpid(), "pools": [pool_stats(e) for e in all_sync_engines()]}
+
+
 @app.get("/homepage", response_class=PlainTextResponse, tags=["homepage"])
 def homepage():
     """
@@ -73,7 +172,7 @@ def homepage_login_info():
 
 
 @app.post("/homepage/login", tags=["homepage"])
-async def homepage_login_post(request: Request, db: Session = Depends(get_db)):
+async def homepage_login_post(request: Request, db: AnySession = Depends(get_db)):
     """
     Accepts either:
       - form data (email, password) (use Postman form-data or curl --form)
@@ -108,12 +207,12 @@ async def homepage_login_post(request: Request, db: Session = Depends(get_db)):
         )
 
     # Authenticate user
-    user = crud.get_user_by_email(db, form_email)
-    if not user or not auth.verify_password(form_password, user.password_hash):
+    user = await crud_async.get_user_by_email(db, form_email)
+    if not user or not await auth.verify_password_async(form_password, user.password_hash):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password")
 
     # Successful auth — create token
-    user_hex = uuid.UUID(bytes=user.user_id).hex
+    user_hex = user.user_id
 
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
 
@@ -123,8 +222,29 @@ async def homepage_login_post(request: Request, db: Session = Depends(get_db)):
     return JSONResponse(content={"access_token": access_token, "token_type": "bearer"})
 
 
+@app.post("/homepage/logout", status_code=status.HTTP_204_NO_CONTENT, tags=["homepage"])
+async def homepage_logout(
+    payload: dict = Depends(get_token_payload),
+    db: AnySession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Revoke the bearer token used for this request. It is refused at once by this server process
+    and by the others within REVOCATION_REFRESH_SECONDS.
+    """
+    try:
+        jti = models.parse_uuid_hex(payload["jti"])
+    except (KeyError, AttributeError, ValueError):
+        raise HTTPException(status_code=400, detail="This token cannot be revoked; it expires on its own.")
+    exp = payload.get("exp")
+    expires_on = datetime.utcfromtimestamp(exp) if exp is not None else None
+    await crud_async.revoke_token(db, jti, current_user.user_id, expires_on)
+    revoked_tokens.add([jti_key(jti)])
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
 @app.post("/homepage/signup", response_model=schemas.UserOut, tags=["homepage"])
-async def homepage_signup(request: Request, db: Session = Depends(get_db)):
+async def homepage_signup(request: Request, db: AnySession = Depends(get_db)):
     """
     Create a new user when the provided email does not exist.
     Accepts either JSON:
@@ -165,33 +285,120 @@ async def homepage_signup(request: Request, db: Session = Depends(get_db)):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Password and confirm_password do not match")
 
     # Check existing user
-    existing = crud.get_user_by_email(db, user_email)
+    existing = await crud_async.get_user_by_email(db, user_email)
     if existing:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
 
     # Create user
     user_in = schemas.UserCreate(user_name=user_name, user_email=user_email, password=password)
-    created = crud.create_user(db, user_in)
-    # convert binary id to hex for response
-    created.user_id = uuid.UUID(bytes=created.user_id).hex
-    return created
+    hashed = await auth.get_password_hash_async(password)
+    created = await crud_async.create_user(db, user_in, hashed_password=hashed)
+    # hex user_id for the response without mutating the ORM object (which the session still tracks)
+    return serialize.user_dict(created)
 
 
 
-@app.get("/homepage/notes", response_model=list[schemas.NoteOut], tags=["notes"])
-def get_user_notes(
-    db: Session = Depends(get_db),
+@app.get("/homepage/notes", response_model=list[schemas.NoteOut] | list[schemas.NoteSummary], tags=["notes"])
+async def get_user_notes(
+    limit: int = Query(50, ge=1, le=200, description="Page size"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's X-Next-Cursor header"),
+    view: Literal["full", "summary"] = Query("full", description="summary: title, timestamps and a content snippet"),
+    if_none_match: Optional[str] = Header(None),
+    db: AnySession = Depends(get_read_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """
-    Retrieve all notes for the currently authenticated user.
+    Retrieve the current user's notes, newest first, one page at a time.
     Requires a valid Bearer token.
+    When more notes may follow, the X-Next-Cursor response header carries the cursor for the next page.
+    Every page carries an ETag; sending it back in If-None-Match gets a 304 while the user's notes are unchanged.
+    Serialized pages are cached per user; a cached page is served only while its ETag is current.
+    With view=summary each note carries a short `snippet` of its content instead of note_content;
+    fetch the full note from GET /homepage/notes/{note_id}.
     """
-    user_id_bytes = current_user.user_id
-    notes = crud.get_notes_by_user(db, user_id_bytes)
-    if not notes:
+    after = None
+    if cursor:
+        try:
+            after = crud.decode_note_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+    user_id = current_user.user_id
+    cache_key = notes_list_cache.page_key(user_id, limit, cursor, view)
+
+    # one aggregate query decides whether the page can have changed, before any note is loaded;
+    # it also revalidates the cached page, which writes in other worker processes don't invalidate
+    version = await crud_async.get_notes_version(db, user_id)
+    if version[0] == 0 and after is None:
+        raise HTTPException(status_code=404, detail="No notes found for this user.")
+    etag = crud.notes_list_etag(user_id, version, limit, cursor, view)
+    if if_none_match and _etag_matches(if_none_match, etag, weak=True):
+        return _not_modified(etag)
+    cached = notes_list_cache.get(cache_key, etag)
+    if cached is not None:
+        headers, body = cached
+        return Response(body, media_type="application/json", headers=headers)
+
+    notes = await crud_async.get_notes_by_user(db, user_id, limit=limit, after=after, view=view)
+    if not notes and after is None:
         raise HTTPException(status_code=404, detail="No notes found for this user.")
-    return notes
+
+    headers = {"ETag": etag, "Cache-Control": NOTES_CACHE_CONTROL}
+    if len(notes) == limit:
+        last = notes[-1]
+        headers["X-Next-Cursor"] = crud.encode_note_cursor(last.created_on, last.note_id)
+
+    # plain rows -> dicts -> JSON bytes, serialized once, then cached
+    if view == "summary":
+        body = serialize.dumps(serialize.note_summary_dicts(notes, settings.NOTE_SNIPPET_LENGTH))
+    else:
+        body = serialize.dumps(serialize.note_dicts(notes))
+    notes_list_cache.set(cache_key, headers, body)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@app.get("/homepage/notes/search", response_model=list[schemas.NoteSearchHit], tags=["notes"])
+async def search_user_notes(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to search for in note titles and contents"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AnySession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Search the current user's notes by title and content, best match first.
+    """
+    hits = await crud_async.search_notes(db, current_user.user_id, q, limit=limit)
+    return serialize.FastJSONResponse([{**serialize.note_dict(n), "score": score} for n, score in hits])
+
+
+@app.get("/homepage/notes/changes", response_model=schemas.NoteChanges, tags=["notes"])
+async def get_note_changes(
+    since: Optional[str] = Query(None, description="Watermark from the previous sync; omit for a full first sync"),
+    limit: int = Query(500, ge=1, le=1000, description="Most notes and most tombstones per response"),
+    # primary, not a replica: a lagging replica could miss writes older than the watermark's grace window
+    db: AnySession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Incremental sync: the current user's notes created or updated since `since`, oldest first,
+    and the ids of notes deleted since then, with the watermark to send next time.
+    While has_more is true, call again right away with the new watermark.
+    Recent changes may be sent twice; apply them idempotently (upsert by note_id).
+    """
+    changed_after = deleted_after = None
+    if since:
+        try:
+            changed_after, deleted_after = crud.decode_sync_watermark(since)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid watermark.")
+
+    result = await crud_async.get_note_changes(db, current_user.user_id, changed_after, deleted_after, limit=limit)
+    return serialize.FastJSONResponse({
+        "changes": serialize.note_dicts(result["changed"]),
+        "deleted": serialize.tombstone_dicts(result["deleted"]),
+        "watermark": crud.encode_sync_watermark(*result["positions"]),
+        "has_more": result["has_more"],
+    })
 
 
 HEX_RE = re.compile(r'^[0-9a-f]{32}$', re.IGNORECASE)
@@ -211,60 +418,85 @@ def _normalize_uuid_input(s: str) -> str:
     return s
 
 
+def _parse_note_id(note_id: str) -> str:
+    normalized = _normalize_uuid_input(note_id)
+    if not HEX_RE.match(normalized):
+        raise HTTPException(status_code=400, detail="note_id must be a valid UUID (32 hex chars)")
+    return normalized.lower()
+
+
+# clients may keep notes responses but must revalidate them (If-None-Match) before reuse
+NOTES_CACHE_CONTROL = "private, no-cache"
+
+
+def _etag_matches(header: str, etag: str, weak: bool) -> bool:
+    """
+    Whether an If-None-Match (weak=True) or If-Match (weak=False) header value matches `etag`.
+    Our ETags are always strong, so W/ tags only match under the weak comparison.
+    """
+    if header.strip() == "*":
+        return True
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            if not weak:
+                continue
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def _if_match_versions(header: str) -> Optional[set]:
+    """
+    Note versions an If-Match header accepts: None for "*" (any), otherwise the versions of
+    the note ETags listed (empty when none of them can match).
+    """
+    if header.strip() == "*":
+        return None
+    return {v for v in (crud.parse_note_etag(tag.strip()) for tag in header.split(",")) if v is not None}
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": NOTES_CACHE_CONTROL})
+
+
 @app.patch("/homepage/notes/{note_id}", response_model=schemas.NoteOut, tags=["notes"])
-def edit_note(
+async def edit_note(
     note_id: str = Path(..., description="Note id as UUID (with or without dashes or 0x prefix)"),
     note_in: schemas.NoteUpdate = Body(...),
-    db: Session = Depends(get_db),
+    if_match: Optional[str] = Header(None, description="Only apply the update if the note still has this ETag"),
+    db: AnySession = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    # Normalize and validate note_id
-    normalized = _normalize_uuid_input(note_id)
-    if not HEX_RE.match(normalized):
-        raise HTTPException(status_code=400, detail="note_id must be a valid UUID (32 hex chars)")
-    try:
-        note_uuid = uuid.UUID(hex=normalized)
-        note_id_bin = note_uuid.bytes
-    except ValueError:
-        raise HTTPException(status_code=400, detail="note_id must be a valid UUID")
-
-    # Fetch note and enforce ownership
-    note = crud.get_note_by_id(db, note_id_bin, current_user.user_id)
-    if not note:
+    note_id = _parse_note_id(note_id)
+
+    # conditional write (If-Match): refuse to overwrite a version the client hasn't seen;
+    # the version check is part of the UPDATE, so it cannot race another write
+    expected_versions = _if_match_versions(if_match) if if_match else None
+
+    note = None
+    if expected_versions is None or expected_versions:
+        # one ownership-scoped UPDATE; the new note comes back from it, no separate load or refresh
+        note = await crud_async.update_note(db, note_id, current_user.user_id, note_in, expected_versions)
+    if note is None:
+        if expected_versions is not None:
+            found, _ = await crud_async.get_note_version(db, note_id, current_user.user_id)
+            if found:
+                raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Note was modified; fetch it again.")
         raise HTTPException(status_code=404, detail="Note not found.")
 
-    # Perform the partial update via your CRUD helper
-    # crud.update_note should accept schemas.NoteUpdate, apply non-None fields, set last_update, commit, refresh
-    note = crud.update_note(db, note, note_in)
-
-    # Defensive conversion for UUID columns that might be bytes / memoryview
-    raw_note_id_bytes = bytes(note.note_id) if isinstance(note.note_id, (memoryview, bytearray)) else note.note_id
-    raw_user_id_bytes = bytes(note.user_id) if isinstance(note.user_id, (memoryview, bytearray)) else note.user_id
-
-    # Build response dict (don't mutate ORM in-place)
-    payload = {
-        "note_id": uuid.UUID(bytes=raw_note_id_bytes).hex,
-        "user_id": uuid.UUID(bytes=raw_user_id_bytes).hex,
-        "note_title": note.note_title,
-        "note_content": note.note_content,
-        "created_on": note.created_on,
-        "last_update": note.last_update,
-    }
-
-    return payload
+    return serialize.FastJSONResponse(serialize.note_dict(note), headers={"ETag": crud.note_etag(note.version)})
 
 # Create a new note
 @app.post("/homepage/notes", response_model=schemas.NoteOut, status_code=201, tags=["notes"])
-def create_note(
+async def create_note(
     request: Request,
     note_in: schemas.NoteCreate,
-    db: Session = Depends(get_db),
+    db: AnySession = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
 
-    # Debug: print full headers
-    print("Headers:", dict(request.headers))
-    
     if not current_user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -272,14 +504,87 @@ def create_note(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    created = crud.create_note(db, current_user.user_id, note_in)
+    if settings.NOTE_GROUP_COMMIT:
+        # written together with other concurrent creates, in one INSERT and one COMMIT
+        created = await group_commit.note_committer.submit(current_user.user_id, note_in)
+    else:
+        created = await crud_async.create_note(db, current_user.user_id, note_in)
 
-    # Convert binary UUID bytes to hex string for JSON response
-    # If your model stores bytes in created.note_id / created.user_id
-    created.note_id = uuid.UUID(bytes=created.note_id).hex
-    created.user_id = uuid.UUID(bytes=created.user_id).hex
-    
-    return created
+    # hex ids for the response without mutating the ORM object
+    return serialize.FastJSONResponse(serialize.note_dict(created), status_code=201)
+
+@app.get("/homepage/notes/export", tags=["notes"])
+async def export_user_notes(
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="ndjson (one note per line) or csv"),
+    gzip: bool = Query(False, description="download a .gz file (Content-Type: application/gzip)"),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Stream every note of the current user, newest first, without loading them all into memory.
+    """
+    if settings.DB_ASYNC:
+        body = export.export_notes_async(current_user.user_id, format, gzip)
+    else:
+        body = export.export_notes(current_user.user_id, format, gzip)
+    filename = f"notes.{format}" + (".gz" if gzip else "")
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    # a gzip file, not a Content-Encoding: clients would decompress that and save plain text as .gz
+    media_type = export.GZIP_MEDIA_TYPE if gzip else export.MEDIA_TYPES[format]
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+
+@app.get("/homepage/notes/{note_id}", response_model=schemas.NoteOut, tags=["notes"])
+async def get_note(
+    note_id: str = Path(..., description="Note id as UUID (with or without dashes or 0x prefix)"),
+    if_none_match: Optional[str] = Header(None),
+    db: AnySession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Retrieve one of the current user's notes. The response carries an ETag; sending it back
+    in If-None-Match gets a 304 without the note being loaded while it is unchanged.
+    """
+    note_id = _parse_note_id(note_id)
+
+    if if_none_match:
+        found, version = await crud_async.get_note_version(db, note_id, current_user.user_id)
+        if not found:
+            raise HTTPException(status_code=404, detail="Note not found.")
+        etag = crud.note_etag(version)
+        if _etag_matches(if_none_match, etag, weak=True):
+            return _not_modified(etag)
+
+    note = await crud_async.get_note_by_id(db, note_id, current_user.user_id)
+    if not note:
+        raise HTTPException(status_code=404, detail="Note not found.")
+
+    return serialize.FastJSONResponse(
+        serialize.note_dict(note),
+        headers={"ETag": crud.note_etag(note.version), "Cache-Control": NOTES_CACHE_CONTROL},
+    )
+
+
+@app.post("/homepage/notes/batch", response_model=schemas.NoteBatchResponse, tags=["notes"])
+async def batch_notes(
+    batch: schemas.NoteBatchRequest,
+    db: AnySession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Apply many create/update/delete operations in one request and one transaction.
+    Each operation gets its own result; a bad or missing note_id does not fail the others.
+    """
+    if len(batch.operations) > settings.NOTE_BATCH_MAX_OPS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.NOTE_BATCH_MAX_OPS} operations per batch.",
+        )
+    for op in batch.operations:
+        if op.note_id is not None:
+            op.note_id = _normalize_uuid_input(op.note_id)
+
+    results = await crud_async.apply_note_batch(db, current_user.user_id, batch.operations)
+    return {"results": results}
 
 # in app/main.py (temporary)
 @app.post("/homepage/notes-debug-noauth")
@@ -290,30 +595,18 @@ def notes_debug_noauth(request: Request):
     return {"ok": True, "headers": dict(request.headers)}
 
 @app.delete("/homepage/notes/{note_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["notes"])
-def delete_note(
+async def delete_note(
     note_id: str = Path(..., description="Note id as UUID (with or without dashes or 0x prefix)"),
-    db: Session = Depends(get_db),
+    db: AnySession = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
     # normalize + validate
-    normalized = _normalize_uuid_input(note_id)
-    if not HEX_RE.match(normalized):
-        raise HTTPException(status_code=400, detail="note_id must be a valid UUID (32 hex chars)")
-
-    try:
-        note_uuid = uuid.UUID(hex=normalized)
-        note_id_bin = note_uuid.bytes
-    except ValueError:
-        raise HTTPException(status_code=400, detail="note_id must be a valid UUID")
+    note_id = _parse_note_id(note_id)
 
-    # get note and enforce ownership
-    note = crud.get_note_by_id(db, note_id_bin, current_user.user_id)
-    if not note:
+    # one ownership-scoped DELETE; no matching row means no such note for this user
+    if not await crud_async.delete_note(db, note_id, current_user.user_id):
         raise HTTPException(status_code=404, detail="Note not found.")
 
-    # perform delete
-    crud.delete_note(db, note)
-
     # return 204 No Content (FastAPI will handle empty response body)
     return None
 
@@ -0,0 +1,280 @@
+# app/metrics.py
+"""
+In-process request and database metrics, exposed in Prometheus text format on /metrics.
+
+- MetricsMiddleware: per-route latency histograms and status counts; optionally a
+  Server-Timing header (app / db / pool) on every response
+- install_engine_hooks(): SQLAlchemy cursor events that count queries and DB time for
+  the current request (a RequestStats object in a context variable; the threadpool and
+  AsyncSession.run_sync both see the same object)
+- record_pool_wait(): called by the database.timed_pool_class pools with connection checkout wait time
+
+Metrics are per worker process.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus style), keyed by a tuple of label values."""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series: Dict[tuple, list] = {}  # labels -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: tuple = ()) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):  # above the last bound only counts towards +Inf
+                series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def totals(self, labels: tuple = ()) -> Tuple[int, float]:
+        """(count, sum) of one series."""
+        with self._lock:
+            series = self._series.get(labels)
+            return (series[-2], series[-1]) if series else (0, 0.0)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in sorted(items):
+            base = _labels(self.label_names, labels)
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="+Inf"}} {series[-2]}')
+            lines.append(f"{self.name}_count{{{base}}} {series[-2]}")
+            lines.append(f"{self.name}_sum{{{base}}} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{{{_labels(self.label_names, labels)}}} {value}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values) -> str:
+    return ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+
+
+REQUEST_LATENCY = Histogram(
+    "unote_http_request_duration_seconds", "HTTP request latency by route", ("method", "route"))
+REQUESTS = Counter("unote_http_requests_total", "HTTP responses by route and status", ("method", "route", "status"))
+DB_QUERIES = Histogram(
+    "unote_db_queries_per_request", "SQL statements executed per request", ("method", "route"), QUERY_COUNT_BUCKETS)
+DB_TIME = Histogram("unote_db_time_per_request_seconds", "Time spent in SQL statements per request", ("method", "route"))
+POOL_WAIT = Histogram("unote_db_pool_checkout_wait_seconds", "Time to check a connection out of the pool", ("pool",))
+POOL_PINGS = Counter(
+    "unote_db_pool_pings_total", "Liveness pings of idle connections on checkout", ("pool", "result"))
+GROUP_COMMIT_BATCH = Histogram(
+    "unote_note_group_commit_batch_size", "Notes written per group commit", (), BATCH_SIZE_BUCKETS)
+ADMISSION_REJECTED = Counter(
+    "unote_admission_rejected_total", "Requests refused by admission control", ("reason",))
+
+_REGISTRY = [REQUEST_LATENCY, REQUESTS, DB_QUERIES, DB_TIME, POOL_WAIT, POOL_PINGS, GROUP_COMMIT_BATCH, ADMISSION_REJECTED]
+
+
+# -----------------------
+# Per-request accounting
+# -----------------------
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time", "pool_wait")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.pool_wait = 0.0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("unote_request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("unote_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("unote_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+
+def install_engine_hooks(sync_engine) -> None:
+    """Count statements and DB time per request. Pass AsyncEngine.sync_engine for the async engine."""
+    if getattr(sync_engine, "_unote_metrics_hooked", False):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    sync_engine._unote_metrics_hooked = True
+
+
+def record_pool_wait(seconds: float, pool_name: str = "primary") -> None:
+    POOL_WAIT.observe(seconds, (pool_name,))
+    stats = _current.get()
+    if stats is not None:
+        stats.pool_wait += seconds
+
+
+# -----------------------
+# Middleware and exposition
+# -----------------------
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (cheaper than BaseHTTPMiddleware). The route label is the
+    matched path template, e.g. /homepage/notes/{note_id}, so ids don't explode cardinality.
+    """
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    elapsed_ms = (time.perf_counter() - start) * 1000
+                    value = (
+                        f'app;dur={elapsed_ms:.2f}, db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries", '
+                        f"pool;dur={stats.pool_wait * 1000:.2f}"
+                    )
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"server-timing", value.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = scope.get("route")
+            labels = (scope.get("method", ""), getattr(route, "path", "<unmatched>"))
+            REQUEST_LATENCY.observe(elapsed, labels)
+            REQUESTS.inc(labels + (status_code,))
+            DB_QUERIES.observe(stats.queries, labels)
+            DB_TIME.observe(stats.db_time, labels)
+            _current.reset(token)
+
+
+def render_metrics() -> str:
+    from .cache import notes_list_cache, user_cache
+    from .database import all_sync_engines, pool_stats, read_router
+
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    cache_stats = user_cache.stats()
+    lines += [
+        "# HELP unote_user_cache_hits_total Authenticated-user cache hits",
+        "# TYPE unote_user_cache_hits_total counter",
+        f"unote_user_cache_hits_total {cache_stats['hits']}",
+        "# HELP unote_user_cache_misses_total Authenticated-user cache misses",
+        "# TYPE unote_user_cache_misses_total counter",
+        f"unote_user_cache_misses_total {cache_stats['misses']}",
+        "# HELP unote_user_cache_entries Users currently cached",
+        "# TYPE unote_user_cache_entries gauge",
+        f"unote_user_cache_entries {cache_stats['size']}",
+    ]
+    notes_stats = notes_list_cache.stats()
+    lines += [
+        "# HELP unote_notes_cache_hits_total Notes-list page cache hits",
+        "# TYPE unote_notes_cache_hits_total counter",
+        f"unote_notes_cache_hits_total {notes_stats['hits']}",
+        "# HELP unote_notes_cache_misses_total Notes-list page cache misses",
+        "# TYPE unote_notes_cache_misses_total counter",
+        f"unote_notes_cache_misses_total {notes_stats['misses']}",
+        "# HELP unote_notes_cache_stale_total Cached notes-list pages refused because the notes changed",
+        "# TYPE unote_notes_cache_stale_total counter",
+        f"unote_notes_cache_stale_total {notes_stats['stale']}",
+    ]
+    if "backend_size" in notes_stats:  # only the in-process backend knows its own footprint
+        lines += [
+            "# HELP unote_notes_cache_entries Pages and generation tokens currently cached",
+            "# TYPE unote_notes_cache_entries gauge",
+            f"unote_notes_cache_entries {notes_stats['backend_size']}",
+            "# HELP unote_notes_cache_bytes Size of the cached notes-list pages",
+            "# TYPE unote_notes_cache_bytes gauge",
+            f"unote_notes_cache_bytes {notes_stats['backend_bytes']}",
+        ]
+    pools = [p for p in (pool_stats(e) for e in all_sync_engines()) if "size" in p]
+    if pools:
+        lines += [
+            "# HELP unote_db_pool_connections Pooled connections by state",
+            "# TYPE unote_db_pool_connections gauge",
+        ]
+        for p in pools:
+            for state in ("checked_out", "idle", "overflow"):
+                lines.append(f'unote_db_pool_connections{{pool="{_escape(p["pool"])}",state="{state}"}} {p[state]}')
+    replicas = read_router.stats()
+    if replicas:
+        lines += [
+            "# HELP unote_db_replica_up Read replica in rotation (1) or skipped after a connection failure (0)",
+            "# TYPE unote_db_replica_up gauge",
+        ] + [f'unote_db_replica_up{{replica="{name}"}} {int(up)}' for name, up in sorted(replicas.items())]
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
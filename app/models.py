@@ -1,19 +1,100 @@
+import os
+import re
+import threading
+import time
 import uuid
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text
-from sqlalchemy.dialects.mysql import BINARY
+from sqlalchemy import Boolean, Column, String, DateTime, ForeignKey, Index, Integer, text
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.dialects.mysql import BINARY, DATETIME
 from datetime import datetime
+from .compression import CompressedText
+from .config import settings
 from .database import Base
 
 
 
 
-def gen_uuid_bin():
+def uuid4_bin() -> bytes:
     return uuid.uuid4().bytes
 
 
+_uuid7_lock = threading.Lock()
+_uuid7_last_ms = 0
+_uuid7_counter = 0
+
+
+def uuid7_bin() -> bytes:
+    """
+    Time-ordered UUID (RFC 9562 version 7) as 16 bytes.
+
+    48-bit Unix milliseconds, then a 12-bit counter (rand_a) that keeps ids generated in the
+    same millisecond increasing within this process, then 62 random bits. Consecutive ids
+    land next to each other in the clustered index instead of at random pages.
+    """
+    global _uuid7_last_ms, _uuid7_counter
+    with _uuid7_lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _uuid7_last_ms:
+            _uuid7_last_ms = ms
+            _uuid7_counter = int.from_bytes(os.urandom(2), "big") & 0x7FF  # random start, leaves headroom
+        else:
+            _uuid7_counter += 1
+            if _uuid7_counter > 0xFFF:  # counter exhausted: borrow the next millisecond
+                _uuid7_last_ms += 1
+                _uuid7_counter = 0
+        ms, counter = _uuid7_last_ms, _uuid7_counter
+    rand_b = int.from_bytes(os.urandom(8), "big") & 0x3FFFFFFFFFFFFFFF
+    value = (ms & 0xFFFFFFFFFFFF) << 80 | 0x7 << 76 | counter << 64 | 0b10 << 62 | rand_b
+    return value.to_bytes(16, "big")
+
+
+_UUID_GENERATORS = {4: uuid4_bin, 7: uuid7_bin}
+if settings.UUID_VERSION not in _UUID_GENERATORS:
+    raise ValueError(f"UUID_VERSION must be 4 or 7, got {settings.UUID_VERSION}")
+_gen_uuid = _UUID_GENERATORS[settings.UUID_VERSION]
+
+
+def gen_uuid_hex() -> str:
+    # same 16-byte / 32-hex-char format for both versions, so existing ids keep working
+    return _gen_uuid().hex()
+
+
+_HEX32_RE = re.compile(r"[0-9a-f]{32}")
+
+
+def parse_uuid_hex(value: str) -> str:
+    """
+    Canonical id form (32 lowercase hex chars) of a UUID string with or without dashes.
+    Raises ValueError for anything else.
+    """
+    s = value.replace("-", "").lower()
+    if not _HEX32_RE.fullmatch(s):
+        raise ValueError(f"not a UUID: {value!r}")
+    return s
+
+
+class HexUUID(TypeDecorator):
+    """
+    UUID stored as BINARY(16) (a BLOB on SQLite) and seen by Python as 32 lowercase hex chars.
+
+    The conversion is bytes.fromhex / bytes.hex once per value at the DB boundary, with no
+    uuid.UUID objects; everything above the models deals in hex strings only.
+    """
+
+    impl = BINARY(16)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else bytes.fromhex(value)
+
+    def process_result_value(self, value, dialect):
+        # bytes, or memoryview / bytearray depending on the driver; all have .hex()
+        return None if value is None else value.hex()
+
+
 class User(Base):
     __tablename__ = 'users'
-    user_id = Column(BINARY(16), primary_key=True, default=gen_uuid_bin)
+    user_id = Column(HexUUID, primary_key=True, default=gen_uuid_hex)
     user_name = Column(String(150), nullable=False)
     user_email = Column(String(255), nullable=False, unique=True)
     password_hash = Column(String(255), nullable=False)
@@ -23,9 +104,64 @@ class User(Base):
 
 class Note(Base):
     __tablename__ = 'notes'
-    note_id = Column(BINARY(16), primary_key=True, default=gen_uuid_bin)
-    user_id = Column(BINARY(16), ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
+    note_id = Column(HexUUID, primary_key=True, default=gen_uuid_hex)
+    user_id = Column(HexUUID, ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
     note_title = Column(String(255), nullable=True)
-    note_content = Column(Text, nullable=True)
+    note_content = Column(CompressedText, nullable=True)  # Text, compressed above a size threshold
     created_on = Column(DateTime, default=datetime.utcnow)
-    last_update = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
+    # microsecond precision on MySQL so two edits in the same second still get different ETags
+    last_update = Column(
+        DateTime().with_variant(DATETIME(fsp=6), "mysql"), default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+    # incremented by every update; the note's ETag, checked by conditional updates (If-Match)
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
+
+    __table_args__ = (
+        # keyset pagination of a user's notes, newest first (crud.get_notes_by_user)
+        Index("ix_notes_user_created_note", "user_id", "created_on", "note_id"),
+        # COUNT / MAX(last_update) per user for list ETags (crud.get_notes_version), and the
+        # (last_update, note_id) range scan of sync (crud.get_note_changes); InnoDB secondary
+        # indexes end with the primary key, so the note_id tie-break is covered too
+        Index("ix_notes_user_last_update", "user_id", "last_update"),
+        # full-text search (search.MySQLFulltextBackend); MySQL only
+        Index("ft_notes_title_content", "note_title", "note_content", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+    )
+
+
+class NoteTombstone(Base):
+    """A deleted note, kept so that sync clients (GET /homepage/notes/changes) learn of the delete."""
+    __tablename__ = 'note_tombstones'
+    note_id = Column(HexUUID, primary_key=True)
+    user_id = Column(HexUUID, ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
+    deleted_on = Column(DateTime().with_variant(DATETIME(fsp=6), "mysql"), nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # keyset scan of a user's deletes since a sync watermark (crud.get_note_changes)
+        Index("ix_note_tombstones_user_deleted_note", "user_id", "deleted_on", "note_id"),
+    )
+
+
+class UserShard(Base):
+    """Which note shard holds a user's notes (app.sharding); on the primary database, with the users."""
+    __tablename__ = 'user_shards'
+    user_id = Column(HexUUID, ForeignKey('users.user_id', ondelete='CASCADE'), primary_key=True)
+    shard = Column(Integer, nullable=False)
+    # set by app.rebalance while it copies the last changes to the new shard; writes are refused
+    locked = Column(Boolean, nullable=False, default=False, server_default=text("0"))
+    updated_on = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class RevokedToken(Base):
+    """An access token revoked before its expiry (logout); see app.revocation."""
+    __tablename__ = 'revoked_tokens'
+    jti = Column(HexUUID, primary_key=True)  # the token's 128-bit random jti claim
+    user_id = Column(HexUUID, ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
+    revoked_on = Column(DateTime().with_variant(DATETIME(fsp=6), "mysql"), nullable=False, default=datetime.utcnow)
+    expires_on = Column(DateTime, nullable=True)  # the token's exp; NULL for tokens that never expire
+
+    __table_args__ = (
+        # incremental refresh of each process's in-memory list (crud.get_revoked_tokens)
+        Index("ix_revoked_tokens_revoked_on", "revoked_on"),
+        # dropping revocations of tokens that have expired anyway (crud.purge_expired_revocations)
+        Index("ix_revoked_tokens_expires_on", "expires_on"),
+    )
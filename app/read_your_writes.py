@@ -0,0 +1,86 @@
+# app/read_your_writes.py
+"""
+Read-your-writes across worker processes, for deployments with read replicas.
+
+database.ReadRouter pins a user to the primary after a write, but only in the process that
+served it. So that the client's next read is kept off a lagging replica whichever worker
+serves it, every successful write request (any method but GET / HEAD / OPTIONS, with a
+valid bearer token) also gets a signed cookie naming the user and the time the pin ends:
+
+    unote_primary_until=<user_id>:<unix time>:<HMAC-SHA256 over both with SECRET_KEY>
+
+deps.get_read_db reads from the primary while the cookie is valid for the token's user.
+The signature only keeps clients from pinning themselves to the primary for good; the
+cookie grants nothing else. Browsers send it cross-origin with credentials: "include".
+"""
+import hashlib
+import hmac
+import math
+import time
+from typing import Optional
+
+from . import admission
+from .config import settings
+
+
+PIN_COOKIE = "unote_primary_until"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def _signature(user_id: str, until: int) -> str:
+    message = f"{user_id}:{until}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def pin_cookie_value(user_id: str, seconds: float, now: Optional[float] = None) -> str:
+    until = math.ceil((time.time() if now is None else now) + seconds)
+    return f"{user_id}:{until}:{_signature(user_id, until)}"
+
+
+def cookie_pins(value: Optional[str], user_id: Optional[str], now: Optional[float] = None) -> bool:
+    """Whether a pin cookie value is authentic, for this user, and not yet expired."""
+    if not value or not user_id:
+        return False
+    try:
+        cookie_user, until, signature = value.split(":")
+        until_ts = int(until)
+    except ValueError:
+        return False
+    if cookie_user != user_id or until_ts <= (time.time() if now is None else now):
+        return False
+    return hmac.compare_digest(signature, _signature(cookie_user, until_ts))
+
+
+class ReadYourWritesMiddleware:
+    """Pure ASGI middleware adding the pin cookie to successful write responses."""
+
+    def __init__(self, app, router):
+        self.app = app
+        self.router = router  # database.read_router, for its pin_seconds
+
+    async def __call__(self, scope, receive, send):
+        pin_seconds = self.router.pin_seconds
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or pin_seconds <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_pin(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                user_id = _token_subject(scope)
+                if user_id:
+                    cookie = (
+                        f"{PIN_COOKIE}={pin_cookie_value(user_id, pin_seconds)}; "
+                        f"Max-Age={math.ceil(pin_seconds)}; Path=/; HttpOnly; SameSite=Lax"
+                    )
+                    message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_pin)
+
+
+def _token_subject(scope) -> Optional[str]:
+    # app.admission has usually decoded the bearer token already
+    decoded = scope.get("state", {}).get("token_payload")
+    if decoded is None:
+        _, decoded = admission.client_key(scope)
+    return decoded[1]["sub"] if decoded is not None else None
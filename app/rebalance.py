@@ -0,0 +1,271 @@
+# app/rebalance.py
+"""
+Move users' notes between note shards (NOTE_SHARD_URLS, app.sharding) while the app runs.
+
+    python -m app.rebalance --plan                    # users not on the shard their id hashes to
+    python -m app.rebalance --user <id> --to 2        # move one user
+    python -m app.rebalance --all --limit 100         # move misplaced users, e.g. after adding a shard
+
+Moving a user (--all moves --group users at a time, through the same steps together):
+  1. copy their notes and tombstones to the new shard, --batch-size rows per short
+     transaction, in primary-key order; the app keeps using the old shard
+  2. lock their directory entry, then wait SHARD_DIRECTORY_TTL_SECONDS plus --settle:
+     every process then refuses the user's writes (503) and the ones in flight are done
+  3. copy again whatever changed since step 1 started, and drop notes deleted meanwhile
+  4. compare row counts, point the entry at the new shard and unlock; wait the TTL again
+  5. delete the user's rows from the old shard, in batches
+
+Reads are served throughout; writes are refused from step 2 to step 4 only. When a move
+fails before step 4 the entry is unlocked on the old shard, and the next attempt starts
+by deleting the partial copy.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, Optional, Tuple
+
+from sqlalchemy import Text, bindparam, delete, func, insert, outerjoin, select, type_coerce, update
+
+from . import models
+from .compression import CompressedText
+from .config import settings
+from .database import engine
+from .sharding import SHARDED_TABLES, shard_map
+
+
+# rows changed this long before a move started are copied again in step 3, for clock skew
+# between the app servers and this tool
+_CLOCK_MARGIN = timedelta(minutes=1)
+
+_CHANGED_SINCE = {"notes": "last_update", "note_tombstones": "deleted_on"}
+
+
+def _stored_columns(table) -> Tuple[list, dict]:
+    """
+    Columns to select and insert values for copying rows as stored: note_content moves
+    without a CompressedText decode / encode on the way.
+    """
+    columns, values = [], {}
+    for column in table.c:
+        if isinstance(column.type, CompressedText):
+            columns.append(type_coerce(column, Text).label(column.name))
+            values[column.name] = type_coerce(bindparam(f"raw_{column.name}"), Text)
+        else:
+            columns.append(column)
+    return columns, values
+
+
+def copy_rows(src, dst, table, user_id: str, batch_size: int, since: Optional[datetime] = None) -> int:
+    """
+    Copy a user's rows of one note table from engine src to engine dst, replacing rows with
+    the same id; only rows changed since `since` when given. Returns the number copied.
+    """
+    columns, values = _stored_columns(table)
+    write = insert(table).values(values)
+    pk = table.c.note_id
+    where = [table.c.user_id == user_id]
+    if since is not None:
+        where.append(table.c[_CHANGED_SINCE[table.name]] >= since)
+    copied, last_id = 0, None
+    while True:
+        q = select(*columns).where(*where).order_by(pk).limit(batch_size)
+        if last_id is not None:
+            q = q.where(pk > last_id)
+        with src.connect() as conn:
+            rows = conn.execute(q).all()
+        if not rows:
+            return copied
+        params = [{(f"raw_{k}" if k in values else k): v for k, v in row._mapping.items()} for row in rows]
+        with dst.begin() as conn:
+            conn.execute(delete(table).where(pk.in_([row.note_id for row in rows])))
+            conn.execute(write, params)
+        copied += len(rows)
+        last_id = rows[-1].note_id
+
+
+def _note_ids(bind, table, user_id: str, batch_size: int, since: Optional[datetime] = None) -> Iterator[list]:
+    pk = table.c.note_id
+    where = [table.c.user_id == user_id]
+    if since is not None:
+        where.append(table.c[_CHANGED_SINCE[table.name]] >= since)
+    last_id = None
+    while True:
+        q = select(pk).where(*where).order_by(pk).limit(batch_size)
+        if last_id is not None:
+            q = q.where(pk > last_id)
+        with bind.connect() as conn:
+            ids = conn.execute(q).scalars().all()
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def delete_rows(bind, user_id: str, batch_size: int) -> int:
+    """Delete a user's notes and tombstones from one shard, one short transaction per batch."""
+    deleted = 0
+    for table in SHARDED_TABLES:
+        while True:
+            with bind.begin() as conn:
+                ids = conn.execute(
+                    select(table.c.note_id).where(table.c.user_id == user_id).limit(batch_size)
+                ).scalars().all()
+                if ids:
+                    conn.execute(delete(table).where(table.c.note_id.in_(ids)))
+            if not ids:
+                break
+            deleted += len(ids)
+    return deleted
+
+
+def count_rows(bind, user_id: str) -> dict:
+    with bind.connect() as conn:
+        return {
+            table.name: conn.execute(select(func.count()).select_from(table).where(table.c.user_id == user_id)).scalar()
+            for table in SHARDED_TABLES
+        }
+
+
+def set_entry(user_id: str, shard: int, locked: bool) -> None:
+    """Write the user's directory entry on the primary."""
+    t = models.UserShard.__table__
+    values = {"shard": shard, "locked": locked, "updated_on": datetime.utcnow()}
+    with engine.begin() as conn:
+        if not conn.execute(update(t).where(t.c.user_id == user_id).values(values)).rowcount:
+            conn.execute(insert(t).values(user_id=user_id, **values))
+
+
+def current_shard(user_id: str) -> int:
+    with engine.connect() as conn:
+        shard = conn.execute(
+            select(models.UserShard.shard).where(models.UserShard.user_id == user_id)
+        ).scalar()
+    return shard_map.default if shard is None else shard
+
+
+def _copy_changes(src, dst, user_id: str, since: datetime, batch_size: int) -> int:
+    """Step 3 for one user: rows changed since `since`, and notes deleted since then."""
+    changed = sum(copy_rows(src.engine, dst.engine, table, user_id, batch_size, since=since) for table in SHARDED_TABLES)
+    notes, tombstones = models.Note.__table__, models.NoteTombstone.__table__
+    for ids in _note_ids(src.engine, tombstones, user_id, batch_size, since=since):
+        with dst.engine.begin() as conn:
+            conn.execute(delete(notes).where(notes.c.note_id.in_(ids)))
+    before, after = count_rows(src.engine, user_id), count_rows(dst.engine, user_id)
+    if before != after:
+        raise RuntimeError(f"{user_id}: row counts differ after the copy: {src.name} {before}, {dst.name} {after}")
+    return changed
+
+
+def move_users(moves: list, batch_size: int, settle: float, log=print) -> dict:
+    """
+    Move users' notes, `moves` being (user_id, target shard) pairs, through steps 1-5 above.
+    The users share the two waits, so a group costs little more time than one user.
+    """
+    wait = settings.SHARD_DIRECTORY_TTL_SECONDS + settle
+    jobs = []
+    for user_id, target in moves:
+        source = current_shard(user_id)
+        if source == target:
+            continue
+        src, dst = shard_map.shards[source], shard_map.shards[target]
+        if src.url == dst.url:
+            raise ValueError(f"{src.name} and {dst.name} are the same database")
+        jobs.append((user_id, src, dst))
+    stats = {"users": len(jobs), "copied": 0, "changed": 0, "purged": 0}
+    if not jobs:
+        return stats
+
+    started = datetime.utcnow() - _CLOCK_MARGIN
+    for user_id, src, dst in jobs:
+        delete_rows(dst.engine, user_id, batch_size)  # left over from an interrupted move
+        stats["copied"] += sum(copy_rows(src.engine, dst.engine, table, user_id, batch_size) for table in SHARDED_TABLES)
+    log(f"  {len(jobs)} users, {stats['copied']} rows copied; locking for {wait:.1f}s")
+
+    locked = []
+    try:
+        for user_id, src, _ in jobs:
+            set_entry(user_id, src.index, locked=True)
+            locked.append((user_id, src))
+        time.sleep(wait)
+        for user_id, src, dst in jobs:
+            stats["changed"] += _copy_changes(src, dst, user_id, started, batch_size)
+    except BaseException:
+        for user_id, src in locked:
+            set_entry(user_id, src.index, locked=False)
+        raise
+    for user_id, _, dst in jobs:
+        set_entry(user_id, dst.index, locked=False)
+    log(f"  {stats['changed']} changed rows copied, users moved; purging the old shards in {wait:.1f}s")
+
+    time.sleep(wait)
+    for user_id, src, _ in jobs:
+        stats["purged"] += delete_rows(src.engine, user_id, batch_size)
+    return stats
+
+
+def plan(batch_size: int = 1000) -> Iterator[Tuple[str, int, int]]:
+    """(user_id, current shard, shard the id hashes to) of every user whose two differ."""
+    users, entries = models.User.__table__, models.UserShard.__table__
+    last_id = None
+    while True:
+        q = (
+            select(users.c.user_id, entries.c.shard)
+            .select_from(outerjoin(users, entries, users.c.user_id == entries.c.user_id))
+            .order_by(users.c.user_id)
+            .limit(batch_size)
+        )
+        if last_id is not None:
+            q = q.where(users.c.user_id > last_id)
+        with engine.connect() as conn:
+            rows = conn.execute(q).all()
+        if not rows:
+            return
+        for user_id, shard in rows:
+            current = shard_map.default if shard is None else shard
+            target = shard_map.assign(user_id)
+            if current != target:
+                yield user_id, current, target
+        last_id = rows[-1].user_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--plan", action="store_true", help="list users to move, without moving any")
+    action.add_argument("--user", help="user_id to move (with --to)")
+    action.add_argument("--all", action="store_true", help="move every user listed by --plan")
+    parser.add_argument("--to", type=int, help="target shard for --user")
+    parser.add_argument("--limit", type=int, default=0, help="with --all, stop after this many users (0 = no limit)")
+    parser.add_argument("--group", type=int, default=50, help="with --all, users moved together (sharing the waits)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--settle", type=float, default=5.0, help="seconds added to each directory wait")
+    args = parser.parse_args()
+
+    if not shard_map.enabled:
+        parser.error("NOTE_SHARD_URLS is empty; there are no shards to move notes between")
+    if args.user:
+        if args.to is None or not 0 <= args.to < len(shard_map.shards):
+            parser.error(f"--user needs --to, a shard from 0 to {len(shard_map.shards) - 1}")
+        stats = move_users([(models.parse_uuid_hex(args.user), args.to)], args.batch_size, args.settle)
+        print(f"✓ {stats}")
+        return
+
+    total, group = 0, []
+    for user_id, current, target in plan():
+        total += 1
+        if args.plan:
+            print(f"{user_id}: shard{current} -> shard{target}")
+        else:
+            group.append((user_id, target))
+            if len(group) >= args.group:
+                move_users(group, args.batch_size, args.settle)
+                group = []
+        if args.limit and total >= args.limit:
+            break
+    if group:
+        move_users(group, args.batch_size, args.settle)
+    print(f"✓ {total} users {'to move' if args.plan else 'moved'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# app/revocation.py
+"""
+Revoked access tokens, checked by deps.get_current_user without a database query.
+
+Revocations are rows in revoked_tokens (crud.revoke_token, POST /homepage/logout). Every
+process keeps them in memory as 64-bit keys, the first half of each token's random jti:
+  - a sorted array('Q') searched with bisect: 8 bytes per revoked token
+  - a set of keys added since the array was built, merged into it past MERGE_THRESHOLD
+With 128-bit random jtis, two tokens sharing a 64-bit key is not a practical concern.
+
+A background task (start / stop, from app.main's startup and shutdown) loads the list,
+then polls for new revocations every REVOCATION_REFRESH_SECONDS and reloads it in full
+every REVOCATION_FULL_RELOAD_SECONDS, dropping tokens that have expired anyway. A logout
+takes effect at once in the process that handled it, and in the others after their next poll.
+"""
+import asyncio
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from . import crud
+from .config import settings
+from .database import SessionLocal
+
+
+logger = logging.getLogger(__name__)
+
+MERGE_THRESHOLD = 4096
+
+# polls re-read this much before the last one, so revocations committed late are not missed
+_POLL_OVERLAP = timedelta(seconds=5)
+
+
+def jti_key(jti: str) -> int:
+    """64-bit key of a jti (32 hex chars). Raises ValueError for anything else."""
+    return int(jti[:16], 16)
+
+
+class RevocationList:
+    """
+    Set of revoked jti keys. Lookups take no lock: writers build new containers and swap them
+    in, so a reader sees every key in either the array or the recent set.
+    """
+
+    def __init__(self):
+        self._base = array("Q")
+        self._recent: set = set()
+        self._lock = threading.Lock()
+        self._reloading = False
+        self._polled_at: Optional[datetime] = None
+        self._loaded_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._base) + len(self._recent)
+
+    def __contains__(self, key: int) -> bool:
+        if key in self._recent:
+            return True
+        base = self._base
+        i = bisect_left(base, key)
+        return i < len(base) and base[i] == key
+
+    def is_revoked(self, jti: str) -> bool:
+        return jti_key(jti) in self
+
+    def add(self, keys: Iterable[int], merge: bool = False) -> None:
+        """
+        Add keys to the recent set. With `merge` (the polling thread; it takes ~100ms
+        at a million keys, so not on the event loop) a large recent set is folded into the array.
+        """
+        with self._lock:
+            recent = set(self._recent)
+            recent.update(k for k in keys if k not in self)
+            # no merging during a reload, whose array would not have these keys
+            if not merge or len(recent) < MERGE_THRESHOLD or self._reloading:
+                self._recent = recent
+                return
+            # array first: until the set is replaced, every key is in at least one of them;
+            # timsort merges the two sorted runs in one linear pass
+            keys = self._base.tolist()
+            keys.extend(sorted(recent))
+            keys.sort()
+            self._base = array("Q", keys)
+            self._recent = set()
+
+    def replace(self, keys: Iterable[int]) -> None:
+        """Swap in a full list; keys added meanwhile stay in the recent set."""
+        base = array("Q", sorted(set(keys)))
+        with self._lock:
+            self._base = base
+
+    def stats(self) -> dict:
+        return {"size": len(self), "recent": len(self._recent), "bytes": self._base.itemsize * len(self._base)}
+
+    # loading
+
+    def reload(self) -> None:
+        """Load every unexpired revocation; blocking, run off the event loop."""
+        started = datetime.utcnow()
+        self._reloading = True
+        try:
+            with SessionLocal() as db:
+                crud.purge_expired_revocations(db)
+                rows = crud.get_revoked_tokens(db)
+            self.replace(jti_key(jti) for jti, _ in rows)
+        finally:
+            self._reloading = False
+        self._polled_at = started
+        self._loaded_at = time.monotonic()
+
+    def poll(self) -> None:
+        """Add revocations made since the last poll; blocking, run off the event loop."""
+        if self._polled_at is None:
+            return self.reload()
+        started = datetime.utcnow()
+        with SessionLocal() as db:
+            rows = crud.get_revoked_tokens(db, revoked_since=self._polled_at - _POLL_OVERLAP)
+        self.add((jti_key(jti) for jti, _ in rows), merge=True)
+        self._polled_at = started
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.REVOCATION_REFRESH_SECONDS)
+            try:
+                if time.monotonic() - self._loaded_at >= settings.REVOCATION_FULL_RELOAD_SECONDS:
+                    await run_in_threadpool(self.reload)
+                else:
+                    await run_in_threadpool(self.poll)
+            except Exception:
+                # keep serving with the list we have; the next round retries
+                logger.exception("refreshing revoked tokens failed")
+
+    async def start(self) -> None:
+        await run_in_threadpool(self.reload)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+revoked_tokens = RevocationList()
@@ -1,6 +1,130 @@
-# ...existing code...
-from uvicorn import run
+# app/run.py
+"""
+Production launcher: gunicorn master with uvicorn workers.
+
+    python -m app.run                    # SERVER_WORKERS workers (default: one per CPU)
+    python -m app.run --workers 4 --port 8080
+    python -m app.run --reload           # single-process dev server with auto-reload
+
+- the database is verified and tables are created once, in the master, before forking
+- the app is imported in the master (preload), so workers start from a warm, shared image
+- every worker drops the pooled connections it inherited and opens its own
+  (DB_POOL_WARMUP of them at startup)
+- SIGTERM / SIGINT: workers stop accepting, drain in-flight requests for up to
+  SERVER_GRACEFUL_TIMEOUT seconds, then run the app's shutdown handlers (engine dispose)
+- startup time (bootstrap, app import, per-worker boot) is logged
+"""
+import argparse
+import os
+import time
+
+from .config import settings
+
+
+_started = time.perf_counter()
+_timings = {}
+
+
+def worker_count(requested: int = 0) -> int:
+    return requested if requested > 0 else (os.cpu_count() or 1)
+
+
+def _post_fork(server, worker):
+    # connections opened by the master must never be shared between processes
+    from .database import engine, async_engine, read_router
+    from .sharding import shard_map
+
+    engine.dispose(close=False)
+    if async_engine is not None:
+        async_engine.sync_engine.dispose(close=False)
+    for replica in read_router.replicas:
+        replica.engine.dispose(close=False)
+        if replica.async_engine is not None:
+            replica.async_engine.sync_engine.dispose(close=False)
+    for shard_engine in shard_map.engines():
+        shard_engine.dispose(close=False)
+    worker.unote_forked_at = time.perf_counter()
+
+
+def _post_worker_init(worker):
+    worker.log.info("worker %s booted in %.3fs", worker.pid, time.perf_counter() - worker.unote_forked_at)
+
+
+def _when_ready(server):
+    server.log.info(
+        "ready in %.3fs (database bootstrap %.3fs, app import %.3fs), %s workers",
+        time.perf_counter() - _started, _timings.get("bootstrap", 0.0), _timings.get("import", 0.0), server.num_workers,
+    )
+
+
+def serve(host: str, port: int, workers: int) -> None:
+    from gunicorn.app.base import BaseApplication
+    from uvicorn_worker import UvicornWorker
+
+    class Worker(UvicornWorker):
+        CONFIG_KWARGS = {
+            "loop": settings.SERVER_LOOP,
+            "http": settings.SERVER_HTTP,
+            "lifespan": "on",
+            "timeout_graceful_shutdown": settings.SERVER_GRACEFUL_TIMEOUT,
+        }
+
+    class Application(BaseApplication):
+        def __init__(self, options: dict):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # runs once in the master because of preload_app
+            start = time.perf_counter()
+            from .init_db import bootstrap_database
+            from .database import engine
+            from .sharding import shard_map
+
+            bootstrap_database()
+            engine.dispose()
+            shard_map.dispose()
+            _timings["bootstrap"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            settings.DB_BOOTSTRAP_ON_IMPORT = False
+            from .main import app
+
+            _timings["import"] = time.perf_counter() - start
+            return app
+
+    Application({
+        "bind": f"{host}:{port}",
+        "workers": worker_count(workers),
+        "worker_class": Worker,
+        "preload_app": True,
+        "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT,
+        "keepalive": settings.SERVER_KEEPALIVE,
+        "post_fork": _post_fork,
+        "post_worker_init": _post_worker_init,
+        "when_ready": _when_ready,
+    }).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS, help="0 = one per CPU")
+    parser.add_argument("--reload", action="store_true", help="single-process dev server with auto-reload")
+    args = parser.parse_args()
+
+    if args.reload:
+        from uvicorn import run
+
+        run("app.main:app", host=args.host, port=args.port, reload=True)
+        return
+    serve(args.host, args.port, args.workers)
+
 
 if __name__ == "__main__":
-    # runs the app exported as `app` in app/main.py
-    run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    main()
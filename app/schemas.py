@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, ConfigDict
-from typing import Optional
+from pydantic import BaseModel, EmailStr, ConfigDict, Field
+from typing import Literal, Optional
 from datetime import datetime
 from typing import Optional
 
@@ -47,7 +47,65 @@ class NoteOut(BaseModel):
 class Config:
     orm_mode = True
 
+
+class NoteSearchHit(NoteOut):
+    score: float
+
+
+class NoteSummary(BaseModel):
+    """A note in the list's summary view: the content is cut to a snippet."""
+    note_id: str
+    user_id: str
+    note_title: Optional[str]
+    snippet: Optional[str]
+    truncated: bool  # the full note_content is longer than snippet
+    created_on: datetime
+    last_update: datetime
+
+
+class NoteTombstoneOut(BaseModel):
+    note_id: str
+    deleted_on: datetime
+
+
+class NoteChanges(BaseModel):
+    changes: list[NoteOut]  # created or updated, oldest change first
+    deleted: list[NoteTombstoneOut]
+    watermark: str  # pass as `since` next time
+    has_more: bool
+
+
 class NoteUpdate(BaseModel):
     model_config = ConfigDict(extra="forbid")   # reject unexpected fields
     note_title: Optional[str] = None
-    note_content: Optional[str] = None
\ No newline at end of file
+    note_content: Optional[str] = None
+
+
+class NoteBatchOp(BaseModel):
+    """
+    One operation in a batch:
+      - create: note_title / note_content
+      - update: note_id plus the fields to change
+      - delete: note_id
+    """
+    model_config = ConfigDict(extra="forbid")
+    op: Literal["create", "update", "delete"]
+    note_id: Optional[str] = None
+    note_title: Optional[str] = None
+    note_content: Optional[str] = None
+
+
+class NoteBatchRequest(BaseModel):
+    operations: list[NoteBatchOp] = Field(..., min_length=1)
+
+
+class NoteBatchResult(BaseModel):
+    index: int
+    op: str
+    status: int  # HTTP-style status of this operation: 201, 200, 204, 400 or 404
+    note_id: Optional[str] = None
+    detail: Optional[str] = None
+
+
+class NoteBatchResponse(BaseModel):
+    results: list[NoteBatchResult]
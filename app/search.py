@@ -0,0 +1,322 @@
+# app/search.py
+"""
+Full-text search over a user's note titles and contents.
+
+Backends (Settings.SEARCH_BACKEND):
+  - "fulltext": MySQL MATCH ... AGAINST over the FULLTEXT index on notes(note_title, note_content);
+                a LIKE scan while that index is missing
+  - "memory":   in-process inverted index with BM25 ranking, kept current by crud's
+                create/update/delete, for the SEARCH_INDEX_MAX_USERS most recently searching
+                users; meant for SQLite and test deployments (single process)
+  - "like":     LIKE scan, no index; kept as a baseline
+  - "auto":     "fulltext" on MySQL, otherwise "memory"
+
+Only "memory" finds notes stored compressed (NOTE_COMPRESSION), so with compression on the
+others are refused at startup.
+"""
+import heapq
+import logging
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+from .database import engine
+
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# title terms count this many times when indexing, so title hits rank higher
+TITLE_WEIGHT = 2
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _fetch_notes_in_order(db: Session, user_id: str, ranked: List[Tuple[str, float]]):
+    if not ranked:
+        return []
+    notes = (
+        db.query(models.Note)
+        .filter(models.Note.user_id == user_id, models.Note.note_id.in_([nid for nid, _ in ranked]))
+        .all()
+    )
+    by_id = {n.note_id: n for n in notes}
+    return [(by_id[nid], score) for nid, score in ranked if nid in by_id]
+
+
+class SearchBackend:
+    name = "base"
+    # whether notes stored compressed (NOTE_COMPRESSION) can be found; SQL sees only their encoding
+    finds_compressed = False
+
+    def search(self, db: Session, user_id: str, query: str, limit: int = 20) -> List[Tuple[models.Note, float]]:
+        """Return up to `limit` (note, score) pairs for the user, best match first."""
+        raise NotImplementedError
+
+    # write hooks called by crud after a commit; database-backed indexes need nothing here
+
+    def index_note(self, note: models.Note) -> None:
+        pass
+
+    def remove_note(self, note_id: str, user_id: str) -> None:
+        pass
+
+    def reindex_notes(self, db: Session, user_id: str, note_ids: List[str]) -> None:
+        """Refresh several notes after a bulk write that didn't load them as ORM objects."""
+        pass
+
+
+# MySQL error 1191: Can't find FULLTEXT index matching the column list
+_ER_FT_MATCHING_KEY_NOT_FOUND = 1191
+
+
+class MySQLFulltextBackend(SearchBackend):
+    """
+    MATCH ... AGAINST; needs the ft_notes_title_content index, which bootstrap creates on
+    tables from before it. Where the index is still missing the process falls back to a
+    LIKE scan until restarted.
+    """
+
+    name = "fulltext"
+
+    def __init__(self):
+        self._fallback: Optional[SearchBackend] = None
+
+    def search(self, db, user_id, query, limit=20):
+        if self._fallback is not None:
+            return self._fallback.search(db, user_id, query, limit)
+        score = match(models.Note.note_title, models.Note.note_content, against=query).in_natural_language_mode()
+        try:
+            rows = (
+                db.query(models.Note, score.label("score"))
+                .filter(models.Note.user_id == user_id, score > 0)
+                .order_by(score.desc())
+                .limit(limit)
+                .all()
+            )
+        except DBAPIError as e:
+            args = getattr(e.orig, "args", ())
+            if not args or args[0] != _ER_FT_MATCHING_KEY_NOT_FOUND:
+                raise
+            logger.warning("notes have no FULLTEXT index (run app.init_db bootstrap); searching with LIKE")
+            self._fallback = LikeScanBackend()
+            return self._fallback.search(db, user_id, query, limit)
+        return [(note, float(s)) for note, s in rows]
+
+
+class LikeScanBackend(SearchBackend):
+    name = "like"
+
+    def search(self, db, user_id, query, limit=20):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        clauses = []
+        for term in terms:
+            pattern = f"%{term}%"
+            clauses.append(models.Note.note_title.ilike(pattern))
+            clauses.append(models.Note.note_content.ilike(pattern))
+        notes = (
+            db.query(models.Note)
+            .filter(models.Note.user_id == user_id, or_(*clauses))
+            .order_by(models.Note.created_on.desc())
+            .limit(limit)
+            .all()
+        )
+        return [(n, 1.0) for n in notes]
+
+
+class _UserIndex:
+    __slots__ = ("postings", "doc_terms", "doc_len", "total_len")
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_terms: Dict[str, Counter] = {}
+        self.doc_len: Dict[str, int] = {}
+        self.total_len = 0
+
+    def add(self, note_id: str, title: Optional[str], content: Optional[str]) -> None:
+        self.remove(note_id)
+        terms = Counter(tokenize(content))
+        for term in tokenize(title):
+            terms[term] += TITLE_WEIGHT
+        self.doc_terms[note_id] = terms
+        self.doc_len[note_id] = sum(terms.values())
+        self.total_len += self.doc_len[note_id]
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[note_id] = tf
+
+    def remove(self, note_id: str) -> None:
+        terms = self.doc_terms.pop(note_id, None)
+        if terms is None:
+            return
+        self.total_len -= self.doc_len.pop(note_id)
+        for term in terms:
+            docs = self.postings.get(term)
+            if docs is not None:
+                docs.pop(note_id, None)
+                if not docs:
+                    del self.postings[term]
+
+
+class InvertedIndexBackend(SearchBackend):
+    """
+    Per-user inverted index held in this process.
+
+    A user's notes are loaded on their first search; from then on crud keeps the index
+    current. Writes that land while a user is still loading are replayed afterwards.
+    Only the max_users most recently searching users are kept; the least recent is dropped
+    and loaded again on its next search.
+    Other processes' writes are not seen, so use a database backend with several workers.
+    """
+
+    name = "memory"
+    finds_compressed = True  # indexes the decoded text
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, max_users: int = settings.SEARCH_INDEX_MAX_USERS):
+        self.max_users = max_users
+        self._users: "OrderedDict[str, _UserIndex]" = OrderedDict()
+        self._loading: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self, db: Session, user_id: str) -> _UserIndex:
+        with self._lock:
+            idx = self._users.get(user_id)
+            if idx is not None:
+                self._users.move_to_end(user_id)
+                return idx
+            self._loading.setdefault(user_id, [])
+
+        try:
+            rows = (
+                db.query(models.Note.note_id, models.Note.note_title, models.Note.note_content)
+                .filter(models.Note.user_id == user_id)
+                .all()
+            )
+        except Exception:
+            with self._lock:
+                self._loading.pop(user_id, None)
+            raise
+        idx = _UserIndex()
+        for note_id, title, content in rows:
+            idx.add(note_id, title, content)
+
+        with self._lock:
+            existing = self._users.get(user_id)
+            if existing is not None:  # another thread finished first
+                return existing
+            for op, args in self._loading.pop(user_id, []):
+                getattr(idx, op)(*args)
+            self._users[user_id] = idx
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+            return idx
+
+    def index_note(self, note):
+        self._apply(note.user_id, "add", (note.note_id, note.note_title, note.note_content))
+
+    def remove_note(self, note_id, user_id):
+        self._apply(user_id, "remove", (note_id,))
+
+    def reindex_notes(self, db, user_id, note_ids):
+        with self._lock:
+            tracked = user_id in self._users or user_id in self._loading
+        if not tracked or not note_ids:
+            return
+        rows = (
+            db.query(models.Note.note_id, models.Note.note_title, models.Note.note_content)
+            .filter(models.Note.user_id == user_id, models.Note.note_id.in_(note_ids))
+            .all()
+        )
+        for note_id, title, content in rows:
+            self._apply(user_id, "add", (note_id, title, content))
+
+    def _apply(self, user_id: str, op: str, args: tuple) -> None:
+        with self._lock:
+            idx = self._users.get(user_id)
+            if idx is not None:
+                getattr(idx, op)(*args)
+            elif user_id in self._loading:
+                self._loading[user_id].append((op, args))
+            # users that were never searched are loaded from the DB on first search
+
+    def search(self, db, user_id, query, limit=20):
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        idx = self._ensure_loaded(db, user_id)
+        with self._lock:
+            n_docs = len(idx.doc_terms)
+            if n_docs == 0:
+                return []
+            avg_len = idx.total_len / n_docs
+            scores: Dict[str, float] = {}
+            for term in terms:
+                docs = idx.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                for note_id, tf in docs.items():
+                    dl = idx.doc_len[note_id]
+                    norm = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * dl / avg_len))
+                    scores[note_id] = scores.get(note_id, 0.0) + idf * norm
+            ranked = heapq.nlargest(limit, scores.items(), key=lambda kv: kv[1])
+        return _fetch_notes_in_order(db, user_id, ranked)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._users.clear()
+            self._loading.clear()
+
+    def loaded_users(self) -> Set[str]:
+        with self._lock:
+            return set(self._users)
+
+
+_BACKENDS = {
+    "fulltext": MySQLFulltextBackend,
+    "memory": InvertedIndexBackend,
+    "like": LikeScanBackend,
+}
+
+
+def backend_class(name: str, dialect_name: str, compression: bool = False) -> type:
+    """
+    The SearchBackend class for SEARCH_BACKEND `name`. With `compression` (notes are or will be
+    stored compressed), refuses the backends that could not find those notes.
+    """
+    if name == "auto":
+        name = "fulltext" if dialect_name == "mysql" else "memory"
+    try:
+        cls = _BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown SEARCH_BACKEND {name!r}; expected one of auto, {', '.join(_BACKENDS)}")
+    if compression and not cls.finds_compressed:
+        raise ValueError(
+            f"the {name!r} search backend cannot find compressed notes; with NOTE_COMPRESSION "
+            f"set SEARCH_BACKEND=memory, or turn compression off"
+        )
+    return cls
+
+
+def make_backend(name: str, dialect_name: str, compression: bool = False) -> SearchBackend:
+    return backend_class(name, dialect_name, compression)()
+
+
+search_backend = make_backend(settings.SEARCH_BACKEND, engine.dialect.name, settings.NOTE_COMPRESSION)
@@ -0,0 +1,103 @@
+# app/serialize.py
+"""
+Response encoding for notes and users, without ORM instances or pydantic on the hot path.
+
+Rows (Core rows from crud or ORM objects, anything with the attributes) become plain
+dicts, which are written straight to JSON bytes. Ids already arrive as hex strings
+(models.HexUUID), so there is no per-id conversion here. The output is byte-identical
+to FastAPI rendering response_model=NoteOut / UserOut: compact separators, non-ASCII kept
+as UTF-8, datetimes in isoformat, fields in schema order.
+
+orjson is used when installed; otherwise the stdlib json module with the same settings.
+"""
+import json
+from datetime import datetime
+from typing import Any, Iterable, List
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+
+def note_dict(row) -> dict:
+    return {
+        "note_id": row.note_id,
+        "user_id": row.user_id,
+        "note_title": row.note_title,
+        "note_content": row.note_content,
+        "created_on": row.created_on,
+        "last_update": row.last_update,
+    }
+
+
+def note_dicts(rows: Iterable) -> List[dict]:
+    return [
+        {
+            "note_id": row.note_id,
+            "user_id": row.user_id,
+            "note_title": row.note_title,
+            "note_content": row.note_content,
+            "created_on": row.created_on,
+            "last_update": row.last_update,
+        }
+        for row in rows
+    ]
+
+
+def note_summary_dicts(rows: Iterable, snippet_length: int) -> List[dict]:
+    """
+    Summary view of rows from crud.get_notes_by_user(view="summary"), whose `snippet` holds
+    up to snippet_length + 1 characters of the content; any past snippet_length mean it was cut.
+    """
+    out = []
+    for row in rows:
+        snippet = row.snippet
+        truncated = snippet is not None and len(snippet) > snippet_length
+        out.append({
+            "note_id": row.note_id,
+            "user_id": row.user_id,
+            "note_title": row.note_title,
+            "snippet": snippet[:snippet_length] if truncated else snippet,
+            "truncated": truncated,
+            "created_on": row.created_on,
+            "last_update": row.last_update,
+        })
+    return out
+
+
+def tombstone_dicts(rows: Iterable) -> List[dict]:
+    return [{"note_id": row.note_id, "deleted_on": row.deleted_on} for row in rows]
+
+
+def user_dict(user) -> dict:
+    return {
+        "user_id": user.user_id,
+        "user_name": user.user_name,
+        "user_email": user.user_email,
+        "created_on": user.created_on,
+        "last_update": user.last_update,
+    }
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with dumps() above; content is passed through as-is (no jsonable_encoder)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,208 @@
+# app/sharding.py
+"""
+Horizontal sharding of notes by user (NOTE_SHARD_URLS).
+
+A user's notes and note tombstones all live on one shard database. Users, revoked tokens
+and the user_shards directory stay on the primary (DATABASE_URL). At signup a user is
+placed by a hash of the 16-byte user_id (hash_shard) and the choice is written to the
+directory. From then on the directory, not the hash, decides: adding a shard moves nobody
+until app.rebalance does. Users without an entry (signed up before sharding) are on
+NOTE_SHARD_DEFAULT, the shard that holds the notes written before then.
+
+Route sessions (deps.get_db / get_read_db) bind the note tables to the user's shard and
+everything else to the primary or a replica, so crud needs no shard awareness. Each
+process caches directory entries for SHARD_DIRECTORY_TTL_SECONDS.
+
+While app.rebalance copies a user's last changes to a new shard, the entry is locked.
+Reads go on against the old shard; writes to the note tables raise UserMoving (503).
+"""
+import hashlib
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import MetaData, create_engine, event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
+
+from . import database, models
+from .cache import TTLCache
+from .config import settings
+
+
+SHARDED_TABLES = (models.Note.__table__, models.NoteTombstone.__table__)
+_SHARDED_NAMES = frozenset(t.name for t in SHARDED_TABLES)
+
+
+class UserMoving(Exception):
+    """Raised on a write to the notes of a user that app.rebalance is moving to another shard."""
+
+
+class Placement(NamedTuple):
+    shard: int
+    locked: bool = False
+
+
+def hash_shard(user_id: str, n: int) -> int:
+    """Shard for a new user, from a hash of the binary user_id (uuid7 ids share their time prefix)."""
+    digest = hashlib.blake2b(bytes.fromhex(user_id), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % n
+
+
+def shard_metadata() -> MetaData:
+    """
+    The note tables as created on a shard: without their foreign keys to users, which live
+    on the primary. Deleting a user does not cascade to their notes on a shard.
+    """
+    metadata = MetaData()
+    for table in SHARDED_TABLES:
+        copy = table.to_metadata(metadata)
+        for fk in list(copy.foreign_key_constraints):
+            copy.constraints.discard(fk)
+        for column in copy.columns:
+            column.foreign_keys.clear()
+        copy.foreign_keys.clear()
+        for index in copy.indexes:
+            if index.kwargs.get("mysql_prefix") == "FULLTEXT":  # to_metadata drops ddl_if
+                index.ddl_if(dialect="mysql")
+    return metadata
+
+
+class Shard:
+    """One note shard: its engines, shared with the primary when the URL is DATABASE_URL."""
+
+    def __init__(self, index: int, url: str):
+        self.index = index
+        self.name = f"shard{index}"
+        self.url = url
+        self.is_primary = url == database.DATABASE_URL
+        if self.is_primary:
+            self.engine, self.async_engine = database.engine, database.async_engine
+            return
+        self.engine = create_engine(url, **database._engine_kwargs(url, name=self.name))
+        database.configure_engine(self.engine)
+        self.async_engine = None
+        if settings.DB_ASYNC:
+            async_url = database.to_async_url(url)
+            self.async_engine = create_async_engine(
+                async_url, **database._engine_kwargs(async_url, is_async=True, name=f"{self.name}_async")
+            )
+            database.configure_engine(self.async_engine.sync_engine)
+
+
+class ShardMap:
+    """
+    Where each user's notes are (locate, from the directory on the primary) and session
+    factories bound accordingly (open_session). Disabled, with no shards, when
+    NOTE_SHARD_URLS is empty.
+    """
+
+    def __init__(self, shards: List[Shard], default: int, directory_ttl: float):
+        if shards and not 0 <= default < len(shards):
+            raise ValueError(f"NOTE_SHARD_DEFAULT {default} is not one of the {len(shards)} NOTE_SHARD_URLS")
+        self.shards = shards
+        self.default = default
+        self.directory = TTLCache(maxsize=100000, ttl=directory_ttl)
+        self._factories = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.shards)
+
+    def assign(self, user_id: str) -> int:
+        return hash_shard(user_id, len(self.shards))
+
+    def locate(self, user_id: str) -> Placement:
+        """The user's shard and lock state, from the directory on the primary. Blocking on a cache miss."""
+        placement = self.directory.get(user_id)
+        if placement is None:
+            with database.SessionLocal() as db:
+                row = db.execute(
+                    select(models.UserShard.shard, models.UserShard.locked).where(models.UserShard.user_id == user_id)
+                ).first()
+            placement = Placement(row.shard, bool(row.locked)) if row else Placement(self.default)
+            self.directory.set(user_id, placement)
+        return placement
+
+    async def locate_async(self, user_id: str) -> Placement:
+        placement = self.directory.get(user_id)
+        return placement if placement is not None else await run_in_threadpool(self.locate, user_id)
+
+    def _factory(self, shard: int, replica: Optional[database.Replica]):
+        key = (shard, replica.name if replica else None)
+        factory = self._factories.get(key)
+        if factory is None:
+            info = {"shard": shard}
+            if replica is not None:
+                info["replica"] = replica.name
+            if settings.DB_ASYNC:
+                notes = self.shards[shard].async_engine
+                factory = async_sessionmaker(
+                    bind=replica.async_engine if replica else database.async_engine,
+                    binds={table: notes for table in SHARDED_TABLES},
+                    autoflush=False, expire_on_commit=False, info=info,
+                )
+            else:
+                notes = self.shards[shard].engine
+                factory = sessionmaker(
+                    bind=replica.engine if replica else database.engine,
+                    binds={table: notes for table in SHARDED_TABLES},
+                    autocommit=False, autoflush=False, info=info,
+                )
+            self._factories[key] = factory
+        return factory
+
+    def open_session(self, placement: Placement, replica: Optional[database.Replica] = None):
+        """
+        A Session (AsyncSession with DB_ASYNC) with the note tables on the placement's shard and
+        the rest on the primary, or on replica when given. The shards have no replicas.
+        """
+        db = self._factory(placement.shard, replica)()
+        if placement.locked:
+            db.info["shard_locked"] = True
+        return db
+
+    def engines(self) -> list:
+        """The shards' own engines (not the primary's), sync side."""
+        engines = []
+        for shard in self.shards:
+            if not shard.is_primary:
+                engines.append(shard.engine)
+                if shard.async_engine is not None:
+                    engines.append(shard.async_engine.sync_engine)
+        return engines
+
+    def dispose(self) -> None:
+        for shard in self.shards:
+            if not shard.is_primary:
+                shard.engine.dispose()
+
+    async def dispose_async(self) -> None:
+        for shard in self.shards:
+            if not shard.is_primary and shard.async_engine is not None:
+                await shard.async_engine.dispose()
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _refuse_statements_while_moving(state):
+    if not state.session.info.get("shard_locked") or state.is_select:
+        return
+    table = getattr(state.statement, "table", None)
+    if getattr(table, "name", None) in _SHARDED_NAMES:
+        raise UserMoving()
+
+
+@event.listens_for(Session, "before_flush")
+def _refuse_flush_while_moving(session, flush_context, instances):
+    if session.info.get("shard_locked") and any(
+        isinstance(obj, (models.Note, models.NoteTombstone))
+        for obj in (*session.new, *session.dirty, *session.deleted)
+    ):
+        raise UserMoving()
+
+
+NOTE_SHARD_URLS = [u.strip() for u in settings.NOTE_SHARD_URLS.split(",") if u.strip()]
+shard_map = ShardMap(
+    [Shard(i, url) for i, url in enumerate(NOTE_SHARD_URLS)],
+    settings.NOTE_SHARD_DEFAULT,
+    settings.SHARD_DIRECTORY_TTL_SECONDS,
+)
@@ -0,0 +1,52 @@
+# benchmarks/__main__.py
+"""
+Run the standard suite: seed -> load test -> micro-benchmarks, saved as one JSON file.
+
+Runs offline against a local SQLite file unless DATABASE_URL is set (e.g. a local MySQL).
+
+Usage:
+    python -m benchmarks                      # default scale
+    python -m benchmarks --users 50 --notes-per-user 5000 --concurrency 32 --duration 60
+    python -m benchmarks.compare bench_results/suite-A.json bench_results/suite-B.json
+"""
+import argparse
+import asyncio
+
+from .common import ensure_offline_database, save_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--notes-per-user", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--login-every", type=int, default=20)
+    parser.add_argument("--micro-scale", type=float, default=1.0)
+    parser.add_argument("--skip-micro", action="store_true")
+    args = parser.parse_args()
+
+    database = ensure_offline_database()
+
+    from .load import print_load, run_load
+    from .micro import print_micro, run_micro
+    from .seed import seed
+
+    results = {"config": vars(args) | {"database": database}}
+    print("seeding", database)
+    results["seed"] = seed(args.users, args.notes_per_user)
+
+    print("load test")
+    results["load"] = asyncio.run(run_load(args.concurrency, args.duration, args.users, args.login_every))
+    print_load(results["load"])
+
+    if not args.skip_micro:
+        print("micro-benchmarks")
+        results["micro"] = run_micro(args.micro_scale)
+        print_micro(results["micro"])
+
+    print("results:", save_results("suite", results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# benchmarks/batch_bench.py
+"""
+Notes/sec for the batch write path vs one call (and one commit) per note.
+
+  per-note: crud.create_note / update_note / delete_note for each note, as N HTTP requests would
+  batch:    crud.apply_note_batch with the same operations, chunked to --batch-size
+
+Usage:
+    python -m benchmarks.batch_bench --notes 5000 --batch-size 1000
+    python -m benchmarks.batch_bench --url mysql+pymysql://user:pw@127.0.0.1/benchdb
+"""
+import argparse
+import os
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models, schemas
+from app.database import Base
+
+from .common import save_results
+
+
+def _new_user(engine) -> str:
+    user_id = uuid.uuid4().hex
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{
+            "user_id": user_id, "user_name": "bench", "user_email": f"bench-{uuid.uuid4().hex}@example.com",
+            "password_hash": "x",
+        }])
+    return user_id
+
+
+def per_note(Session, user_id, n):
+    timings = {}
+    with Session() as db:
+        start = time.perf_counter()
+        notes = [crud.create_note(db, user_id, schemas.NoteCreate(note_title=f"t{i}", note_content="c" * 200))
+                 for i in range(n)]
+        timings["create"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for note in notes:
+            crud.update_note(db, note, schemas.NoteUpdate(note_title="updated"))
+        timings["update"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for note in notes:
+            crud.delete_note(db, note)
+        timings["delete"] = time.perf_counter() - start
+    return timings
+
+
+def batched(Session, user_id, n, batch_size):
+    timings = {}
+    with Session() as db:
+        ids = []
+        start = time.perf_counter()
+        for off in range(0, n, batch_size):
+            ops = [schemas.NoteBatchOp(op="create", note_title=f"t{i}", note_content="c" * 200)
+                   for i in range(off, min(n, off + batch_size))]
+            ids += [r["note_id"] for r in crud.apply_note_batch(db, user_id, ops)]
+        timings["create"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for off in range(0, n, batch_size):
+            ops = [schemas.NoteBatchOp(op="update", note_id=nid, note_title="updated") for nid in ids[off:off + batch_size]]
+            crud.apply_note_batch(db, user_id, ops)
+        timings["update"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for off in range(0, n, batch_size):
+            ops = [schemas.NoteBatchOp(op="delete", note_id=nid) for nid in ids[off:off + batch_size]]
+            crud.apply_note_batch(db, user_id, ops)
+        timings["delete"] = time.perf_counter() - start
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="database URL (default: temporary SQLite file)")
+    parser.add_argument("--notes", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'batch_bench.db')}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    results = {"url": url.split("@")[-1], "notes": args.notes, "batch_size": args.batch_size, "paths": {}}
+    for name, fn in (("per_note", lambda u: per_note(Session, u, args.notes)),
+                     ("batch", lambda u: batched(Session, u, args.notes, args.batch_size))):
+        timings = fn(_new_user(engine))
+        results["paths"][name] = {
+            op: {"seconds": secs, "notes_per_sec": args.notes / secs if secs else 0.0} for op, secs in timings.items()
+        }
+        print(f"{name:>9}: " + "  ".join(f"{op}={args.notes / secs:,.0f}/s" for op, secs in timings.items()))
+    engine.dispose()
+    print("results:", save_results("batch", results))
+
+
+if __name__ == "__main__":
+    main()
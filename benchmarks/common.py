@@ -0,0 +1,79 @@
+# benchmarks/common.py
+import json
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+
+RESULTS_DIR = os.environ.get("BENCH_RESULTS_DIR", "bench_results")
+
+
+def ensure_offline_database() -> str:
+    """
+    Point the app at a local SQLite stand-in unless DATABASE_URL is set in the environment,
+    and turn rate limiting off unless RATE_LIMIT_BACKEND is set.
+
+    Must run before anything imports app.*, because Settings is read at import time.
+    Returns the URL in use (without credentials) for the results file.
+    """
+    # load generators log in far more often than the per-IP login budget allows
+    os.environ.setdefault("RATE_LIMIT_BACKEND", "none")
+    if not os.environ.get("DATABASE_URL"):
+        path = os.environ.get("BENCH_SQLITE_PATH") or os.path.join(tempfile.gettempdir(), "unote_bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    return os.environ["DATABASE_URL"].split("@")[-1]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of `values` (pct in 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[k]
+
+
+def summarize(latencies: Iterable[float]) -> Dict[str, float]:
+    """Count, mean and p50/p95/p99/max of a list of latencies in seconds, reported in ms."""
+    values = list(latencies)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean_ms": sum(values) / len(values) * 1000,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "max_ms": max(values) * 1000,
+    }
+
+
+def save_results(name: str, results: dict) -> str:
+    """Write `results` plus run metadata to RESULTS_DIR/<name>-<timestamp>.json and return the path."""
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    path = os.path.join(RESULTS_DIR, f"{name}-{stamp}.json")
+    payload = {
+        "benchmark": name,
+        "timestamp": stamp,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2, default=str)
+    return path
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+        return False
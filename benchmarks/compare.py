@@ -0,0 +1,53 @@
+# benchmarks/compare.py
+"""
+Compare two saved result files metric by metric.
+
+Every numeric leaf present in both files is printed with its relative change, e.g.
+load.ops.list.p99_ms. Latency-like metrics (*_ms, *_us, seconds) improve when they go
+down; throughput-like metrics (*rps, *_per_sec) improve when they go up.
+
+Usage:
+    python -m benchmarks.compare bench_results/suite-before.json bench_results/suite-after.json
+"""
+import argparse
+import json
+
+
+def _flatten(prefix: str, value, out: dict) -> None:
+    if isinstance(value, dict):
+        for k, v in value.items():
+            _flatten(f"{prefix}.{k}" if prefix else str(k), v, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = float(value)
+
+
+def _higher_is_better(key: str) -> bool:
+    leaf = key.rsplit(".", 1)[-1]
+    return leaf.endswith("rps") or leaf.endswith("_per_sec")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--filter", default="", help="only keys containing this substring")
+    args = parser.parse_args()
+
+    flat_a, flat_b = {}, {}
+    with open(args.before) as f:
+        _flatten("", json.load(f).get("results", {}), flat_a)
+    with open(args.after) as f:
+        _flatten("", json.load(f).get("results", {}), flat_b)
+
+    for key in sorted(set(flat_a) & set(flat_b)):
+        if args.filter not in key or key.startswith("config."):
+            continue
+        a, b = flat_a[key], flat_b[key]
+        change = (b - a) / a * 100 if a else 0.0
+        better = (change > 0) == _higher_is_better(key) if change else None
+        mark = "" if better is None else ("  better" if better else "  worse")
+        print(f"{key:<45} {a:>14.3f} -> {b:>14.3f}  {change:+7.1f}%{mark}")
+
+
+if __name__ == "__main__":
+    main()
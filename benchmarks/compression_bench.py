@@ -0,0 +1,150 @@
+# benchmarks/compression_bench.py
+"""
+note_content compression at rest (app.compression): table size, read and write latency.
+
+The same notes (log-like text, --content-chars long) are written once with
+NOTE_COMPRESSION off and once with it on, into a fresh notes table each time:
+
+  write: one note per INSERT + COMMIT, median / p95 latency
+  read:  GET-by-id (crud.get_note_by_id) and one list page (crud.get_notes_by_user)
+  size:  stored note_content bytes, and the table size on disk (SQLite file after
+         VACUUM; MySQL information_schema data_length after ANALYZE TABLE)
+
+Usage:
+    python -m benchmarks.compression_bench --notes 2000 --content-chars 20000
+    python -m benchmarks.compression_bench --url mysql+pymysql://user:pw@127.0.0.1/benchdb
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import Text, create_engine, func, insert, select, text, type_coerce
+from sqlalchemy.orm import sessionmaker
+
+from app import compression, crud, models
+from app.config import settings
+from app.database import Base
+
+from .common import percentile, save_results
+
+
+def _log_text(rng: random.Random, chars: int) -> str:
+    lines, size = [], 0
+    start = datetime(2026, 1, 1)
+    while size < chars:
+        line = (f"{(start + timedelta(milliseconds=size)).isoformat()} {rng.choice(['INFO', 'INFO', 'WARN', 'ERROR'])} "
+                f"worker-{rng.randint(1, 8)} request_id={uuid.UUID(int=rng.getrandbits(128)).hex} "
+                f"path=/homepage/notes status={rng.choice([200, 200, 304, 404])} ms={rng.randint(1, 900)}")
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)[:chars]
+
+
+def _table_bytes(engine) -> int:
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            conn.exec_driver_sql("VACUUM")
+            return conn.exec_driver_sql("PRAGMA page_count").scalar() * conn.exec_driver_sql("PRAGMA page_size").scalar()
+        if engine.dialect.name == "mysql":
+            conn.exec_driver_sql("ANALYZE TABLE notes")
+            return conn.execute(text(
+                "SELECT data_length FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = 'notes'"
+            )).scalar()
+    return 0
+
+
+def _stats(times: list) -> dict:
+    ms = [t * 1000 for t in times]
+    return {"median_ms": statistics.median(ms), "p95_ms": percentile(ms, 95)}
+
+
+def run_mode(engine, compressed: bool, contents: list, reads: int) -> dict:
+    settings.NOTE_COMPRESSION = compressed
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    user_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{
+            "user_id": user_id, "user_name": "bench", "user_email": f"bench-{user_id}@example.com", "password_hash": "x",
+        }])
+
+    note_ids, write_times = [], []
+    for i, content in enumerate(contents):
+        note_id = uuid.uuid4().hex
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(insert(models.Note), {
+                "note_id": note_id, "user_id": user_id, "note_title": f"log {i}", "note_content": content,
+                "created_on": now - timedelta(seconds=i), "last_update": now,
+            })
+        write_times.append(time.perf_counter() - start)
+        note_ids.append(note_id)
+
+    rng = random.Random(1)
+    get_times, page_times = [], []
+    with Session() as db:
+        for _ in range(reads):
+            note_id = rng.choice(note_ids)
+            db.expunge_all()
+            start = time.perf_counter()
+            note = crud.get_note_by_id(db, note_id, user_id)
+            get_times.append(time.perf_counter() - start)
+            assert note.note_content == contents[note_ids.index(note_id)]
+        for _ in range(max(1, reads // 10)):
+            start = time.perf_counter()
+            crud.get_notes_by_user(db, user_id, limit=50)
+            page_times.append(time.perf_counter() - start)
+
+        stored = type_coerce(models.Note.note_content, Text)
+        rows = db.execute(select(stored)).scalars().all()
+        compressed_rows = db.execute(select(func.count()).where(func.substr(stored, 1, 1) == compression.MARKER)).scalar()
+
+    return {
+        "write": _stats(write_times),
+        "read_by_id": _stats(get_times),
+        "read_page_50": _stats(page_times),
+        "stored_bytes": sum(len(v.encode("utf-8")) for v in rows),
+        "compressed_rows": compressed_rows,
+        "table_bytes": _table_bytes(engine),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="database URL (default: temporary SQLite file); its tables are recreated")
+    parser.add_argument("--notes", type=int, default=2000)
+    parser.add_argument("--content-chars", type=int, default=20000)
+    parser.add_argument("--reads", type=int, default=500)
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'compression_bench.db')}"
+    engine = create_engine(url)
+    rng = random.Random(0)
+    contents = [_log_text(rng, args.content_chars) for _ in range(args.notes)]
+
+    results = {
+        "url": url.split("@")[-1], "notes": args.notes, "content_chars": args.content_chars,
+        "codec": settings.NOTE_COMPRESSION_CODEC, "min_bytes": settings.NOTE_COMPRESSION_MIN_BYTES,
+    }
+    for mode, compressed in (("plain", False), ("compressed", True)):
+        r = run_mode(engine, compressed, contents, args.reads)
+        results[mode] = r
+        print(f"{mode:>10}: table {r['table_bytes'] / 1e6:8.1f}MB  stored {r['stored_bytes'] / 1e6:8.1f}MB  "
+              f"write {r['write']['median_ms']:6.2f}ms  get {r['read_by_id']['median_ms']:6.3f}ms  "
+              f"page {r['read_page_50']['median_ms']:7.2f}ms  ({r['compressed_rows']} rows compressed)")
+    results["size_ratio"] = results["plain"]["table_bytes"] / (results["compressed"]["table_bytes"] or 1)
+    print(f"table size ratio: x{results['size_ratio']:.1f}")
+    engine.dispose()
+    print("results:", save_results("compression", results))
+
+
+if __name__ == "__main__":
+    main()
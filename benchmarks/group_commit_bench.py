@@ -0,0 +1,107 @@
+# benchmarks/group_commit_bench.py
+"""
+Note insert throughput with and without group commit (app.group_commit).
+
+  per_note:  crud.create_note per note in the threadpool, as POST /homepage/notes does by
+             default: INSERT + COMMIT + refresh SELECT, one transaction per note
+  group:     group_commit.note_committer.submit(): concurrent notes share one multi-row
+             INSERT and one COMMIT
+
+--writers concurrent writers (one user each) create notes for --duration seconds.
+Reported per mode and writer count: inserts/sec, p50 / p99 latency, errors and, for
+group commit, the mean batch size. Each COMMIT is an fsync on the SQLite stand-in
+(and on InnoDB with the default innodb_flush_log_at_trx_commit=1).
+
+Usage:
+    python -m benchmarks.group_commit_bench --writers 1,16,256 --duration 10
+    python -m benchmarks.group_commit_bench --url mysql+pymysql://user:pw@127.0.0.1/benchdb
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+
+from .common import save_results, summarize
+
+
+async def _writer(mode: str, user_id: str, deadline: float, out: dict) -> None:
+    from starlette.concurrency import run_in_threadpool
+
+    from app import crud_async, schemas
+    from app.database import SessionLocal
+    from app.group_commit import note_committer
+
+    note_in = schemas.NoteCreate(note_title="bench", note_content="lorem ipsum " * 20)
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if mode == "group":
+                await note_committer.submit(user_id, note_in)
+            else:
+                db = SessionLocal()
+                try:
+                    await crud_async.create_note(db, user_id, note_in)
+                finally:
+                    await run_in_threadpool(db.close)
+        except Exception:
+            out["errors"] += 1
+            continue
+        out["latencies"].append(time.perf_counter() - start)
+
+
+async def run(mode: str, user_ids: list, duration: float) -> dict:
+    from app.group_commit import note_committer
+
+    out = {"latencies": [], "errors": 0}
+    batches, notes = note_committer.batches, note_committer.notes
+    start = time.perf_counter()
+    await asyncio.gather(*(_writer(mode, u, start + duration, out) for u in user_ids))
+    elapsed = time.perf_counter() - start
+    result = {
+        "inserts_per_s": len(out["latencies"]) / elapsed,
+        "errors": out["errors"],
+        "latency": summarize(out["latencies"]),
+    }
+    if mode == "group":
+        n = note_committer.batches - batches
+        result["mean_batch"] = (note_committer.notes - notes) / n if n else 0.0
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="database URL (default: temporary SQLite file)")
+    parser.add_argument("--writers", default="1,16,256", help="comma-separated concurrent writer counts")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per mode and writer count")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'group_commit_bench.db')}"
+    from sqlalchemy import insert
+
+    from app import models
+    from app.database import Base, engine
+
+    Base.metadata.create_all(engine)
+    writer_counts = [int(w) for w in args.writers.split(",")]
+    user_ids = [uuid.uuid4().hex for _ in range(max(writer_counts))]
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{
+            "user_id": u, "user_name": "bench", "user_email": f"bench-{u}@example.com", "password_hash": "x",
+        } for u in user_ids])
+
+    results = {"url": os.environ["DATABASE_URL"].split("@")[-1], "duration_s": args.duration, "runs": {}}
+    for writers in writer_counts:
+        for mode in ("per_note", "group"):
+            r = asyncio.run(run(mode, user_ids[:writers], args.duration))
+            results["runs"][f"{mode}@{writers}"] = r
+            lat = r["latency"]
+            batch = f"  mean batch {r['mean_batch']:.1f}" if "mean_batch" in r else ""
+            print(f"{writers:4d} writers {mode:>8}: {r['inserts_per_s']:8.0f} inserts/s  "
+                  f"p50 {lat.get('p50_ms', 0):7.2f}ms  p99 {lat.get('p99_ms', 0):7.2f}ms  errors {r['errors']}{batch}")
+    print("results:", save_results("group_commit", results))
+
+
+if __name__ == "__main__":
+    main()
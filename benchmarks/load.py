@@ -0,0 +1,143 @@
+# benchmarks/load.py
+"""
+Closed-loop load test of the /homepage/* API at a fixed concurrency.
+
+Each of --concurrency virtual users logs in as one of the seeded bench users and then
+repeats: list (GET /homepage/notes), create (POST), patch (PATCH), delete (DELETE),
+logging in again every --login-every iterations. Throughput and p50/p95/p99 latency
+are reported per operation.
+
+By default requests go to the app in-process through httpx.ASGITransport against the
+offline SQLite stand-in, so no server or network is needed. --base-url targets a
+running server instead (seed its database with benchmarks.seed first).
+
+Usage:
+    python -m benchmarks.load --concurrency 16 --duration 20
+    python -m benchmarks.load --base-url http://127.0.0.1:8000 --concurrency 64
+"""
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+
+from .common import ensure_offline_database, save_results, summarize
+from .seed import BENCH_PASSWORD, EMAIL_TEMPLATE
+
+
+OPS = ("login", "list", "create", "patch", "delete")
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def call(self, op: str, coro, expect: int):
+        start = time.perf_counter()
+        try:
+            resp = await coro
+        except Exception:
+            self.errors[op] += 1
+            return None
+        self.latencies[op].append(time.perf_counter() - start)
+        if resp.status_code != expect:
+            self.errors[op] += 1
+        return resp
+
+
+async def _login(client, rec: Recorder, email: str):
+    resp = await rec.call("login", client.post("/homepage/login", json={"email": email, "password": BENCH_PASSWORD}), 200)
+    if resp is None or resp.status_code != 200:
+        return None
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+async def _virtual_user(client, rec: Recorder, email: str, deadline: float, login_every: int):
+    headers = await _login(client, rec, email)
+    if headers is None:
+        return
+    i = 0
+    while time.perf_counter() < deadline:
+        i += 1
+        if login_every and i % login_every == 0:
+            headers = await _login(client, rec, email) or headers
+        await rec.call("list", client.get("/homepage/notes", params={"limit": 50}, headers=headers), 200)
+        resp = await rec.call("create", client.post(
+            "/homepage/notes", json={"note_title": "load test", "note_content": "x" * 500}, headers=headers), 201)
+        if resp is None or resp.status_code != 201:
+            continue
+        note_id = resp.json()["note_id"]
+        await rec.call("patch", client.patch(
+            f"/homepage/notes/{note_id}", json={"note_title": "load test (edited)"}, headers=headers), 200)
+        await rec.call("delete", client.delete(f"/homepage/notes/{note_id}", headers=headers), 204)
+
+
+async def run_load(concurrency: int, duration: float, users: int, login_every: int, base_url: str = None) -> dict:
+    import httpx
+
+    if base_url:
+        transport, url = None, base_url
+    else:
+        from app.main import app
+        transport, url = httpx.ASGITransport(app=app), "http://bench"
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    rec = Recorder()
+    async with httpx.AsyncClient(transport=transport, base_url=url, limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(
+            _virtual_user(client, rec, EMAIL_TEMPLATE.format(i % users), deadline, login_every)
+            for i in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+
+    ops = {}
+    total = 0
+    for op in OPS:
+        lat = rec.latencies.get(op, [])
+        total += len(lat)
+        ops[op] = {**summarize(lat), "errors": rec.errors.get(op, 0), "rps": len(lat) / elapsed if elapsed else 0.0}
+    return {
+        "target": base_url or "in-process",
+        "concurrency": concurrency,
+        "duration_s": elapsed,
+        "requests": total,
+        "rps": total / elapsed if elapsed else 0.0,
+        "ops": ops,
+    }
+
+
+def print_load(result: dict) -> None:
+    print(f"{result['requests']} requests in {result['duration_s']:.1f}s -> {result['rps']:.1f} req/s "
+          f"at concurrency {result['concurrency']}")
+    for op, s in result["ops"].items():
+        if s.get("count"):
+            print(f"  {op:>7}: {s['rps']:8.1f}/s  p50={s['p50_ms']:7.1f}ms  p95={s['p95_ms']:7.1f}ms  "
+                  f"p99={s['p99_ms']:7.1f}ms  errors={s['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=None, help="running server to target (default: in-process app)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds")
+    parser.add_argument("--login-every", type=int, default=20, help="re-login every N iterations (0 = never)")
+    parser.add_argument("--users", type=int, default=20, help="seeded users to spread virtual users over")
+    parser.add_argument("--notes-per-user", type=int, default=1000)
+    parser.add_argument("--no-seed", action="store_true", help="reuse the existing seeded data")
+    args = parser.parse_args()
+
+    db = ensure_offline_database()
+    config = vars(args) | {"database": db if not args.base_url else "server"}
+    if not args.no_seed and not args.base_url:
+        from .seed import seed
+        config["seed"] = seed(args.users, args.notes_per_user)
+
+    result = asyncio.run(run_load(args.concurrency, args.duration, args.users, args.login_every, args.base_url))
+    print_load(result)
+    print("results:", save_results("load", {"config": config, "load": result}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# benchmarks/login_storm.py
+"""
+Login storm: how argon2 work affects login latency and the rest of the event loop.
+
+A burst of concurrent logins runs on one event loop while a reader coroutine keeps
+issuing lightweight "note read" tasks at a fixed rate. Each read measures the time
+from when it was due to when it completed, so any blocking of the loop shows up
+directly as read latency.
+
+Modes:
+  - inline: auth.verify_password called on the loop (the old handler behaviour)
+  - pool:   auth.verify_password_async (hashing worker pool with queue limit)
+
+Usage:
+    python -m benchmarks.login_storm --logins 200 --concurrency 64
+"""
+import argparse
+import asyncio
+import time
+
+from app import auth
+from app.config import settings
+
+from .common import save_results, summarize
+
+
+async def _reader(stop: asyncio.Event, interval: float, latencies: list):
+    next_due = time.perf_counter()
+    while not stop.is_set():
+        next_due += interval
+        await asyncio.sleep(max(0.0, next_due - time.perf_counter()))
+        # a note read is mostly awaiting I/O; one extra loop hop stands in for it
+        await asyncio.sleep(0)
+        latencies.append(time.perf_counter() - next_due)
+
+
+async def _storm(mode: str, hashed: str, logins: int, concurrency: int, read_interval: float):
+    login_latencies, read_latencies = [], []
+    rejected = 0
+    sem = asyncio.Semaphore(concurrency)
+    stop = asyncio.Event()
+
+    async def login():
+        nonlocal rejected
+        async with sem:
+            start = time.perf_counter()
+            try:
+                if mode == "inline":
+                    ok = auth.verify_password("pw", hashed)
+                else:
+                    ok = await auth.verify_password_async("pw", hashed)
+                assert ok
+            except auth.PasswordHashPoolSaturated:
+                rejected += 1
+                return
+            login_latencies.append(time.perf_counter() - start)
+
+    reader = asyncio.create_task(_reader(stop, read_interval, read_latencies))
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await reader
+
+    return {
+        "mode": mode,
+        "logins": logins,
+        "concurrency": concurrency,
+        "rejected_503": rejected,
+        "logins_per_sec": len(login_latencies) / elapsed if elapsed else 0.0,
+        "login_latency": summarize(login_latencies),
+        "note_read_latency": summarize(read_latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--read-interval-ms", type=float, default=5.0)
+    parser.add_argument("--modes", default="inline,pool")
+    args = parser.parse_args()
+
+    hashed = auth.get_password_hash("pw")
+    results = {
+        "settings": {
+            "executor": settings.PASSWORD_HASH_EXECUTOR,
+            "workers": settings.PASSWORD_HASH_WORKERS,
+            "max_queue": settings.PASSWORD_HASH_MAX_QUEUE,
+            "argon2_time_cost": settings.ARGON2_TIME_COST,
+            "argon2_memory_cost": settings.ARGON2_MEMORY_COST,
+            "argon2_parallelism": settings.ARGON2_PARALLELISM,
+        },
+        "runs": [],
+    }
+    for mode in args.modes.split(","):
+        run = asyncio.run(_storm(mode, hashed, args.logins, args.concurrency, args.read_interval_ms / 1000))
+        results["runs"].append(run)
+        print(
+            f"{mode:>7}: logins/s={run['logins_per_sec']:.1f} "
+            f"login p99={run['login_latency'].get('p99_ms', 0):.1f}ms "
+            f"read p99={run['note_read_latency'].get('p99_ms', 0):.1f}ms "
+            f"rejected={run['rejected_503']}"
+        )
+    auth.shutdown_hash_pool()
+    print("results:", save_results("login_storm", results))
+
+
+if __name__ == "__main__":
+    main()
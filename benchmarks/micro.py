@@ -0,0 +1,95 @@
+# benchmarks/micro.py
+"""
+Micro-benchmarks of per-request CPU work:
+
+  - auth.create_access_token / auth.decode_access_token
+  - argon2 password verification (auth.verify_password)
+  - NoteOut serialization of 50 notes, both the pydantic dump alone and the
+    FastAPI response path (validate -> jsonable_encoder -> json.dumps)
+
+Usage:
+    python -m benchmarks.micro
+"""
+import argparse
+import json
+import statistics
+import timeit
+import uuid
+from datetime import datetime, timedelta
+
+from .common import ensure_offline_database, save_results
+
+
+def _bench(fn, number: int, repeat: int = 5) -> dict:
+    runs = timeit.repeat(fn, number=number, repeat=repeat)
+    per_call = [r / number for r in runs]
+    return {
+        "number": number,
+        "repeat": repeat,
+        "best_us": min(per_call) * 1e6,
+        "median_us": statistics.median(per_call) * 1e6,
+    }
+
+
+def _notes(n: int) -> list:
+    now = datetime.utcnow()
+    user_hex = uuid.uuid4().hex
+    return [
+        {
+            "note_id": uuid.uuid4().hex,
+            "user_id": user_hex,
+            "note_title": f"note {i}",
+            "note_content": "lorem ipsum dolor sit amet " * 20,
+            "created_on": now - timedelta(minutes=i),
+            "last_update": now,
+        }
+        for i in range(n)
+    ]
+
+
+def run_micro(scale: float = 1.0) -> dict:
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+
+    from app import auth, schemas
+
+    n = lambda base: max(1, int(base * scale))  # noqa: E731
+    results = {}
+
+    token = auth.create_access_token({"sub": uuid.uuid4().hex}, timedelta(minutes=60))
+    results["create_access_token"] = _bench(
+        lambda: auth.create_access_token({"sub": "0" * 32}, timedelta(minutes=60)), n(2000))
+    results["decode_access_token"] = _bench(lambda: auth.decode_access_token(token), n(2000))
+
+    hashed = auth.get_password_hash("pw")
+    results["argon2_verify"] = _bench(lambda: auth.verify_password("pw", hashed), n(5), repeat=3)
+
+    notes = _notes(50)
+    adapter = TypeAdapter(list[schemas.NoteOut])
+    validated = adapter.validate_python(notes)
+    results["noteout_dump_json_50"] = _bench(lambda: adapter.dump_json(validated), n(500))
+    results["noteout_fastapi_path_50"] = _bench(
+        lambda: json.dumps(jsonable_encoder(adapter.validate_python(notes)), ensure_ascii=False,
+                           allow_nan=False, indent=None, separators=(",", ":")).encode(),
+        n(200),
+    )
+    return results
+
+
+def print_micro(results: dict) -> None:
+    for name, r in results.items():
+        print(f"  {name:>26}: best={r['best_us']:10.1f}us  median={r['median_us']:10.1f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply iteration counts")
+    args = parser.parse_args()
+    ensure_offline_database()
+    results = run_micro(args.scale)
+    print_micro(results)
+    print("results:", save_results("micro", results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# benchmarks/mutation_bench.py
+"""
+Database round-trips and latency of single-note PATCH and DELETE.
+
+  select_then_write: crud.get_note_by_id, change the ORM object, commit, refresh
+                     (what edit_note / delete_note did)
+  single_statement:  crud.update_note / crud.delete_note: one ownership-scoped
+                     UPDATE ... RETURNING / DELETE, then commit
+
+Round-trips are counted per operation from engine events: every statement sent to
+the database plus every COMMIT. Databases without UPDATE ... RETURNING (MySQL) read the
+updated note back in the same transaction, one statement more than SQLite.
+
+Each kind is checked against halving the round-trips of select_then_write. DELETE
+falls short, 4 -> 3: the sync tombstone needs an INSERT of its own next to the DELETE.
+tests/test_note_mutations.py pins the per-request counts (PATCH 2, DELETE 3) on SQLite.
+
+Usage:
+    python -m benchmarks.mutation_bench --ops 2000
+    python -m benchmarks.mutation_bench --url mysql+pymysql://user:pw@127.0.0.1/benchdb
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models, schemas
+from app.database import Base
+
+from .common import save_results
+
+
+class RoundTrips:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._hit)
+        event.listen(engine, "commit", self._hit)
+
+    def _hit(self, *args, **kwargs):
+        self.count += 1
+
+
+def _seed(engine, n: int) -> tuple:
+    user_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+    note_ids = [uuid.uuid4().hex for _ in range(n)]
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{
+            "user_id": user_id, "user_name": "bench", "user_email": f"bench-{user_id}@example.com", "password_hash": "x",
+        }])
+        conn.execute(insert(models.Note), [{
+            "note_id": note_id, "user_id": user_id, "note_title": f"note {i}", "note_content": "lorem ipsum " * 20,
+            "created_on": now - timedelta(seconds=i), "last_update": now,
+        } for i, note_id in enumerate(note_ids)])
+    return user_id, note_ids
+
+
+def old_patch(db, note_id, user_id, note_in):
+    note = crud.get_note_by_id(db, note_id, user_id)
+    note.note_title = note_in.note_title.strip()
+    note.last_update = datetime.utcnow()
+    note.version += 1
+    db.commit()
+    db.refresh(note)
+    return note
+
+
+def old_delete(db, note_id, user_id):
+    note = crud.get_note_by_id(db, note_id, user_id)
+    db.delete(note)
+    db.add(models.NoteTombstone(note_id=note_id, user_id=user_id, deleted_on=datetime.utcnow()))
+    db.commit()
+
+
+def _measure(Session, counter, fn, args_list) -> dict:
+    times, trips = [], []
+    for args in args_list:
+        with Session() as db:
+            before = counter.count
+            start = time.perf_counter()
+            fn(db, *args)
+            times.append(time.perf_counter() - start)
+            trips.append(counter.count - before)
+    return {
+        "round_trips": statistics.mean(trips),
+        "median_ms": statistics.median(times) * 1000,
+        "mean_ms": statistics.mean(times) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="database URL (default: temporary SQLite file)")
+    parser.add_argument("--ops", type=int, default=2000, help="operations per path and kind")
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'mutation_bench.db')}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    counter = RoundTrips(engine)
+    user_id, note_ids = _seed(engine, 4 * args.ops)
+    patch = schemas.NoteUpdate(note_title="edited")
+
+    batches = [note_ids[i * args.ops:(i + 1) * args.ops] for i in range(4)]
+    results = {"url": url.split("@")[-1], "ops": args.ops, "patch": {}, "delete": {}}
+    results["patch"]["select_then_write"] = _measure(Session, counter, old_patch, [(n, user_id, patch) for n in batches[0]])
+    results["patch"]["single_statement"] = _measure(Session, counter, crud.update_note, [(n, user_id, patch) for n in batches[1]])
+    results["delete"]["select_then_write"] = _measure(Session, counter, old_delete, [(n, user_id) for n in batches[2]])
+    results["delete"]["single_statement"] = _measure(Session, counter, crud.delete_note, [(n, user_id) for n in batches[3]])
+
+    for kind in ("patch", "delete"):
+        old, new = results[kind]["select_then_write"], results[kind]["single_statement"]
+        target = old["round_trips"] / 2
+        results[kind]["halved"] = new["round_trips"] <= target
+        print(f"{kind:>6}: round-trips {old['round_trips']:.1f} -> {new['round_trips']:.1f} "
+              f"(target <= {target:.1f}: {'met' if results[kind]['halved'] else 'missed'})  "
+              f"median {old['median_ms']:.3f}ms -> {new['median_ms']:.3f}ms")
+    engine.dispose()
+    print("results:", save_results("mutation", results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# benchmarks/pool_bench.py
+"""
+Connection pool liveness policies and warm-up (database.DB_POOL_* settings).
+
+Each request checks a connection out, reads one note by primary key and returns the
+connection, as a route does. Per DB_POOL_PRE_PING policy:
+
+  always:  pool_pre_ping, one extra round-trip on every checkout
+  idle:    database.install_idle_ping, a ping only after DB_POOL_PING_IDLE_SECONDS idle
+  never:   no ping (recycle only)
+
+reported as statements per request (pings included) and median / p95 latency, plus the
+time saved per request against "always". A SQLite file has no network round-trip, so
+the saving there is only the cost of the ping itself; point --url at a MySQL server to
+see the real one.
+
+Warm-up: the first --concurrency parallel requests after start, with a cold pool and with
+DB_POOL_WARMUP connections opened beforehand (database.warm_up).
+
+Usage:
+    python -m benchmarks.pool_bench --requests 5000
+    python -m benchmarks.pool_bench --url mysql+pymysql://user:pw@127.0.0.1/benchdb
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import create_engine, event, insert, select
+
+from app import database, models
+from app.config import settings
+from app.database import Base
+
+from .common import percentile, save_results
+
+
+def _engine(url: str, policy: str, name: str):
+    settings.DB_POOL_PRE_PING = policy
+    kwargs = database._engine_kwargs(url, name=name)
+    kwargs["pool_pre_ping"] = policy == "always"  # SQLite URLs leave it out
+    engine = create_engine(url, **kwargs)
+    if policy == "idle":
+        database.install_idle_ping(engine, settings.DB_POOL_PING_IDLE_SECONDS)
+    return engine
+
+
+def _seed(engine) -> list:
+    user_id = uuid.uuid4().hex
+    note_ids = [uuid.uuid4().hex for _ in range(1000)]
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{
+            "user_id": user_id, "user_name": "bench", "user_email": f"bench-{user_id}@example.com", "password_hash": "x",
+        }])
+        conn.execute(insert(models.Note), [{
+            "note_id": n, "user_id": user_id, "note_title": "t", "note_content": "c", "created_on": now, "last_update": now,
+        } for n in note_ids])
+    return note_ids
+
+
+def _request(engine, note_id: str) -> float:
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        conn.execute(select(models.Note.note_title).where(models.Note.note_id == note_id)).first()
+    return time.perf_counter() - start
+
+
+def run_policy(url: str, policy: str, note_ids: list, requests: int) -> dict:
+    engine = _engine(url, policy, f"bench_{policy}")
+    statements = [0]
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.__setitem__(0, statements[0] + 1))
+    pings = [0]
+    original_ping = engine.dialect.do_ping
+
+    def counted_ping(dbapi_connection):
+        pings[0] += 1
+        return original_ping(dbapi_connection)
+
+    engine.dialect.do_ping = counted_ping
+    _request(engine, note_ids[0])  # open the connection outside the measurement
+    pings[0] = statements[0] = 0
+    times = [_request(engine, note_ids[i % len(note_ids)]) for i in range(requests)]
+    engine.dispose()
+    ms = [t * 1000 for t in times]
+    return {
+        "statements_per_request": (statements[0] + pings[0]) / requests,
+        "pings": pings[0],
+        "median_ms": statistics.median(ms),
+        "p95_ms": percentile(ms, 95),
+        "mean_ms": statistics.mean(ms),
+    }
+
+
+def run_warmup(url: str, note_ids: list, concurrency: int, warm: bool) -> dict:
+    engine = _engine(url, "idle", "bench_warmup")
+    if warm:
+        database.warm_up(engine, concurrency)
+    with ThreadPoolExecutor(concurrency) as pool:
+        times = list(pool.map(lambda n: _request(engine, n), note_ids[:concurrency]))
+    engine.dispose()
+    ms = [t * 1000 for t in times]
+    return {"median_ms": statistics.median(ms), "max_ms": max(ms)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="database URL (default: temporary SQLite file)")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=10, help="parallel first requests for the warm-up case")
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'pool_bench.db')}"
+    setup = create_engine(url)
+    Base.metadata.create_all(setup)
+    note_ids = _seed(setup)
+    setup.dispose()
+
+    results = {"url": url.split("@")[-1], "requests": args.requests, "policies": {}}
+    for policy in ("always", "idle", "never"):
+        r = results["policies"][policy] = run_policy(url, policy, note_ids, args.requests)
+        print(f"{policy:>7}: {r['statements_per_request']:.2f} statements/request  median {r['median_ms']:.3f}ms  "
+              f"p95 {r['p95_ms']:.3f}ms  ({r['pings']} pings)")
+    always, idle = results["policies"]["always"], results["policies"]["idle"]
+    results["saved_per_request_ms"] = always["mean_ms"] - idle["mean_ms"]
+    print(f"saved per request, idle vs always: {results['saved_per_request_ms'] * 1000:.1f}µs")
+
+    results["warmup"] = {
+        "cold": run_warmup(url, note_ids, args.concurrency, warm=False),
+        "warm": run_warmup(url, note_ids, args.concurrency, warm=True),
+    }
+    for mode, r in results["warmup"].items():
+        print(f"first {args.concurrency} requests, {mode} pool: median {r['median_ms']:.2f}ms  max {r['max_ms']:.2f}ms")
+    print("results:", save_results("pool", results))
+
+
+if __name__ == "__main__":
+    main()
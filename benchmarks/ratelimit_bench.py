@@ -0,0 +1,147 @@
+# benchmarks/ratelimit_bench.py
+"""
+Per-request cost of admission control (app.admission).
+
+  take:        ns per MemoryRateLimitBackend.take() with --keys active buckets
+  eviction:    ms to drop idle buckets once RATE_LIMIT_MAX_KEYS is reached
+  middleware:  µs per request through AdmissionMiddleware around a no-op ASGI app,
+               for anonymous and bearer-token requests, next to the bare app; the
+               token case includes the JWT decode that deps.get_token_payload then skips
+  shedding:    with --in-flight slow requests allowed, how a burst of --burst requests
+               splits into served / 503, and how long the rejected ones took to hear it
+
+Usage:
+    python -m benchmarks.ratelimit_bench --keys 100000
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from datetime import timedelta
+
+from app import admission, auth
+from app.config import settings
+
+from .common import save_results
+
+
+def _ns_per_call(fn, args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for a in args:
+            fn(a)
+        best = min(best, (time.perf_counter_ns() - start) / len(args))
+    return best
+
+
+async def _noop_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def _scope(path: str, token: str = None) -> dict:
+    headers = [(b"host", b"bench")]
+    if token:
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    return {"type": "http", "method": "GET", "path": path, "headers": headers, "client": ("10.0.0.1", 5000)}
+
+
+async def _us_per_request(app, scope: dict, n: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(n):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+async def _shed(in_flight: int, burst: int, hold: float) -> dict:
+    async def slow_app(scope, receive, send):
+        await asyncio.sleep(hold)
+        await _noop_app(scope, receive, send)
+
+    gate = admission.ConcurrencyGate(in_flight, in_flight, hold / 2)
+    app = admission.AdmissionMiddleware(slow_app, admission.NullRateLimitBackend(), gate)
+
+    async def one():
+        status = []
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+
+        start = time.perf_counter()
+        await app(_scope("/homepage/notes"), None, send)
+        return status[0], time.perf_counter() - start
+
+    results = await asyncio.gather(*(one() for _ in range(burst)))
+    rejected = [t for s, t in results if s == 503]
+    return {
+        "served": sum(1 for s, _ in results if s == 200),
+        "rejected": len(rejected),
+        "rejected_max_ms": max(rejected, default=0) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=100_000, help="active buckets")
+    parser.add_argument("--checks", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=20_000, help="requests per middleware case")
+    parser.add_argument("--in-flight", type=int, default=30)
+    parser.add_argument("--burst", type=int, default=500)
+    args = parser.parse_args()
+
+    backend = admission.MemoryRateLimitBackend(max_keys=args.keys)
+    keys = [f"user:{uuid.uuid4().hex}" for _ in range(args.keys)]
+    for k in keys:
+        backend.take(k, 20.0, 40.0)
+    rng = random.Random(0)
+    sample = [rng.choice(keys) for _ in range(args.checks)]
+    take_ns = _ns_per_call(lambda k: backend.take(k, 1e9, 40.0), sample)
+
+    start = time.perf_counter()
+    backend.take("user:new", 1e9, 40.0)  # over max_keys: every bucket is idle at this rate
+    eviction_ms = (time.perf_counter() - start) * 1000
+
+    token = auth.create_access_token({"sub": uuid.uuid4().hex}, timedelta(minutes=5))
+    limited = admission.AdmissionMiddleware(_noop_app, admission.MemoryRateLimitBackend(args.keys))
+    gated = admission.AdmissionMiddleware(
+        _noop_app, admission.MemoryRateLimitBackend(args.keys), admission.ConcurrencyGate(args.in_flight, 100, 1.0))
+
+    async def run_cases():
+        # refill fast enough that no request is refused
+        settings.RATE_LIMIT_PER_SECOND = 1e9
+        return {
+            "bare": await _us_per_request(_noop_app, _scope("/homepage/notes"), args.requests),
+            "anonymous": await _us_per_request(limited, _scope("/homepage/notes"), args.requests),
+            "token": await _us_per_request(limited, _scope("/homepage/notes", token), args.requests),
+            "token_gated": await _us_per_request(gated, _scope("/homepage/notes", token), args.requests),
+            "jwt_decode": _ns_per_call(auth.decode_access_token, [token] * 2000) / 1000,
+        }
+
+    middleware_us = asyncio.run(run_cases())
+    shed = asyncio.run(_shed(args.in_flight, args.burst, hold=0.2))
+
+    results = {
+        "keys": args.keys,
+        "take_ns": take_ns,
+        "eviction_ms": eviction_ms,
+        "middleware_us": middleware_us,
+        "shed": {"in_flight": args.in_flight, "burst": args.burst, **shed},
+    }
+    print(f"take() with {args.keys} buckets: {take_ns:.0f}ns   eviction: {eviction_ms:.1f}ms")
+    print("per request: " + "  ".join(f"{k} {v:.1f}µs" for k, v in middleware_us.items()))
+    print(f"burst of {args.burst} with {args.in_flight} in flight: {shed['served']} served, {shed['rejected']} got 503 "
+          f"(within {shed['rejected_max_ms']:.0f}ms)")
+    print("results:", save_results("ratelimit", results))
+
+
+if __name__ == "__main__":
+    main()
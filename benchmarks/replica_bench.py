@@ -0,0 +1,145 @@
+# benchmarks/replica_bench.py
+"""
+Read-replica routing (database.ReadRouter, deps.get_read_db) against SQLite stand-ins.
+
+A primary SQLite file and --replicas replica files; a thread copies the primary onto every
+replica (sqlite3 backup) every --lag seconds, which stands in for asynchronous replication.
+Virtual users run through the in-process app: create a note, read the list right away,
+then --reads more list / single-note reads --think seconds apart. The notes-list cache is
+off, so every read reaches a database. Reported, with the read-your-writes pin on
+(READ_YOUR_WRITES_SECONDS) and off (0):
+
+  statements:  SQL statements sent to the primary and to the replicas
+  stale reads: list reads right after a write that did not contain the new note
+  latency:     p50 / p95 of the reads
+
+Usage:
+    python -m benchmarks.replica_bench --replicas 2 --lag 0.5 --users 16
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from .common import save_results, summarize
+
+
+def _replicate(primary: str, replicas: list, lag: float, stop: threading.Event) -> None:
+    while not stop.wait(lag):
+        src = sqlite3.connect(primary)
+        try:
+            for path in replicas:
+                dst = sqlite3.connect(path, timeout=30)
+                try:
+                    src.backup(dst)
+                finally:
+                    dst.close()
+        finally:
+            src.close()
+
+
+async def _virtual_user(client, i: int, iterations: int, reads: int, think: float, out: dict) -> None:
+    email = f"replica-bench-{i}@example.com"
+    await client.post("/homepage/signup", json={
+        "user_name": f"u{i}", "user_email": email, "password": "pw", "confirm_password": "pw",
+    })
+    token = (await client.post("/homepage/login", json={"email": email, "password": "pw"})).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    for n in range(iterations):
+        created = (await client.post(
+            "/homepage/notes", json={"note_title": f"n{n}", "note_content": "x" * 200}, headers=headers,
+        )).json()
+        start = time.perf_counter()
+        resp = await client.get("/homepage/notes?limit=5", headers=headers)
+        out["latencies"].append(time.perf_counter() - start)
+        out["after_write"] += 1
+        if resp.status_code != 200 or resp.json()[0]["note_id"] != created["note_id"]:
+            out["stale"] += 1
+        for r in range(reads):
+            await asyncio.sleep(think)
+            start = time.perf_counter()
+            if r % 2:
+                await client.get(f"/homepage/notes/{created['note_id']}", headers=headers)
+            else:
+                await client.get("/homepage/notes?limit=20&view=summary", headers=headers)
+            out["latencies"].append(time.perf_counter() - start)
+
+
+async def _run(app, users: int, iterations: int, reads: int, think: float) -> dict:
+    import httpx
+
+    out = {"latencies": [], "after_write": 0, "stale": 0}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60) as client:
+        await asyncio.gather(*(_virtual_user(client, i, iterations, reads, think, out) for i in range(users)))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replicas", type=int, default=2)
+    parser.add_argument("--lag", type=float, default=0.5, help="seconds between replica refreshes")
+    parser.add_argument("--pin-seconds", type=float, default=1.0, help="READ_YOUR_WRITES_SECONDS for the pinned run")
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--iterations", type=int, default=5, help="writes per virtual user")
+    parser.add_argument("--reads", type=int, default=10, help="extra reads after each write")
+    parser.add_argument("--think", type=float, default=0.2, help="seconds between reads")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    primary = os.path.join(workdir, "primary.db")
+    replicas = [os.path.join(workdir, f"replica{i}.db") for i in range(args.replicas)]
+    os.environ["DATABASE_URL"] = f"sqlite:///{primary}"
+    os.environ["DATABASE_REPLICA_URLS"] = ",".join(f"sqlite:///{p}" for p in replicas)
+    os.environ.setdefault("RATE_LIMIT_BACKEND", "none")
+    os.environ["NOTES_CACHE_BACKEND"] = "none"
+    os.environ.setdefault("ARGON2_MEMORY_COST", "8192")
+
+    from sqlalchemy import event
+
+    from app.cache import user_cache
+    from app.database import engine, read_router
+    from app.main import app
+
+    statements = {"primary": 0, "replicas": 0}
+
+    def counter(name):
+        def hit(*a, **kw):
+            statements[name] += 1
+        return hit
+
+    event.listen(engine, "before_cursor_execute", counter("primary"))
+    for replica in read_router.replicas:
+        event.listen(replica.engine, "before_cursor_execute", counter("replicas"))
+
+    stop = threading.Event()
+    thread = threading.Thread(target=_replicate, args=(primary, replicas, args.lag, stop), daemon=True)
+    thread.start()
+    results = {"config": vars(args)}
+    try:
+        for mode, pin in (("pinned", args.pin_seconds), ("unpinned", 0.0)):
+            read_router.pin_seconds = pin
+            read_router._pins.clear()
+            user_cache.clear()
+            statements.update(primary=0, replicas=0)
+            out = asyncio.run(_run(app, args.users, args.iterations, args.reads, args.think))
+            r = results[mode] = {
+                "pin_seconds": pin,
+                "statements": dict(statements),
+                "stale_reads": out["stale"],
+                "reads_after_write": out["after_write"],
+                "reads": summarize(out["latencies"]),
+            }
+            print(f"{mode:>9} (pin {pin:.1f}s): statements primary {r['statements']['primary']:6d} "
+                  f"replicas {r['statements']['replicas']:6d}  stale reads {r['stale_reads']}/{r['reads_after_write']}  "
+                  f"read p50 {r['reads']['p50_ms']:.1f}ms p95 {r['reads']['p95_ms']:.1f}ms")
+    finally:
+        stop.set()
+        thread.join()
+    print("results:", save_results("replica", results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/revocation_bench.py
+"""
+Memory and lookup cost of the in-memory revoked-token list (app.revocation).
+
+Builds a RevocationList of --tokens random jtis and compares it with the obvious
+alternatives, a set of the jti strings and a set of the 64-bit keys:
+
+  memory:  bytes allocated by each structure (tracemalloc)
+  lookup:  ns per is_revoked() call, for revoked and for valid tokens, next to the
+           cost of decoding and verifying the JWT that every request pays anyway
+  merge:   time to fold MERGE_THRESHOLD new revocations into the sorted array
+           (done by the polling thread, not on the event loop)
+
+Usage:
+    python -m benchmarks.revocation_bench --tokens 1000000
+"""
+import argparse
+import random
+import secrets
+import time
+import tracemalloc
+from datetime import timedelta
+
+from app import auth
+from app.revocation import MERGE_THRESHOLD, RevocationList, jti_key
+
+from .common import save_results
+
+
+def _allocated(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, after - before
+
+
+def _ns_per_call(fn, args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for a in args:
+            fn(a)
+        best = min(best, (time.perf_counter_ns() - start) / len(args))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    args = parser.parse_args()
+
+    jtis = [secrets.token_hex(16) for _ in range(args.tokens)]
+
+    def build_list():
+        revoked = RevocationList()
+        revoked.replace(jti_key(j) for j in jtis)
+        return revoked
+
+    revoked, list_bytes = _allocated(build_list)
+    merged = build_list()
+    start = time.perf_counter()
+    merged.add((int.from_bytes(secrets.token_bytes(8), "big") for _ in range(MERGE_THRESHOLD)), merge=True)
+    merge_ms = (time.perf_counter() - start) * 1000
+    del merged
+    # fresh string objects, as a set filled from the database would hold
+    str_set, str_set_bytes = _allocated(lambda: {j.encode().decode() for j in jtis})
+    key_set, key_set_bytes = _allocated(lambda: {jti_key(j) for j in jtis})
+
+    rng = random.Random(0)
+    hits = rng.sample(jtis, min(args.lookups, len(jtis)))
+    misses = [secrets.token_hex(16) for _ in range(args.lookups)]
+    token = auth.create_access_token({"sub": secrets.token_hex(16)}, timedelta(minutes=5))
+
+    results = {
+        "tokens": args.tokens,
+        "memory_bytes": {"revocation_list": list_bytes, "set_of_str": str_set_bytes, "set_of_int": key_set_bytes},
+        "lookup_ns": {
+            "revoked": _ns_per_call(revoked.is_revoked, hits),
+            "valid": _ns_per_call(revoked.is_revoked, misses),
+            "set_of_str": _ns_per_call(str_set.__contains__, misses),
+            "jwt_decode": _ns_per_call(auth.decode_access_token, [token] * 2000),
+        },
+    }
+    results["merge_ms"] = merge_ms
+    assert all(revoked.is_revoked(j) for j in hits[:1000]) and not any(revoked.is_revoked(j) for j in misses[:1000])
+
+    mem, ns = results["memory_bytes"], results["lookup_ns"]
+    print(f"{args.tokens} revoked tokens")
+    print(f"  memory: list {mem['revocation_list'] / 1e6:7.1f}MB   set of str {mem['set_of_str'] / 1e6:7.1f}MB"
+          f"   set of int {mem['set_of_int'] / 1e6:7.1f}MB")
+    print(f"  lookup: revoked {ns['revoked']:6.0f}ns  valid {ns['valid']:6.0f}ns  (set of str {ns['set_of_str']:.0f}ns,"
+          f" JWT decode {ns['jwt_decode']:.0f}ns)")
+    print(f"  merge of {MERGE_THRESHOLD} new revocations: {results['merge_ms']:.1f}ms")
+    print("results:", save_results("revocation", results))
+
+
+if __name__ == "__main__":
+    main()
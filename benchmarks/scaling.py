@@ -0,0 +1,97 @@
+# benchmarks/scaling.py
+"""
+Multi-core scaling of the production launcher (python -m app.run).
+
+For each worker count, starts the launcher as a subprocess against the seeded database,
+measures the time until it answers requests, runs the closed-loop load test against it
+over HTTP, then sends SIGTERM and measures how long the graceful shutdown takes.
+Throughput is reported per worker count together with the speedup over the first count.
+
+SQLite serializes writers across processes, so use a local MySQL (DATABASE_URL) to see
+real scaling; the offline SQLite stand-in still shows startup and shutdown times.
+
+Usage:
+    python -m benchmarks.scaling --workers 1,2,4 --concurrency 64 --duration 20
+    DATABASE_URL=mysql+pymysql://user:pw@127.0.0.1/benchdb python -m benchmarks.scaling --workers 1,2,4,8
+"""
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from .common import ensure_offline_database, save_results
+
+
+def _wait_ready(base_url: str, proc: subprocess.Popen, timeout: float) -> float:
+    import httpx
+
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if proc.poll() is not None:
+            raise RuntimeError(f"launcher exited with code {proc.returncode}")
+        try:
+            if httpx.get(f"{base_url}/homepage", timeout=1).status_code == 200:
+                return time.perf_counter() - start
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(f"launcher not ready after {timeout}s")
+
+
+def run_workers(workers: int, port: int, concurrency: int, duration: float, users: int, login_every: int) -> dict:
+    from .load import run_load
+
+    base_url = f"http://127.0.0.1:{port}"
+    cmd = [sys.executable, "-m", "app.run", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)]
+    proc = subprocess.Popen(cmd, env=os.environ.copy())
+    try:
+        startup = _wait_ready(base_url, proc, timeout=60)
+        load = asyncio.run(run_load(concurrency, duration, users, login_every, base_url))
+    finally:
+        stop = time.perf_counter()
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+    return {"workers": workers, "startup_s": startup, "shutdown_s": time.perf_counter() - stop, "load": load}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--login-every", type=int, default=20)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--notes-per-user", type=int, default=200)
+    parser.add_argument("--no-seed", action="store_true", help="reuse the existing seeded data")
+    args = parser.parse_args()
+
+    database = ensure_offline_database()
+    config = vars(args) | {"database": database, "cpu_count": os.cpu_count()}
+    if not args.no_seed:
+        from .seed import seed
+        config["seed"] = seed(args.users, args.notes_per_user)
+
+    runs = {}
+    base_rps = None
+    for workers in (int(w) for w in args.workers.split(",")):
+        result = run_workers(workers, args.port, args.concurrency, args.duration, args.users, args.login_every)
+        rps = result["load"]["rps"]
+        base_rps = base_rps or rps
+        result["speedup"] = rps / base_rps if base_rps else 0.0
+        runs[str(workers)] = result
+        print(f"{workers:>3} workers: {rps:8.1f} req/s  x{result['speedup']:.2f}  "
+              f"startup={result['startup_s']:.2f}s  shutdown={result['shutdown_s']:.2f}s")
+
+    print("results:", save_results("scaling", {"config": config, "runs": runs}))
+
+
+if __name__ == "__main__":
+    main()
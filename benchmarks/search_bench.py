@@ -0,0 +1,130 @@
+# benchmarks/search_bench.py
+"""
+Search latency: in-process inverted index (and MySQL FULLTEXT) vs a LIKE-scan baseline.
+
+For each size, a fresh notes table is seeded with synthetic text for a single user
+(the worst case for a per-user search) and every backend runs the same queries.
+The inverted index reports its one-off build time separately from query latency.
+
+Usage:
+    python -m benchmarks.search_bench --sizes 10000,100000,1000000
+    python -m benchmarks.search_bench --url mysql+pymysql://user:pw@127.0.0.1/benchdb   # adds "fulltext"
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app import models, search
+from app.database import Base
+
+from .common import save_results, summarize
+
+
+def _vocabulary(size: int):
+    return [f"w{i}" for i in range(size)]
+
+
+def _words(rng: random.Random, vocab, weights, n: int) -> str:
+    return " ".join(rng.choices(vocab, weights=weights, k=n))
+
+
+def seed(engine, n_notes: int, seed_value: int = 42) -> str:
+    rng = random.Random(seed_value)
+    vocab = _vocabulary(20000)
+    weights = [1.0 / (i + 1) for i in range(len(vocab))]  # Zipf-like
+    user_id = uuid.uuid4().hex
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{
+            "user_id": user_id, "user_name": "bench", "user_email": f"bench-{uuid.uuid4().hex}@example.com",
+            "password_hash": "x",
+        }])
+        start = datetime.utcnow() - timedelta(seconds=n_notes)
+        batch = []
+        for i in range(n_notes):
+            batch.append({
+                "note_id": uuid.uuid4().hex,
+                "user_id": user_id,
+                "note_title": _words(rng, vocab, weights, 4),
+                "note_content": _words(rng, vocab, weights, 60),
+                "created_on": start + timedelta(seconds=i),
+                "last_update": start + timedelta(seconds=i),
+            })
+            if len(batch) == 10000:
+                conn.execute(insert(models.Note), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(models.Note), batch)
+    return user_id
+
+
+def _time_queries(backend, Session, user_id, queries, limit):
+    latencies = []
+    with Session() as db:
+        for q in queries:
+            start = time.perf_counter()
+            backend.search(db, user_id, q, limit=limit)
+            latencies.append(time.perf_counter() - start)
+            db.expunge_all()
+    return latencies
+
+
+def run_size(url: str, n_notes: int, backends, n_queries: int, limit: int):
+    engine = create_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    t0 = time.perf_counter()
+    user_id = seed(engine, n_notes)
+    seed_s = time.perf_counter() - t0
+
+    rng = random.Random(7)
+    # selective terms, as real searches are: each matches well under 1% of notes
+    queries = [f"w{rng.randint(1000, 15000)} w{rng.randint(1000, 15000)}" for _ in range(n_queries)]
+
+    out = {"notes": n_notes, "seed_seconds": seed_s, "backends": {}}
+    for name in backends:
+        backend = search.make_backend(name, engine.dialect.name)
+        entry = {}
+        if name == "memory":
+            with Session() as db:
+                start = time.perf_counter()
+                backend.search(db, user_id, "warmup", limit=limit)  # loads the user's index
+                entry["index_build_seconds"] = time.perf_counter() - start
+        entry["query_latency"] = summarize(_time_queries(backend, Session, user_id, queries, limit))
+        out["backends"][name] = entry
+        print(f"{n_notes:>9} notes  {name:>8}: p50={entry['query_latency']['p50_ms']:.2f}ms "
+              f"p99={entry['query_latency']['p99_ms']:.2f}ms"
+              + (f"  build={entry['index_build_seconds']:.1f}s" if "index_build_seconds" in entry else ""))
+    engine.dispose()
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="database URL (default: temporary SQLite file)")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'search_bench.db')}"
+    backends = ["like", "memory"]
+    if url.startswith("mysql"):
+        backends.append("fulltext")
+
+    results = {"url": url.split("@")[-1], "runs": []}
+    for size in (int(x) for x in args.sizes.split(",")):
+        results["runs"].append(run_size(url, size, backends, args.queries, args.limit))
+    print("results:", save_results("search", results))
+
+
+if __name__ == "__main__":
+    main()
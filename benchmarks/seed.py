@@ -0,0 +1,90 @@
+# benchmarks/seed.py
+"""
+Seed users and notes at a configurable scale into the configured database.
+
+Users are bench<i>@example.com with password BENCH_PASSWORD. The password is hashed
+once and the hash reused, so seeding large user counts doesn't pay argon2 per user.
+Notes are inserted with executemany batches and spread over the past days so
+pagination and ordering look realistic.
+
+Usage (DATABASE_URL from the environment, else a local SQLite file; see common.ensure_offline_database):
+    python -m benchmarks.seed --users 20 --notes-per-user 1000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from .common import ensure_offline_database
+
+BENCH_PASSWORD = "bench-password"
+EMAIL_TEMPLATE = "bench{}@example.com"
+
+_WORDS = ("alpha beta gamma delta meeting notes todo idea draft review plan budget travel "
+          "recipe book list project release bug fix deploy design sketch call follow up").split()
+
+
+def _text(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(n))
+
+
+def seed(users: int, notes_per_user: int, content_words: int = 80, reset: bool = True, seed_value: int = 1) -> dict:
+    """Create the schema (dropping it first when `reset`) and insert the users and notes."""
+    from sqlalchemy import insert
+
+    from app import auth, models
+    from app.database import Base, engine
+
+    if reset:
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    rng = random.Random(seed_value)
+    start = time.perf_counter()
+    password_hash = auth.get_password_hash(BENCH_PASSWORD)
+    now = datetime.utcnow()
+    user_ids = []
+    with engine.begin() as conn:
+        user_rows = []
+        for i in range(users):
+            uid = models.gen_uuid_hex()
+            user_ids.append(uid)
+            user_rows.append({
+                "user_id": uid, "user_name": f"bench{i}", "user_email": EMAIL_TEMPLATE.format(i),
+                "password_hash": password_hash, "created_on": now, "last_update": now,
+            })
+        conn.execute(insert(models.User), user_rows)
+
+        batch = []
+        for uid in user_ids:
+            for j in range(notes_per_user):
+                ts = now - timedelta(seconds=rng.randint(0, 30 * 86400))
+                batch.append({
+                    "note_id": models.gen_uuid_hex(), "user_id": uid,
+                    "note_title": _text(rng, 4), "note_content": _text(rng, content_words),
+                    "created_on": ts, "last_update": ts,
+                })
+                if len(batch) >= 5000:
+                    conn.execute(insert(models.Note), batch)
+                    batch = []
+        if batch:
+            conn.execute(insert(models.Note), batch)
+    elapsed = time.perf_counter() - start
+    return {"users": users, "notes_per_user": notes_per_user, "notes": users * notes_per_user, "seconds": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--notes-per-user", type=int, default=1000)
+    parser.add_argument("--content-words", type=int, default=80)
+    parser.add_argument("--keep", action="store_true", help="don't drop existing tables first")
+    args = parser.parse_args()
+
+    print("database:", ensure_offline_database())
+    info = seed(args.users, args.notes_per_user, args.content_words, reset=not args.keep)
+    print(f"seeded {info['users']} users / {info['notes']} notes in {info['seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
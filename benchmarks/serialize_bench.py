@@ -0,0 +1,127 @@
+# benchmarks/serialize_bench.py
+"""
+Note list serialization: the old ORM + pydantic response path vs app.serialize.
+
+  orm_pydantic: ORM Note objects -> dicts -> list[NoteOut] validation ->
+                jsonable_encoder -> json.dumps (what response_model=list[NoteOut] did)
+  core_fast:    Core rows from crud.get_notes_by_user -> serialize.note_dicts -> serialize.dumps
+
+Both the fetch (ORM query vs Core select) and the serialization alone are timed for each
+page size, and the two outputs are checked to be byte-identical.
+
+Usage:
+    python -m benchmarks.serialize_bench --sizes 50,500,5000
+    python -m benchmarks.serialize_bench --url mysql+pymysql://user:pw@127.0.0.1/benchdb
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models, schemas, serialize
+from app.database import Base
+
+from .common import save_results
+
+
+def _seed(engine, n: int) -> str:
+    user_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{
+            "user_id": user_id, "user_name": "bench", "user_email": f"bench-{uuid.uuid4().hex}@example.com",
+            "password_hash": "x",
+        }])
+        conn.execute(insert(models.Note), [{
+            "note_id": uuid.uuid4().hex,
+            "user_id": user_id,
+            "note_title": f"note {i}",
+            "note_content": "lorem ipsum dolor sit amet, naïve café " * 12,
+            "created_on": now - timedelta(seconds=i),
+            "last_update": now,
+        } for i in range(n)])
+    return user_id
+
+
+def _best(fn, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - start)
+    return {"best_ms": min(times) * 1000, "median_ms": statistics.median(times) * 1000}, out
+
+
+def run_size(Session, user_id: str, n: int, repeat: int) -> dict:
+    adapter = TypeAdapter(list[schemas.NoteOut])
+
+    def old_serialize(notes):
+        payload = [{
+            "note_id": x.note_id,
+            "user_id": x.user_id,
+            "note_title": x.note_title,
+            "note_content": x.note_content,
+            "created_on": x.created_on,
+            "last_update": x.last_update,
+        } for x in notes]
+        return json.dumps(jsonable_encoder(adapter.validate_python(payload)), ensure_ascii=False,
+                          allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+    with Session() as db:
+        def orm_fetch():
+            db.expunge_all()
+            return (db.query(models.Note).filter(models.Note.user_id == user_id)
+                    .order_by(models.Note.created_on.desc(), models.Note.note_id.desc()).limit(n).all())
+
+        fetch_orm, notes = _best(orm_fetch, repeat)
+        fetch_core, rows = _best(lambda: crud.get_notes_by_user(db, user_id, limit=n), repeat)
+        ser_old, old_bytes = _best(lambda: old_serialize(notes), repeat)
+        ser_new, new_bytes = _best(lambda: serialize.dumps(serialize.note_dicts(rows)), repeat)
+
+    return {
+        "notes": n,
+        "identical": old_bytes == new_bytes,
+        "bytes": len(new_bytes),
+        "orm_pydantic": {"fetch": fetch_orm, "serialize": ser_old},
+        "core_fast": {"fetch": fetch_core, "serialize": ser_new},
+        "serialize_speedup": ser_old["best_ms"] / ser_new["best_ms"] if ser_new["best_ms"] else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="database URL (default: temporary SQLite file)")
+    parser.add_argument("--sizes", default="50,500,5000")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'serialize_bench.db')}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    user_id = _seed(engine, max(sizes))
+
+    results = {"url": url.split("@")[-1], "encoder": "orjson" if serialize.orjson is not None else "json", "sizes": {}}
+    for n in sizes:
+        r = run_size(Session, user_id, n, args.repeat)
+        results["sizes"][str(n)] = r
+        print(f"{n:>6} notes: serialize {r['orm_pydantic']['serialize']['best_ms']:8.2f}ms -> "
+              f"{r['core_fast']['serialize']['best_ms']:7.2f}ms (x{r['serialize_speedup']:.1f})  "
+              f"fetch {r['orm_pydantic']['fetch']['best_ms']:7.2f}ms -> {r['core_fast']['fetch']['best_ms']:7.2f}ms  "
+              f"identical={r['identical']}")
+    engine.dispose()
+    print("results:", save_results("serialize", results))
+
+
+if __name__ == "__main__":
+    main()
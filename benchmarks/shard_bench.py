@@ -0,0 +1,218 @@
+# benchmarks/shard_bench.py
+"""
+Note sharding (app.sharding) and online moves (app.rebalance) on SQLite shard files.
+
+  placement:  how evenly hash_shard spreads --users new (uuid7) ids over the shards
+  routing:    per-request cost of the shard lookup, cached and from the directory, and of
+              opening a shard-bound session against a plain one
+  writes:     notes/sec of --writers threads (one user each) running crud.create_note for
+              --duration seconds, with every user on one shard and spread over all of them;
+              each SQLite file takes one write at a time, as one instance saturates
+  move:       app.rebalance.move_users on a user with --notes notes while a writer keeps
+              creating notes for them: rows copied per second, how long writes were refused,
+              and that no note was lost
+
+Usage:
+    python -m benchmarks.shard_bench --shards 4 --writers 16 --notes 20000
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .common import save_results
+
+
+def _make_users(n: int, shard=None) -> list:
+    from sqlalchemy import insert
+
+    from app import models
+    from app.database import engine
+    from app.sharding import shard_map
+
+    user_ids = [models.gen_uuid_hex() for _ in range(n)]
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{
+            "user_id": u, "user_name": "bench", "user_email": f"bench-{u}@example.com", "password_hash": "x",
+        } for u in user_ids])
+        conn.execute(insert(models.UserShard), [{
+            "user_id": u, "shard": shard_map.assign(u) if shard is None else shard, "locked": False,
+        } for u in user_ids])
+    return user_ids
+
+
+def _create(user_id: str, note_in) -> None:
+    from app import crud
+    from app.sharding import shard_map
+
+    with shard_map.open_session(shard_map.locate(user_id)) as db:
+        crud.create_note(db, user_id, note_in)
+
+
+def run_placement(users: int) -> dict:
+    from app import models
+    from app.sharding import hash_shard, shard_map
+
+    n = len(shard_map.shards)
+    counts = [0] * n
+    for _ in range(users):
+        counts[hash_shard(models.gen_uuid_hex(), n)] += 1
+    mean = users / n
+    return {"counts": counts, "max_over_mean": max(counts) / mean, "min_over_mean": min(counts) / mean}
+
+
+def _per_call_us(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def run_routing(user_id: str, n: int) -> dict:
+    from app.database import SessionLocal
+    from app.sharding import shard_map
+
+    placement = shard_map.locate(user_id)
+
+    def uncached():
+        shard_map.directory.clear()
+        shard_map.locate(user_id)
+
+    def sharded_session():
+        shard_map.open_session(placement).close()
+
+    def plain_session():
+        SessionLocal().close()
+
+    return {
+        "locate_cached_us": _per_call_us(lambda: shard_map.locate(user_id), n),
+        "locate_directory_us": _per_call_us(uncached, max(1, n // 10)),
+        "sharded_session_us": _per_call_us(sharded_session, n),
+        "plain_session_us": _per_call_us(plain_session, n),
+    }
+
+
+def run_writes(user_ids: list, duration: float) -> dict:
+    from app import schemas
+    from app.sharding import shard_map
+
+    note_in = schemas.NoteCreate(note_title="bench", note_content="lorem ipsum " * 20)
+    deadline = time.perf_counter() + duration
+    counts = [0] * len(user_ids)
+
+    def writer(i):
+        while time.perf_counter() < deadline:
+            _create(user_ids[i], note_in)
+            counts[i] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(len(user_ids)) as pool:
+        list(pool.map(writer, range(len(user_ids))))
+    elapsed = time.perf_counter() - start
+    shards = {shard_map.locate(u).shard for u in user_ids}
+    return {"shards_used": len(shards), "notes_per_s": sum(counts) / elapsed}
+
+
+def run_move(user_id: str, notes: int, batch_size: int, settle: float) -> dict:
+    from sqlalchemy import insert
+
+    from app import models, rebalance, schemas
+    from app.sharding import UserMoving, shard_map
+
+    source = shard_map.locate(user_id).shard
+    with shard_map.shards[source].engine.begin() as conn:
+        conn.execute(insert(models.Note), [{
+            "note_id": models.gen_uuid_hex(), "user_id": user_id, "note_title": "t", "note_content": "c" * 200,
+        } for _ in range(notes)])
+    target = (source + 1) % len(shard_map.shards)
+
+    note_in = schemas.NoteCreate(note_title="during", note_content="written during the move")
+    stop = threading.Event()
+    out = {"created": 0, "refused": 0, "first_refused": None, "last_refused": None}
+
+    def writer():
+        while not stop.is_set():
+            try:
+                _create(user_id, note_in)
+                out["created"] += 1
+            except UserMoving:
+                now = time.perf_counter()
+                out["refused"] += 1
+                out["first_refused"] = out["first_refused"] or now
+                out["last_refused"] = now
+            time.sleep(0.005)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    start = time.perf_counter()
+    stats = rebalance.move_users([(user_id, target)], batch_size, settle, log=lambda *a: None)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    thread.join()
+
+    shard_map.directory.clear()
+    found = rebalance.count_rows(shard_map.shards[target].engine, user_id)["notes"]
+    refused_for = (out["last_refused"] - out["first_refused"]) if out["refused"] else 0.0
+    return {
+        "notes": notes,
+        "elapsed_s": elapsed,
+        "copy_rows_per_s": stats["copied"] / elapsed if elapsed else 0.0,
+        "stats": stats,
+        "created_during": out["created"],
+        "refused_writes": out["refused"],
+        "writes_refused_for_s": refused_for,
+        "lost": notes + out["created"] - found,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--users", type=int, default=100000, help="ids hashed for the placement check")
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per write run")
+    parser.add_argument("--notes", type=int, default=20000, help="notes of the moved user")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--ttl", type=float, default=1.0, help="SHARD_DIRECTORY_TTL_SECONDS")
+    parser.add_argument("--settle", type=float, default=0.5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    primary = f"sqlite:///{os.path.join(workdir, 'primary.db')}"
+    os.environ["DATABASE_URL"] = primary
+    # shard 0 is the primary database itself, as after turning sharding on for an existing one
+    os.environ["NOTE_SHARD_URLS"] = ",".join(
+        [primary] + [f"sqlite:///{os.path.join(workdir, f'shard{i}.db')}" for i in range(1, args.shards)]
+    )
+    os.environ["SHARD_DIRECTORY_TTL_SECONDS"] = str(args.ttl)
+    os.environ.setdefault("ARGON2_MEMORY_COST", "8192")
+
+    from app.init_db import bootstrap_database
+
+    bootstrap_database()
+    results = {"config": vars(args)}
+
+    r = results["placement"] = run_placement(args.users)
+    print(f"placement of {args.users} ids: {r['counts']}  max/mean {r['max_over_mean']:.3f}  min/mean {r['min_over_mean']:.3f}")
+
+    spread = _make_users(args.writers)
+    r = results["routing"] = run_routing(spread[0], 20000)
+    print(f"routing: locate cached {r['locate_cached_us']:.2f}µs  from directory {r['locate_directory_us']:.1f}µs  "
+          f"session sharded {r['sharded_session_us']:.2f}µs / plain {r['plain_session_us']:.2f}µs")
+
+    results["writes"] = {}
+    for mode, users in (("one_shard", _make_users(args.writers, shard=0)), ("spread", spread)):
+        r = results["writes"][mode] = run_writes(users, args.duration)
+        print(f"{args.writers} writers, {mode:>9} ({r['shards_used']} shards used): {r['notes_per_s']:8.0f} notes/s")
+
+    r = results["move"] = run_move(_make_users(1)[0], args.notes, args.batch_size, args.settle)
+    print(f"move of {r['notes']} notes: {r['elapsed_s']:.1f}s, {r['copy_rows_per_s']:.0f} rows/s copied; "
+          f"{r['created_during']} notes written meanwhile, {r['refused_writes']} writes refused over "
+          f"{r['writes_refused_for_s']:.2f}s; lost {r['lost']}")
+    print("results:", save_results("shard", results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# benchmarks/summary_bench.py
+"""
+Notes list payload and latency: view=full vs view=summary.
+
+  full:    crud.get_notes_by_user(view="full")    -> serialize.note_dicts
+  summary: crud.get_notes_by_user(view="summary") -> serialize.note_summary_dicts
+           (the database returns only a NOTE_SNIPPET_LENGTH prefix of note_content)
+
+For each page size, the fetch + serialize time of one page and the JSON body size are
+reported for both views. Note bodies are --content-chars long, so the gap grows with them.
+
+Usage:
+    python -m benchmarks.summary_bench --sizes 50,200 --content-chars 4000
+    python -m benchmarks.summary_bench --url mysql+pymysql://user:pw@127.0.0.1/benchdb
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models, serialize
+from app.config import settings
+from app.database import Base
+
+from .common import save_results
+
+
+def _seed(engine, n: int, content_chars: int) -> str:
+    user_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+    words = "lorem ipsum dolor sit amet, naïve café "
+    content = (words * (content_chars // len(words) + 1))[:content_chars]
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{
+            "user_id": user_id, "user_name": "bench", "user_email": f"bench-{uuid.uuid4().hex}@example.com",
+            "password_hash": "x",
+        }])
+        conn.execute(insert(models.Note), [{
+            "note_id": uuid.uuid4().hex,
+            "user_id": user_id,
+            "note_title": f"note {i}",
+            "note_content": content,
+            "created_on": now - timedelta(seconds=i),
+            "last_update": now,
+        } for i in range(n)])
+    return user_id
+
+
+def _timed(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - start)
+    return {"best_ms": min(times) * 1000, "median_ms": statistics.median(times) * 1000}, out
+
+
+def run_size(Session, user_id: str, n: int, repeat: int) -> dict:
+    snippet_length = settings.NOTE_SNIPPET_LENGTH
+    with Session() as db:
+        def full():
+            return serialize.dumps(serialize.note_dicts(crud.get_notes_by_user(db, user_id, limit=n)))
+
+        def summary():
+            rows = crud.get_notes_by_user(db, user_id, limit=n, view="summary")
+            return serialize.dumps(serialize.note_summary_dicts(rows, snippet_length))
+
+        full_t, full_body = _timed(full, repeat)
+        summary_t, summary_body = _timed(summary, repeat)
+
+    return {
+        "notes": n,
+        "full": full_t | {"bytes": len(full_body)},
+        "summary": summary_t | {"bytes": len(summary_body)},
+        "bytes_ratio": len(full_body) / len(summary_body) if summary_body else 0.0,
+        "speedup": full_t["median_ms"] / summary_t["median_ms"] if summary_t["median_ms"] else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="database URL (default: temporary SQLite file)")
+    parser.add_argument("--sizes", default="50,200")
+    parser.add_argument("--content-chars", type=int, default=4000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'summary_bench.db')}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    user_id = _seed(engine, max(sizes), args.content_chars)
+
+    results = {
+        "url": url.split("@")[-1], "content_chars": args.content_chars,
+        "snippet_length": settings.NOTE_SNIPPET_LENGTH, "sizes": {},
+    }
+    for n in sizes:
+        r = run_size(Session, user_id, n, args.repeat)
+        results["sizes"][str(n)] = r
+        print(f"{n:>5} notes: full {r['full']['bytes']:>9}B {r['full']['median_ms']:7.2f}ms  "
+              f"summary {r['summary']['bytes']:>8}B {r['summary']['median_ms']:6.2f}ms  "
+              f"(x{r['bytes_ratio']:.1f} smaller, x{r['speedup']:.1f} faster)")
+    engine.dispose()
+    print("results:", save_results("summary", results))
+
+
+if __name__ == "__main__":
+    main()
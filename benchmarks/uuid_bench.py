@@ -0,0 +1,123 @@
+# benchmarks/uuid_bench.py
+"""
+Insert throughput and index size with random (v4) vs time-ordered (v7) BINARY(16) primary keys.
+
+Each version gets its own table shaped like notes (BINARY(16) primary key, indexed
+BINARY(16) user_id, a payload and a timestamp). Rows are inserted in executemany batches
+and throughput is reported per segment, so slow-down as the table outgrows the buffer
+pool is visible. Sizes come from information_schema on MySQL and from dbstat (or the
+file size) on SQLite.
+
+Usage:
+    python -m benchmarks.uuid_bench --rows 5000000 --url mysql+pymysql://user:pw@127.0.0.1/benchdb
+    python -m benchmarks.uuid_bench --rows 1000000          # temporary SQLite file
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Index, MetaData, String, Table, create_engine, text
+from sqlalchemy.dialects.mysql import BINARY
+
+from app.models import uuid4_bin, uuid7_bin
+
+from .common import save_results
+
+
+GENERATORS = {"v4": uuid4_bin, "v7": uuid7_bin}
+
+
+def _table(metadata: MetaData, name: str) -> Table:
+    return Table(
+        name, metadata,
+        Column("note_id", BINARY(16), primary_key=True),
+        Column("user_id", BINARY(16), nullable=False),
+        Column("note_title", String(255)),
+        Column("created_on", DateTime),
+        Index(f"ix_{name}_user", "user_id"),
+    )
+
+
+def _sizes(engine, table_name: str, sqlite_path: str) -> dict:
+    with engine.connect() as conn:
+        if engine.dialect.name == "mysql":
+            conn.execute(text(f"ANALYZE TABLE {table_name}"))
+            data_len, index_len = conn.execute(text(
+                "SELECT data_length, index_length FROM information_schema.TABLES "
+                "WHERE table_schema = DATABASE() AND table_name = :t"), {"t": table_name}).one()
+            return {"data_bytes": int(data_len), "index_bytes": int(index_len)}
+        try:
+            rows = conn.execute(text(
+                "SELECT name, SUM(pgsize) FROM dbstat WHERE tbl_name = :t GROUP BY name"), {"t": table_name}).all()
+            return {name: int(size) for name, size in rows}
+        except Exception:
+            return {"file_bytes": os.path.getsize(sqlite_path)} if sqlite_path else {}
+
+
+def run(engine, version: str, rows: int, batch: int, segment: int, sqlite_path: str) -> dict:
+    gen = GENERATORS[version]
+    name = f"uuid_bench_{version}"
+    metadata = MetaData()
+    table = _table(metadata, name)
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+
+    users = [uuid4_bin() for _ in range(1000)]
+    rng = random.Random(1)
+    segments = []
+    seg_start, seg_rows = time.perf_counter(), 0
+    total_start = seg_start
+    inserted = 0
+    while inserted < rows:
+        n = min(batch, rows - inserted)
+        now = datetime.utcnow()
+        values = [{"note_id": gen(), "user_id": rng.choice(users), "note_title": "title", "created_on": now}
+                  for _ in range(n)]
+        with engine.begin() as conn:
+            conn.execute(table.insert(), values)
+        inserted += n
+        seg_rows += n
+        if seg_rows >= segment or inserted == rows:
+            elapsed = time.perf_counter() - seg_start
+            segments.append({"rows_total": inserted, "rows_per_sec": seg_rows / elapsed})
+            print(f"  {version} {inserted:>10,} rows: {seg_rows / elapsed:,.0f} rows/s")
+            seg_start, seg_rows = time.perf_counter(), 0
+    total = time.perf_counter() - total_start
+    return {
+        "rows": rows,
+        "seconds": total,
+        "rows_per_sec": rows / total,
+        "segments": segments,
+        "sizes": _sizes(engine, name, sqlite_path),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="database URL (default: temporary SQLite file)")
+    parser.add_argument("--rows", type=int, default=3_000_000)
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--segment", type=int, default=500_000)
+    parser.add_argument("--versions", default="v4,v7")
+    args = parser.parse_args()
+
+    results = {"url": (args.url or "sqlite (one temporary file per version)").split("@")[-1], "runs": {}}
+    for version in args.versions.split(","):
+        sqlite_path = None
+        url = args.url
+        if url is None:
+            # separate files so the file-size fallback measures one table
+            sqlite_path = os.path.join(tempfile.mkdtemp(), f"uuid_bench_{version}.db")
+            url = f"sqlite:///{sqlite_path}"
+        engine = create_engine(url)
+        results["runs"][version] = run(engine, version, args.rows, args.batch, args.segment, sqlite_path)
+        engine.dispose()
+        print(f"{version}: {results['runs'][version]['rows_per_sec']:,.0f} rows/s, sizes={results['runs'][version]['sizes']}")
+    print("results:", save_results("uuid", results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import uuid
+
+# settings are read when app.config is imported: point the app at a throwaway SQLite file first
+_db_dir = tempfile.mkdtemp(prefix="unote-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'notes.db')}"
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ["NOTE_SHARD_URLS"] = ""
+os.environ["DB_ASYNC"] = "false"
+os.environ["RATE_LIMIT_BACKEND"] = "none"
+os.environ["NOTE_GROUP_COMMIT"] = "false"
+os.environ["ARGON2_MEMORY_COST"] = "8192"
+os.environ["ARGON2_TIME_COST"] = "1"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.database import engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+class RoundTrips:
+    """
+    Statements and COMMITs sent on an engine, counted like benchmarks.mutation_bench does:
+    each is one round-trip to the database.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+        self.commits = 0
+        event.listen(engine, "before_cursor_execute", self._statement)
+        event.listen(engine, "commit", self._commit)
+
+    def _statement(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def _commit(self, conn):
+        self.commits += 1
+
+    @property
+    def count(self) -> int:
+        return len(self.statements) + self.commits
+
+    def reset(self) -> None:
+        self.statements = []
+        self.commits = 0
+
+    def close(self) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._statement)
+        event.remove(self.engine, "commit", self._commit)
+
+
+@pytest.fixture(scope="session")
+def client():
+    # without the lifespan: no background revocation polling that would add statements
+    return TestClient(app)
+
+
+def _signup(client) -> dict:
+    email = f"{uuid.uuid4().hex[:12]}@example.com"
+    r = client.post("/homepage/signup", json={
+        "user_name": "tester", "user_email": email, "password": "pw", "confirm_password": "pw",
+    })
+    assert r.status_code == 200, r.text
+    r = client.post("/homepage/login", json={"email": email, "password": "pw"})
+    assert r.status_code == 200, r.text
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+@pytest.fixture
+def auth_headers(client):
+    return _signup(client)
+
+
+@pytest.fixture
+def other_auth_headers(client):
+    return _signup(client)
+
+
+@pytest.fixture
+def round_trips():
+    counter = RoundTrips(engine)
+    yield counter
+    counter.close()
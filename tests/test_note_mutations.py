@@ -0,0 +1,141 @@
+"""
+Database round-trips of single-note PATCH and DELETE (crud.update_note / crud.delete_note),
+and their 404 / 412 paths. Counts are for SQLite, which has UPDATE ... RETURNING.
+"""
+import uuid
+
+from sqlalchemy import select
+
+from app import models
+from app.database import SessionLocal
+
+
+def _create_note(client, headers, title="first") -> str:
+    # also puts the user in the user cache, so later requests don't look them up
+    r = client.post("/homepage/notes", json={"note_title": title, "note_content": "body"}, headers=headers)
+    assert r.status_code == 201, r.text
+    return r.json()["note_id"]
+
+
+def _stored(note_id: str):
+    with SessionLocal() as db:
+        return db.execute(
+            select(models.Note.note_title, models.Note.version).where(models.Note.note_id == note_id.replace("-", ""))
+        ).first()
+
+
+def test_patch_is_two_round_trips(client, auth_headers, round_trips):
+    note_id = _create_note(client, auth_headers)
+
+    round_trips.reset()
+    r = client.patch(f"/homepage/notes/{note_id}", json={"note_title": "second"}, headers=auth_headers)
+
+    assert r.status_code == 200, r.text
+    assert r.json()["note_title"] == "second"
+    assert r.headers["ETag"] == '"2"'
+    assert len(round_trips.statements) == 1  # UPDATE ... RETURNING, no load before or refresh after
+    assert round_trips.statements[0].lstrip().upper().startswith("UPDATE")
+    assert round_trips.commits == 1
+    assert round_trips.count == 2
+
+
+def test_patch_with_current_if_match_is_two_round_trips(client, auth_headers, round_trips):
+    note_id = _create_note(client, auth_headers)
+
+    round_trips.reset()
+    r = client.patch(
+        f"/homepage/notes/{note_id}", json={"note_title": "second"}, headers={**auth_headers, "If-Match": '"1"'}
+    )
+
+    assert r.status_code == 200, r.text
+    assert round_trips.count == 2
+    assert "version IN" in round_trips.statements[0]
+
+
+def test_patch_with_stale_if_match_is_412_and_changes_nothing(client, auth_headers, round_trips):
+    note_id = _create_note(client, auth_headers)
+    r = client.patch(f"/homepage/notes/{note_id}", json={"note_title": "second"}, headers=auth_headers)
+    assert r.headers["ETag"] == '"2"'
+
+    round_trips.reset()
+    r = client.patch(
+        f"/homepage/notes/{note_id}", json={"note_title": "lost update"}, headers={**auth_headers, "If-Match": '"1"'}
+    )
+
+    assert r.status_code == 412, r.text
+    # the version check is part of the UPDATE; a SELECT then tells 412 from 404
+    assert len(round_trips.statements) == 2
+    assert "version IN" in round_trips.statements[0]
+    assert round_trips.commits == 0
+    assert tuple(_stored(note_id)) == ("second", 2)
+
+
+def test_patch_missing_note_is_404(client, auth_headers, round_trips):
+    _create_note(client, auth_headers)
+
+    round_trips.reset()
+    r = client.patch(f"/homepage/notes/{uuid.uuid4().hex}", json={"note_title": "x"}, headers=auth_headers)
+
+    assert r.status_code == 404, r.text
+    assert len(round_trips.statements) == 1
+    assert round_trips.commits == 0
+
+
+def test_patch_other_users_note_is_404_and_changes_nothing(client, auth_headers, other_auth_headers, round_trips):
+    note_id = _create_note(client, auth_headers)
+    _create_note(client, other_auth_headers)
+
+    round_trips.reset()
+    r = client.patch(f"/homepage/notes/{note_id}", json={"note_title": "not yours"}, headers=other_auth_headers)
+
+    assert r.status_code == 404, r.text
+    assert round_trips.commits == 0
+    assert tuple(_stored(note_id)) == ("first", 1)
+
+
+def test_patch_other_users_note_with_if_match_is_404_not_412(client, auth_headers, other_auth_headers):
+    note_id = _create_note(client, auth_headers)
+
+    r = client.patch(
+        f"/homepage/notes/{note_id}", json={"note_title": "not yours"}, headers={**other_auth_headers, "If-Match": '"1"'}
+    )
+
+    assert r.status_code == 404, r.text
+    assert tuple(_stored(note_id)) == ("first", 1)
+
+
+def test_delete_is_three_round_trips(client, auth_headers, round_trips):
+    note_id = _create_note(client, auth_headers)
+
+    round_trips.reset()
+    r = client.delete(f"/homepage/notes/{note_id}", headers=auth_headers)
+
+    assert r.status_code == 204, r.text
+    # DELETE and the sync tombstone INSERT, committed together
+    assert [s.lstrip().split()[0].upper() for s in round_trips.statements] == ["DELETE", "INSERT"]
+    assert round_trips.commits == 1
+    assert round_trips.count == 3
+    assert _stored(note_id) is None
+
+
+def test_delete_missing_note_is_404(client, auth_headers, round_trips):
+    _create_note(client, auth_headers)
+
+    round_trips.reset()
+    r = client.delete(f"/homepage/notes/{uuid.uuid4().hex}", headers=auth_headers)
+
+    assert r.status_code == 404, r.text
+    assert len(round_trips.statements) == 1
+    assert round_trips.commits == 0
+
+
+def test_delete_other_users_note_is_404_and_keeps_it(client, auth_headers, other_auth_headers, round_trips):
+    note_id = _create_note(client, auth_headers)
+    _create_note(client, other_auth_headers)
+
+    round_trips.reset()
+    r = client.delete(f"/homepage/notes/{note_id}", headers=other_auth_headers)
+
+    assert r.status_code == 404, r.text
+    assert round_trips.commits == 0
+    assert tuple(_stored(note_id)) == ("first", 1)